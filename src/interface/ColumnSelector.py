@@ -1,12 +1,34 @@
+import threading
+import time
 from PyQt5.QtWidgets import (QGroupBox, QListWidget, QLabel,QVBoxLayout, QHBoxLayout,
-                              QWidget,QAbstractItemView, QMessageBox, QPushButton,QRadioButton)
+                              QWidget,QAbstractItemView, QMessageBox, QPushButton,QRadioButton,
+                              QTableWidget, QTableWidgetItem, QHeaderView, QComboBox, QProgressBar,
+                              QListWidgetItem)
 from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal
+
+from ColumnStats import StatisticsCache
+from SubsetSearch import (SEARCH_METHODS, SEARCH_CRITERIA, EXHAUSTIVE_MAX_COLUMNS, SearchCancelled,
+                          usable_columns, subset_statistics, search_subsets)
+
+# Columnas del panel de estadísticas: título y clave en el diccionario de column_statistics
+STATISTICS_FIELDS = [("Column", None), ("Type", "dtype"), ("Count", "count"), ("Missing", "missing"),
+                     ("Mean", "mean"), ("Std", "std"), ("Min", "min"), ("Max", "max"), ("Distinct", "distinct")]
+# Codificaciones de las columnas de entrada categóricas (ver PreprocessingPipeline.CategoricalEncoder)
+ENCODINGS = ["One-Hot", "Target"]
+# Regresores del modelo: los regularizados eligen alpha en un camino de valores (ver Regularization)
+REGRESSORS = ["Linear Regression", "Ridge", "Lasso", "ElasticNet"]
+# Evaluación del modelo: nombre -> (folds, repeticiones) de la validación cruzada (0 folds: solo 70/30)
+EVALUATIONS = {"Hold-out 70/30": (0, 1), "5-Fold CV": (5, 1), "10-Fold CV": (10, 1),
+               "Repeated 5-Fold CV (x3)": (5, 3)}
 
 class ColumnSelectorModel:
     def __init__(self):
         self.entry_columns = []  # Almacenará las columnas de entrada
         self.target_column = None  # Almacenará la columna objetivo
+        self.encoding = ENCODINGS[0]  # Codificación de las columnas categóricas
+        self.evaluation = next(iter(EVALUATIONS))  # Evaluación del modelo (ver EVALUATIONS)
+        self.regressor = REGRESSORS[0]  # Regresor del modelo
     
     def set_columns(self, entry_columns, target_column):
         """Establece las columnas de entrada y la columna objetivo."""
@@ -22,7 +44,93 @@ class ColumnSelectorModel:
         return len(self.entry_columns) > 0 and self.target_column is not None
 
 
+class StatisticsWorker(QObject):
+    """
+    Calcula en un hilo secundario las estadísticas de las columnas indicadas.
+    """
+    column_done = pyqtSignal(str, object, object)  # Columna, versión y estadísticas
+    finished = pyqtSignal()
+
+    def __init__(self, cache, columns):
+        super().__init__()
+        self.cache = cache
+        self.columns = columns
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def run(self):
+        for column in self.columns:
+            if self._cancel_event.is_set():
+                break
+            try:
+                version, stats = self.cache.compute(column)
+            except Exception:
+                continue  # La columna se puede haber borrado mientras tanto
+            self.column_done.emit(column, version, stats)
+        self.finished.emit()
+
+
+class SubsetSearchWorker(QObject):
+    """
+    Busca en un hilo secundario los mejores subconjuntos de columnas de entrada
+    (ver SubsetSearch.search_subsets) y va enviando la lista de los mejores.
+    """
+    progress = pyqtSignal(int)  # Porcentaje completado
+    found = pyqtSignal(object)  # Lista [(puntuación, columnas)] de los mejores hasta ahora
+    finished = pyqtSignal(object)  # (lista final, columnas descartadas por colineales)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    # Intervalo mínimo, en segundos, entre dos envíos de la lista mientras se busca
+    report_interval = 0.2
+
+    def __init__(self, columns, target_column, method, criterion, df=None, store=None):
+        super().__init__()
+        self.columns = columns
+        self.target_column = target_column
+        self.method = method
+        self.criterion = criterion
+        self.df = df
+        self.store = store
+        self._cancel_event = threading.Event()
+        self._last_report = 0.0
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def report(self, ranking):
+        now = time.monotonic()
+        if now - self._last_report >= self.report_interval:
+            self._last_report = now
+            self.found.emit(ranking)
+
+    def report_progress(self, done, total):
+        self.progress.emit(int(100 * done / max(total, 1)))
+
+    def run(self):
+        try:
+            gram = subset_statistics(self.columns, self.target_column, self.df, self.store,
+                                     is_cancelled=self.is_cancelled)
+            if self.is_cancelled():
+                raise SearchCancelled()
+            result = search_subsets(gram, self.columns, self.target_column, self.method, self.criterion,
+                                    report=self.report, progress=self.report_progress,
+                                    is_cancelled=self.is_cancelled)
+        except SearchCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.finished.emit(result)
+
+
 class ColumnSelectorView(QWidget):
+    searching_changed = pyqtSignal(bool)  # Empieza o termina una búsqueda que lee los datos en segundo plano
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setVisible(False)
@@ -69,7 +177,7 @@ class ColumnSelectorView(QWidget):
         self.target_group = QGroupBox("Target Column")
         self.target_group.setStyleSheet("QGroupBox { font-weight: bold; color: #99FFFF; }")  # Cambiar color y peso de la fuente
         self.target_group.setMaximumWidth(400)  # Limitar el ancho del selector a 400px
-        self.target_group.setMaximumHeight(200)  # Limitar el alto
+        self.target_group.setMaximumHeight(330)  # Limitar el alto
         self.target_layout = QVBoxLayout(self.target_group)
         self.list_widget_target = QListWidget(self)
         self.list_widget_target.setMaximumWidth(400)  # Limitar el ancho del selector a 400px
@@ -88,6 +196,48 @@ class ColumnSelectorView(QWidget):
         self.target_layout.addWidget(self.create_label("Select Target Column:"))
         self.target_layout.addWidget(self.list_widget_target)
 
+        # Codificación de las columnas de entrada que no son numéricas
+        self.encoding_combo = QComboBox()
+        self.encoding_combo.addItems(ENCODINGS)
+        self.encoding_combo.setToolTip("How text (categorical) entry columns are turned into numbers")
+        self.target_layout.addWidget(self.create_label("Categorical Encoding:"))
+        self.target_layout.addWidget(self.encoding_combo)
+
+        # Validación cruzada que se añade a la evaluación 70/30
+        self.evaluation_combo = QComboBox()
+        self.evaluation_combo.addItems(list(EVALUATIONS))
+        self.evaluation_combo.setToolTip("Also report the mean ± std of the metrics over k folds")
+        self.target_layout.addWidget(self.create_label("Evaluation:"))
+        self.target_layout.addWidget(self.evaluation_combo)
+
+        # Regresor del modelo (los regularizados eligen alpha solos)
+        self.regressor_combo = QComboBox()
+        self.regressor_combo.addItems(REGRESSORS)
+        self.regressor_combo.setToolTip("Ridge, Lasso and ElasticNet shrink the coefficients; "
+                                        "the penalty (alpha) is chosen automatically")
+        self.target_layout.addWidget(self.create_label("Model:"))
+        self.target_layout.addWidget(self.regressor_combo)
+
+        # Panel con las estadísticas de cada columna
+        self.statistics_group = QGroupBox("Column Statistics")
+        self.statistics_group.setStyleSheet("QGroupBox { font-weight: bold; color: #99FFFF; }")
+        self.statistics_group.setMaximumHeight(200)
+        self.statistics_layout = QVBoxLayout(self.statistics_group)
+        self.statistics_table = QTableWidget(0, len(STATISTICS_FIELDS))
+        self.statistics_table.setHorizontalHeaderLabels([title for title, _ in STATISTICS_FIELDS])
+        self.statistics_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.statistics_table.verticalHeader().setVisible(False)
+        self.statistics_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.statistics_table.setStyleSheet("""
+            QTableWidget {
+                background-color: #2E2E2E;  /* Fondo gris oscuro */
+                color: white;  /* Texto blanco */}
+            QHeaderView::section {
+                background-color: #4A4A4A;
+                color: #E0E0E0;}""")
+        self.statistics_layout.addWidget(self.statistics_table)
+        self.selectors_layout.addWidget(self.statistics_group)
+
         # Botón para confirmar selección (No visible al principio)
         self.confirm_button = QPushButton('Confirm columns selection')
         self.confirm_button.setFixedSize(300, 50)
@@ -103,7 +253,45 @@ class ColumnSelectorView(QWidget):
             QPushButton:hover {
                 background-color: #555555;}""")
         
+        # Búsqueda automática de las mejores columnas de entrada
+        self.search_group = QGroupBox("Subset Search")
+        self.search_group.setStyleSheet("QGroupBox { font-weight: bold; color: #99FFFF; }")
+        self.search_group.setMaximumHeight(190)
+        search_layout = QVBoxLayout(self.search_group)
+        controls_layout = QHBoxLayout()
+        self.search_method_combo = QComboBox()
+        self.search_method_combo.addItems(SEARCH_METHODS)
+        self.search_method_combo.setToolTip(
+            f"Forward adds and Backward removes one column at a time; "
+            f"Exhaustive tries every subset (up to {EXHAUSTIVE_MAX_COLUMNS} columns)")
+        self.search_criterion_combo = QComboBox()
+        self.search_criterion_combo.addItems(SEARCH_CRITERIA)
+        self.search_criterion_combo.setToolTip("How subsets are ranked (lower is better)")
+        self.search_button = QPushButton("Search")
+        self.cancel_search_button = QPushButton("Cancel")
+        self.cancel_search_button.setVisible(False)
+        self.search_progress = QProgressBar()
+        self.search_progress.setVisible(False)
+        controls_layout.addWidget(self.create_label("Method:"))
+        controls_layout.addWidget(self.search_method_combo)
+        controls_layout.addWidget(self.create_label("Criterion:"))
+        controls_layout.addWidget(self.search_criterion_combo)
+        controls_layout.addWidget(self.search_button)
+        controls_layout.addWidget(self.cancel_search_button)
+        controls_layout.addWidget(self.search_progress)
+        controls_layout.addStretch()
+        self.search_results = QListWidget()
+        self.search_results.setToolTip("Double-click a subset to select its columns as entry columns")
+        self.search_results.setStyleSheet("""
+            QListWidget {
+                background-color: #2E2E2E;  /* Fondo gris oscuro */
+                color: white;  /* Texto blanco */}""")
+        self.search_results.itemDoubleClicked.connect(self.select_subset)
+        search_layout.addLayout(controls_layout)
+        search_layout.addWidget(self.search_results)
+
         self.layout.addLayout(self.selectors_layout)
+        self.layout.addWidget(self.search_group)
         self.layout.addWidget(self.confirm_button, alignment=Qt.AlignCenter)
 
     def create_label(self, text):
@@ -120,12 +308,76 @@ class ColumnSelectorView(QWidget):
         self.list_widget_target.clear()
         self.list_widget_target.addItems(columns)
 
+    def show_statistics(self, columns):
+        """Crea una fila por columna, con las estadísticas pendientes de calcular."""
+        self.statistics_table.setRowCount(len(columns))
+        for row, column in enumerate(columns):
+            self.statistics_table.setItem(row, 0, QTableWidgetItem(str(column)))
+            for field in range(1, len(STATISTICS_FIELDS)):
+                self.statistics_table.setItem(row, field, QTableWidgetItem("…"))
+
+    def update_statistics(self, row, stats):
+        """Muestra las estadísticas de la columna de la fila indicada."""
+        for field, (_, key) in enumerate(STATISTICS_FIELDS[1:], start=1):
+            value = stats[key]
+            if value is None:
+                text = ""
+            elif isinstance(value, float):
+                text = f"{value:.4g}"
+            else:
+                text = str(value)
+            if key == "distinct" and stats["distinct_capped"]:
+                text = f"> {value}"
+            self.statistics_table.setItem(row, field, QTableWidgetItem(text))
+
     def get_selected_columns(self):
         """Devuelve las columnas de entrada seleccionadas y la columna de salida"""
         input_columns = [item.text() for item in self.list_widget_entry.selectedItems()]
         target_column = self.list_widget_target.currentItem().text() if self.list_widget_target.currentItem() else None
         return input_columns, target_column
     
+    def get_encoding(self):
+        """Devuelve la codificación elegida para las columnas categóricas."""
+        return self.encoding_combo.currentText()
+
+    def get_evaluation(self):
+        """Devuelve la evaluación elegida para el modelo."""
+        return self.evaluation_combo.currentText()
+
+    def get_regressor(self):
+        """Devuelve el regresor elegido para el modelo."""
+        return self.regressor_combo.currentText()
+
+    def get_search_options(self):
+        """Devuelve el método y el criterio elegidos para buscar subconjuntos."""
+        return self.search_method_combo.currentText(), self.search_criterion_combo.currentText()
+
+    def set_searching(self, searching):
+        """Muestra u oculta el progreso y el botón de cancelar de la búsqueda."""
+        self.search_button.setEnabled(not searching)
+        self.cancel_search_button.setVisible(searching)
+        self.search_progress.setVisible(searching)
+        if searching:
+            self.search_progress.setValue(0)
+        self.searching_changed.emit(searching)
+
+    def show_subsets(self, ranking, criterion):
+        """Muestra los mejores subconjuntos con su puntuación."""
+        self.search_results.clear()
+        for score, columns in ranking:
+            item = QListWidgetItem(f"{criterion} {score:.4f}  —  {', '.join(columns)}")
+            item.setData(Qt.UserRole, list(columns))
+            self.search_results.addItem(item)
+
+    def select_subset(self, item):
+        """Selecciona como columnas de entrada las del subconjunto."""
+        columns = item.data(Qt.UserRole)
+        self.multiple_selection_radio.setChecked(True)
+        self.list_widget_entry.clearSelection()
+        for row in range(self.list_widget_entry.count()):
+            entry = self.list_widget_entry.item(row)
+            entry.setSelected(entry.text() in columns)
+
     def update_selection_mode(self):
         """Actualiza el modo de selección de columnas según el botón de radio seleccionado."""
         if self.single_selection_radio.isChecked():
@@ -155,16 +407,206 @@ class ColumnSelectorController:
 
         self.view.confirm_button.clicked.connect(self.confirm_selection)
 
+        self.view.cancel_search_button.clicked.connect(self.stop_search)
+
+        # Búsqueda de subconjuntos de columnas en segundo plano
+        self.search_thread = None
+        self.search_worker = None
+        self.search_criterion = None
+
+        # Estadísticas de las columnas, calculadas en segundo plano
+        self.statistics = StatisticsCache()
+        self.statistics_thread = None
+        self.statistics_worker = None
+        self.running_workers = []  # Workers vivos hasta que termine su hilo
+
     def update_selectors(self, columns):
         """Actualiza los selectores con las columnas disponibles"""
         self.view.update_selectors(columns)
 
+    def set_data(self, df=None, store=None):
+        """
+        Empieza a calcular las estadísticas de los datos cargados (DataFrame o
+        ColumnStore). Sin datos se vacía el panel.
+        """
+        self.stop_statistics()
+        self.stop_search()
+        self.view.search_results.clear()
+        self.statistics.set_data(df, store)
+        self.view.show_statistics(self.statistics.columns())
+        self.start_statistics()
+
+    def columns_changed(self, columns, df=None):
+        """
+        Vuelve a calcular solo las estadísticas de las columnas que han cambiado.
+        df es el DataFrame nuevo si el preprocesado lo ha sustituido.
+        """
+        self.stop_statistics()
+        if df is not None:
+            self.statistics.df = df
+        self.statistics.touch(columns)
+        self.start_statistics()
+
+    def start_statistics(self):
+        columns = self.statistics.stale_columns()
+        if not columns:
+            return
+        thread = QThread(self.view)
+        worker = StatisticsWorker(self.statistics, columns)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.column_done.connect(self.on_statistics_done)
+        # Directa: el hilo debe poder terminar aunque el principal esté esperando en wait_statistics
+        worker.finished.connect(thread.quit, Qt.DirectConnection)
+        thread.finished.connect(lambda: self.running_workers.remove((thread, worker)))
+        thread.finished.connect(thread.deleteLater)
+        self.running_workers.append((thread, worker))
+        self.statistics_thread, self.statistics_worker = thread, worker
+        thread.start()
+
+    def stop_statistics(self):
+        """Cancela el cálculo en curso; sus resultados ya no se muestran."""
+        if self.statistics_worker is not None:
+            self.statistics_worker.cancel()
+            self.statistics_worker.column_done.disconnect(self.on_statistics_done)
+            self.statistics_worker = None
+            self.statistics_thread = None
+
+    def stop_readers(self):
+        """
+        Cancela las estadísticas y la búsqueda en curso y espera a que sus hilos
+        dejen de leer los datos, antes de que el preprocesado los cambie. Las
+        estadísticas pendientes se recalculan con columns_changed o resume_statistics.
+        """
+        self.stop_statistics()
+        self.stop_search()
+        for thread, _ in list(self.running_workers):
+            thread.wait()
+
+    def resume_statistics(self):
+        """Vuelve a calcular las estadísticas pendientes si no hay un cálculo en curso."""
+        if self.statistics_worker is None:
+            self.start_statistics()
+
+    def wait_statistics(self):
+        """Espera a que terminen los hilos de estadísticas (al cerrar la aplicación)."""
+        self.stop_statistics()
+        for thread, _ in list(self.running_workers):
+            thread.wait()
+
+    def on_statistics_done(self, column, version, stats):
+        if self.statistics.store_result(column, version, stats):
+            columns = self.statistics.columns()
+            if column in columns:
+                self.view.update_statistics(columns.index(column), stats)
+
     def get_selected_columns(self):
         """Obtiene las columnas seleccionadas y las pasa al modelo"""
         input_columns, target_column = self.view.get_selected_columns()
         self.model.set_columns(input_columns, target_column)
         return input_columns, target_column
 
+    def get_encoding(self):
+        """Obtiene la codificación de las columnas categóricas y la pasa al modelo."""
+        self.model.encoding = self.view.get_encoding()
+        return self.model.encoding
+
+    def get_evaluation(self):
+        """Obtiene la evaluación elegida y la pasa al modelo. Devuelve (folds, repeticiones)."""
+        self.model.evaluation = self.view.get_evaluation()
+        return EVALUATIONS[self.model.evaluation]
+
+    def get_regressor(self):
+        """Obtiene el regresor elegido y lo pasa al modelo."""
+        self.model.regressor = self.view.get_regressor()
+        return self.model.regressor
+
+    def start_search(self):
+        """
+        Busca en segundo plano los mejores subconjuntos de columnas de entrada para
+        la columna objetivo. Las candidatas son las columnas de entrada seleccionadas
+        o, con una o ninguna, todas las demás. Solo se usan las numéricas sin vacíos.
+        """
+        entry_columns, target_column = self.get_selected_columns()
+        if target_column is None:
+            self.view.show_message("Warning", "Please select a target column first.", "warning")
+            return False
+        df, store = self.statistics.df, self.statistics.store
+        if df is None and store is None:
+            return False
+        candidates = entry_columns if len(entry_columns) > 1 else self.statistics.columns()
+        candidates = usable_columns([column for column in candidates if column != target_column], df, store)
+        if not candidates or not usable_columns([target_column], df, store):
+            self.view.show_message("Warning", "Subset search needs a numeric target column and numeric "
+                                              "entry columns without missing values.", "warning")
+            return False
+        method, criterion = self.view.get_search_options()
+        if method == "Exhaustive" and len(candidates) > EXHAUSTIVE_MAX_COLUMNS:
+            self.view.show_message("Warning", f"Exhaustive search is limited to {EXHAUSTIVE_MAX_COLUMNS} "
+                                              f"columns ({len(candidates)} given). Select fewer entry columns "
+                                              f"or use Forward or Backward.", "warning")
+            return False
+
+        self.stop_search()
+        thread = QThread(self.view)
+        worker = SubsetSearchWorker(candidates, target_column, method, criterion, df, store)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(self.view.search_progress.setValue)
+        worker.found.connect(self.on_subsets_found)
+        worker.finished.connect(self.on_search_done)
+        worker.failed.connect(self.on_search_failed)
+        worker.cancelled.connect(self.release_search)
+        for signal in (worker.finished, worker.failed, worker.cancelled):
+            # Directa: el hilo debe poder terminar aunque el principal esté esperando en wait_search
+            signal.connect(thread.quit, Qt.DirectConnection)
+        thread.finished.connect(lambda: self.running_workers.remove((thread, worker)))
+        thread.finished.connect(thread.deleteLater)
+        self.running_workers.append((thread, worker))
+        self.search_thread, self.search_worker = thread, worker
+        self.search_criterion = criterion
+        self.view.search_results.clear()
+        self.view.set_searching(True)
+        thread.start()
+        return True
+
+    def on_subsets_found(self, ranking):
+        self.view.show_subsets(ranking, self.search_criterion)
+
+    def on_search_done(self, result):
+        ranking, skipped = result
+        self.view.show_subsets(ranking, self.search_criterion)
+        self.release_search()
+        if skipped:
+            self.view.show_message("Subset Search", "Left out because they are constant or collinear with "
+                                                    f"other columns: {', '.join(skipped)}", "warning")
+
+    def on_search_failed(self, message):
+        self.release_search()
+        self.view.show_message("Error", f"Subset search failed: {message}", "warning")
+
+    def stop_search(self):
+        """Cancela la búsqueda en curso; sus resultados ya no se muestran."""
+        if self.search_worker is not None:
+            self.search_worker.cancel()
+            for signal, slot in ((self.search_worker.found, self.on_subsets_found),
+                                 (self.search_worker.finished, self.on_search_done),
+                                 (self.search_worker.failed, self.on_search_failed),
+                                 (self.search_worker.cancelled, self.release_search)):
+                signal.disconnect(slot)
+            self.release_search()
+
+    def release_search(self):
+        self.search_worker = None
+        self.search_thread = None
+        self.view.set_searching(False)
+
+    def wait_search(self):
+        """Espera a que termine la búsqueda (al cerrar la aplicación)."""
+        self.stop_search()
+        for thread, _ in list(self.running_workers):
+            thread.wait()
+
     def confirm_selection(self):
         """Confirma la selección de columnas de entrada y salida"""
         self.get_selected_columns()
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+from DataLoader import CHUNK_SIZE
+
+# Máximo de valores distintos que se cuentan en columnas leídas por bloques desde disco
+DISTINCT_LIMIT = 100000
+
+
+def numeric_statistics(values, block_size=CHUNK_SIZE, distinct_limit=None):
+    """
+    Estadísticas de una columna numérica recorriéndola una vez por bloques, de
+    modo que sirve igual para un array en memoria que para un np.memmap.
+    La varianza se acumula respecto al primer valor para no perder precisión.
+    Los valores distintos también se sacan en la misma pasada: sin distinct_limit
+    se guardan los de cada bloque y se cuentan al final con una tabla hash
+    (columnas en memoria); con él se van uniendo los de cada bloque y se deja de
+    contar al superar ese número (columnas en disco).
+    """
+    count, missing = 0, 0
+    total, total_squares, shift = 0.0, 0.0, None
+    minimum, maximum = np.inf, -np.inf
+    distinct = np.empty(0)
+    distinct_blocks = []
+    distinct_capped = False
+    for start in range(0, len(values), block_size):
+        block = np.asarray(values[start:start + block_size], dtype=np.float64)
+        valid = block[~np.isnan(block)]
+        missing += len(block) - len(valid)
+        if not len(valid):
+            continue
+        if shift is None:
+            shift = valid[0]
+        centered = valid - shift
+        count += len(valid)
+        total += centered.sum()
+        total_squares += np.dot(centered, centered)
+        minimum = min(minimum, valid.min())
+        maximum = max(maximum, valid.max())
+        if distinct_limit is None:
+            distinct_blocks.append(pd.unique(valid))
+        elif not distinct_capped:
+            distinct = np.union1d(distinct, valid)
+            if len(distinct) > distinct_limit:
+                distinct_capped = True
+
+    if distinct_blocks:
+        distinct = pd.unique(np.concatenate(distinct_blocks))
+    stats = {"count": count, "missing": missing, "mean": None, "std": None, "min": None, "max": None,
+             "distinct": min(len(distinct), distinct_limit) if distinct_capped else len(distinct),
+             "distinct_capped": distinct_capped}
+    if count:
+        mean_shifted = total / count
+        stats["mean"] = float(shift + mean_shifted)
+        if count > 1:
+            variance = (total_squares - count * mean_shifted ** 2) / (count - 1)
+            stats["std"] = float(np.sqrt(max(variance, 0.0)))
+        stats["min"] = float(minimum)
+        stats["max"] = float(maximum)
+    return stats
+
+
+def column_statistics(values, dtype=None, distinct_limit=None):
+    """
+    Devuelve un diccionario con dtype, count, missing, mean, std, min, max y
+    distinct de una columna (Series, array o memmap). Las columnas no numéricas
+    solo tienen recuentos.
+    """
+    if isinstance(values, pd.Series):
+        dtype = str(values.dtype)
+        if pd.api.types.is_numeric_dtype(values):
+            stats = numeric_statistics(values.to_numpy(dtype=np.float64, na_value=np.nan))
+        else:
+            count = int(values.count())
+            stats = {"count": count, "missing": len(values) - count, "mean": None, "std": None,
+                     "min": None, "max": None, "distinct": int(values.nunique()), "distinct_capped": False}
+    else:
+        stats = numeric_statistics(values, distinct_limit=distinct_limit)
+    stats["dtype"] = dtype if dtype is not None else str(np.asarray(values[:0]).dtype)
+    return stats
+
+
+class StatisticsCache:
+    """
+    Estadísticas por columna de los datos cargados, guardadas junto a la versión
+    de la columna con que se calcularon. set_data empieza una versión nueva de
+    los datos y touch marca las columnas que han cambiado, de modo que solo esas
+    se vuelven a calcular. Los datos pueden ser un DataFrame o un ColumnStore.
+    """
+    def __init__(self):
+        self.df = None
+        self.store = None
+        self.data_version = 0
+        self.versions = {}  # Columna -> versión actual
+        self.results = {}  # Columna -> ((versión de los datos, versión de la columna), estadísticas)
+
+    def set_data(self, df=None, store=None):
+        self.df = df
+        self.store = store
+        self.data_version += 1
+        self.versions = {column: 0 for column in self.columns()}
+        self.results = {}
+
+    def columns(self):
+        if self.store is not None:
+            return list(self.store.columns)
+        if self.df is not None:
+            return list(self.df.columns)
+        return []
+
+    def version(self, column):
+        return self.data_version, self.versions.get(column, 0)
+
+    def touch(self, columns):
+        """Marca las columnas cuyos datos han cambiado."""
+        for column in columns:
+            if column in self.versions:
+                self.versions[column] += 1
+
+    def stale_columns(self):
+        """Columnas sin estadísticas para su versión actual."""
+        return [column for column in self.columns()
+                if column not in self.results or self.results[column][0] != self.version(column)]
+
+    def compute(self, column):
+        """Calcula las estadísticas de la columna. Devuelve (versión, estadísticas)."""
+        version = self.version(column)
+        if self.store is not None:
+            stats = column_statistics(self.store.column(column), dtype="float64", distinct_limit=DISTINCT_LIMIT)
+        else:
+            stats = column_statistics(self.df[column])
+        return version, stats
+
+    def store_result(self, column, version, stats):
+        """Guarda un resultado si sigue siendo de la versión actual de la columna."""
+        if version == self.version(column):
+            self.results[column] = (version, stats)
+            return True
+        return False
+
+    def get(self, column):
+        """Devuelve las estadísticas vigentes de la columna o None."""
+        if column in self.results and self.results[column][0] == self.version(column):
+            return self.results[column][1]
+        return None
@@ -0,0 +1,223 @@
+import os
+import json
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+from DataLoader import iter_file_chunks, LoadCancelled, CHUNK_SIZE
+from DatasetCache import default_cache_dir
+
+# La mediana se busca con histogramas de estos intervalos hasta que el que la contiene
+# tiene como mucho MEDIAN_EXACT_ROWS valores, que se ordenan en memoria
+MEDIAN_BINS = 4096
+MEDIAN_EXACT_ROWS = 1000000
+MEDIAN_MAX_PASSES = 16
+
+
+def default_store_dir():
+    """Carpeta donde se crean los almacenes de columnas de los archivos grandes."""
+    return os.path.join(os.path.dirname(default_cache_dir()), "column_stores")
+
+
+class ColumnStore:
+    """
+    Almacén en disco de las columnas numéricas de un archivo, para trabajar con
+    datos que no caben en memoria. Cada columna se guarda como un array float64
+    en su propio archivo y se abre con np.memmap, de modo que solo se leen las
+    páginas que se usan y la caché del sistema operativo hace el resto.
+    Las columnas no numéricas se descartan (quedan en skipped_columns).
+    """
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, "meta.json"), encoding="utf-8") as handle:
+            meta = json.load(handle)
+        self.source = meta["source"]
+        self.columns = meta["columns"]
+        self.skipped_columns = meta["skipped_columns"]
+        self.n_rows = meta["n_rows"]
+        self.arrays = {column: np.memmap(self._column_path(position), dtype=np.float64, mode="r+",
+                                         shape=(self.n_rows,))
+                       for position, column in enumerate(self.columns)}
+        self._missing_counts = {}
+
+    def _column_path(self, position):
+        return os.path.join(self.store_dir, f"{position}.f64")
+
+    @classmethod
+    def build(cls, file_name, store_dir=None, chunk_size=CHUNK_SIZE, progress=None, is_cancelled=None,
+              sheet_name=None):
+        """
+        Crea el almacén leyendo el archivo por bloques, sin cargarlo entero en memoria.
+        Las columnas numéricas se deciden con el primer bloque. Devuelve None si el
+        archivo está vacío.
+        """
+        if store_dir is None:
+            os.makedirs(default_store_dir(), exist_ok=True)
+            store_dir = tempfile.mkdtemp(prefix="store_", dir=default_store_dir())
+        else:
+            os.makedirs(store_dir, exist_ok=True)
+
+        handles = []
+        try:
+            try:
+                columns, skipped_columns, n_rows = None, [], 0
+                for chunk, done, total in iter_file_chunks(file_name, chunk_size, sheet_name):
+                    if is_cancelled is not None and is_cancelled():
+                        raise LoadCancelled()
+                    if columns is None:
+                        columns = [column for column in chunk.columns if pd.api.types.is_numeric_dtype(chunk[column])]
+                        skipped_columns = [str(column) for column in chunk.columns if column not in columns]
+                        handles = [open(os.path.join(store_dir, f"{position}.f64"), "wb")
+                                   for position in range(len(columns))]
+                    for column, handle in zip(columns, handles):
+                        values = pd.to_numeric(chunk[column], errors="coerce")
+                        values.to_numpy(dtype=np.float64, na_value=np.nan).tofile(handle)
+                    n_rows += len(chunk)
+                    if progress is not None:
+                        progress(done, total)
+            finally:
+                for handle in handles:
+                    handle.close()
+        except pd.errors.EmptyDataError:
+            shutil.rmtree(store_dir, ignore_errors=True)
+            raise ValueError("No data found.")
+        except BaseException:
+            shutil.rmtree(store_dir, ignore_errors=True)
+            raise
+
+        if not n_rows:
+            shutil.rmtree(store_dir, ignore_errors=True)
+            raise ValueError("No data found.")
+        if not columns:
+            shutil.rmtree(store_dir, ignore_errors=True)
+            raise ValueError("The file doesn't contain any numeric columns.")
+
+        meta = {"source": os.path.abspath(file_name), "columns": [str(column) for column in columns],
+                "skipped_columns": skipped_columns, "n_rows": n_rows}
+        with open(os.path.join(store_dir, "meta.json"), "w", encoding="utf-8") as handle:
+            json.dump(meta, handle)
+        return cls(store_dir)
+
+    def column(self, name):
+        """Devuelve la columna como array mapeado en memoria."""
+        return self.arrays[name]
+
+    def iter_blocks(self, columns, block_size=CHUNK_SIZE):
+        """
+        Recorre las columnas por bloques de filas.
+        Devuelve tuplas (fila inicial, array de forma (filas, len(columns))).
+        """
+        for start in range(0, self.n_rows, block_size):
+            stop = min(start + block_size, self.n_rows)
+            yield start, np.column_stack([self.arrays[column][start:stop] for column in columns])
+
+    def missing_counts(self, columns):
+        """Número de valores vacíos de cada columna (se calcula una vez por columna)."""
+        for column in columns:
+            if column not in self._missing_counts:
+                self._missing_counts[column] = int(sum(np.isnan(block).sum()
+                                                       for _, block in self.iter_blocks([column])))
+        return {column: self._missing_counts[column] for column in columns}
+
+    def mean(self, column):
+        total, count = 0.0, 0
+        for _, block in self.iter_blocks([column]):
+            valid = block[~np.isnan(block)]
+            total += valid.sum()
+            count += valid.size
+        return total / count if count else np.nan
+
+    def median(self, column):
+        """
+        Mediana de los valores no vacíos (como np.nanmedian) sin cargar la columna:
+        ver select_rank. Con un número par de valores, una pasada más busca el
+        siguiente valor al central.
+        """
+        count, low, high = 0, np.inf, -np.inf
+        for _, block in self.iter_blocks([column]):
+            valid = block[~np.isnan(block)]
+            if valid.size:
+                count += valid.size
+                low, high = min(low, valid.min()), max(high, valid.max())
+        if not count:
+            return np.nan
+        lower = self.select_rank(column, (count - 1) // 2, low, high)
+        if count % 2:
+            return float(lower)
+        not_above, upper = 0, np.inf
+        for _, block in self.iter_blocks([column]):
+            values = block[:, 0]
+            not_above += np.count_nonzero(values <= lower)
+            bigger = values[values > lower]
+            if bigger.size:
+                upper = min(upper, bigger.min())
+        if not_above > count // 2:
+            upper = lower  # El valor central se repite
+        return float(np.mean([lower, upper]))
+
+    def select_rank(self, column, rank, low, high):
+        """
+        Valor de la posición rank (desde 0) de los valores no vacíos ordenados, que
+        están entre low y high. Cada pasada por bloques cuenta los valores del
+        intervalo actual en MEDIAN_BINS intervalos y se queda con el que contiene la
+        posición, hasta que tiene pocos valores (o todos iguales) y se ordenan.
+        La memoria es la de un bloque más MEDIAN_EXACT_ROWS valores.
+        """
+        below, closed = 0, True  # Valores menores que low; si el intervalo incluye high
+        for _ in range(MEDIAN_MAX_PASSES):
+            if low == high:
+                return low
+            counts = np.zeros(MEDIAN_BINS, dtype=np.int64)
+            inside_low, inside_high = np.inf, -np.inf
+            for _, block in self.iter_blocks([column]):
+                values = block[:, 0]
+                inside = values[(values >= low) & ((values <= high) if closed else (values < high))]
+                if inside.size:
+                    counts += np.histogram(inside, MEDIAN_BINS, range=(low, high))[0]
+                    inside_low, inside_high = min(inside_low, inside.min()), max(inside_high, inside.max())
+            if inside_low == inside_high:
+                return inside_low
+            edges = np.histogram_bin_edges(np.empty(0), MEDIAN_BINS, range=(low, high))
+            cumulative = below + np.cumsum(counts)
+            selected = int(np.searchsorted(cumulative, rank, side="right"))
+            below = int(cumulative[selected - 1]) if selected else below
+            closed = closed and selected == MEDIAN_BINS - 1
+            low, high = edges[selected], edges[selected + 1]
+            if counts[selected] <= MEDIAN_EXACT_ROWS:
+                break
+        values = np.concatenate([block[:, 0][(block[:, 0] >= low) & ((block[:, 0] <= high) if closed
+                                                                      else (block[:, 0] < high))]
+                                 for _, block in self.iter_blocks([column])])
+        return np.partition(values, rank - below)[rank - below]
+
+    def fill_missing(self, column, value):
+        """Rellena los valores vacíos de la columna directamente en el archivo."""
+        array = self.arrays[column]
+        for start in range(0, self.n_rows, CHUNK_SIZE):
+            block = array[start:start + CHUNK_SIZE]
+            block[np.isnan(block)] = value
+        array.flush()
+        self._missing_counts.pop(column, None)
+
+    def missing_positions(self, column):
+        """Posiciones de los valores vacíos de la columna."""
+        return np.concatenate([start + np.flatnonzero(np.isnan(block[:, 0]))
+                               for start, block in self.iter_blocks([column])] or [np.empty(0, dtype=np.int64)])
+
+    def set_values(self, column, positions, value):
+        """Escribe value en las posiciones indicadas de la columna."""
+        array = self.arrays[column]
+        array[positions] = value
+        array.flush()
+        self._missing_counts.pop(column, None)
+
+    def sample(self, columns, max_rows=10000):
+        """Devuelve como DataFrame una muestra de filas repartidas por todo el almacén."""
+        step = max(1, self.n_rows // max_rows)
+        return pd.DataFrame({column: np.asarray(self.arrays[column][::step]) for column in columns})
+
+    def delete(self):
+        """Cierra los arrays y borra los archivos del almacén."""
+        self.arrays = {}
+        shutil.rmtree(self.store_dir, ignore_errors=True)
@@ -0,0 +1,320 @@
+import os
+import sqlite3
+from bisect import bisect_right
+import numpy as np
+import pandas as pd
+
+# Número de filas que se leen en cada bloque al cargar un archivo
+CHUNK_SIZE = 50000
+# Bloques más pequeños en la carga progresiva para mostrar pronto las primeras filas
+STREAMING_CHUNK_SIZE = 5000
+# Formatos de texto que merece la pena guardar en la caché de datos
+CACHEABLE_EXTENSIONS = ['.csv', '.xlsx', '.xls']
+# Proporción máxima de valores distintos para convertir una columna de texto en categórica
+CATEGORY_RATIO = 0.5
+
+
+class LoadCancelled(Exception):
+    """Se lanza cuando el usuario cancela la carga de un archivo."""
+
+
+def get_first_table(conn):
+    """Devuelve el nombre de la primera tabla de una base de datos SQLite."""
+    query = "SELECT name FROM sqlite_master WHERE type='table';"
+    tables = pd.read_sql(query, conn)
+    if tables.empty:
+        raise ValueError("The SQLite file doesn't contain any tables.")
+    return tables['name'][0]
+
+
+def list_sheets(file_name):
+    """Devuelve los nombres de las hojas de un Excel sin leer sus datos."""
+    if os.path.splitext(file_name)[1].lower() == '.xlsx':
+        from openpyxl import load_workbook
+        workbook = load_workbook(file_name, read_only=True)
+        try:
+            return workbook.sheetnames
+        finally:
+            workbook.close()
+    with pd.ExcelFile(file_name) as excel:
+        return excel.sheet_names
+
+
+def excel_header(row):
+    """Nombres de columna a partir de la primera fila, como los genera pd.read_excel."""
+    header, seen = [], {}
+    for position, value in enumerate(row):
+        name = f"Unnamed: {position}" if value is None else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        header.append(name)
+    return header
+
+
+def excel_chunk(rows, header):
+    """Crea un bloque a partir de filas de openpyxl, convirtiendo los float enteros en int."""
+    rows = [[int(value) if type(value) is float and value.is_integer() else value for value in row]
+            for row in rows]
+    chunk = pd.DataFrame(rows, columns=header)
+    for column in chunk.columns[chunk.dtypes == object]:
+        chunk[column] = chunk[column].where(chunk[column].notna(), np.nan)
+    return chunk
+
+
+def iter_excel_chunks(file_name, chunk_size=CHUNK_SIZE, sheet_name=None):
+    """
+    Lee una hoja de un .xlsx por bloques con el modo de solo lectura de openpyxl,
+    que recorre el archivo fila a fila sin cargar el libro entero.
+    """
+    # openpyxl solo se importa al abrir un Excel, para no retrasar el arranque
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_name, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook[sheet_name] if sheet_name is not None else workbook.worksheets[0]
+        total_rows = sheet.max_row or 0
+        rows = sheet.iter_rows(values_only=True)
+        first_row = next(rows, None)
+        if first_row is None:
+            return
+        # Se descartan las celdas vacías al final de la cabecera
+        width = max((position + 1 for position, value in enumerate(first_row) if value is not None), default=0)
+        header = excel_header(first_row[:width])
+
+        buffer, empty_rows, done = [], [], 1
+        for row in rows:
+            done += 1
+            row = list(row[:width]) + [None] * (width - len(row))
+            # Las filas vacías solo se añaden si después hay más datos
+            if all(value is None for value in row):
+                empty_rows.append(row)
+                continue
+            buffer.extend(empty_rows)
+            empty_rows = []
+            buffer.append(row)
+            if len(buffer) >= chunk_size:
+                yield excel_chunk(buffer, header), done, max(total_rows, done)
+                buffer = []
+        if buffer:
+            yield excel_chunk(buffer, header), done, done
+        elif done == 1:
+            yield pd.DataFrame(columns=header), 1, 1
+    finally:
+        workbook.close()
+
+
+def iter_file_chunks(file_name, chunk_size=CHUNK_SIZE, sheet_name=None, columns=None):
+    """
+    Lee el archivo por bloques de filas.
+    Devuelve tuplas (bloque, leido, total) donde leido/total miden el avance
+    en bytes (CSV) o en filas (Excel, SQLite). sheet_name elige la hoja de un
+    Excel (por defecto, la primera). Con columns solo se leen esas columnas
+    (en CSV y SQLite sin llegar a leer las demás).
+    """
+    file_extension = os.path.splitext(file_name)[1].lower()
+
+    if file_extension == '.csv':
+        total = os.path.getsize(file_name)
+        with open(file_name, 'rb') as handle:
+            for chunk in pd.read_csv(handle, chunksize=chunk_size, usecols=columns):
+                yield (chunk if columns is None else chunk[columns]), handle.tell(), total
+    elif file_extension == '.xlsx':
+        for chunk, done, total in iter_excel_chunks(file_name, chunk_size, sheet_name):
+            yield (chunk if columns is None else chunk[columns]), done, total
+    elif file_extension == '.xls':
+        # El formato antiguo no admite lectura por filas: se lee la hoja entera
+        df = pd.read_excel(file_name, sheet_name=sheet_name if sheet_name is not None else 0, usecols=columns)
+        yield (df if columns is None else df[columns]), 1, 1
+    elif file_extension in ['.sqlite', '.db']:
+        conn = sqlite3.connect(file_name)
+        try:
+            first_table = get_first_table(conn)
+            total = conn.execute(f'SELECT COUNT(*) FROM "{first_table}";').fetchone()[0]
+            selected = "*" if columns is None else ", ".join('"' + column.replace('"', '""') + '"' for column in columns)
+            done = 0
+            for chunk in pd.read_sql(f'SELECT {selected} FROM "{first_table}";', conn, chunksize=chunk_size):
+                done += len(chunk)
+                yield chunk, done, total
+        finally:
+            conn.close()
+    else:
+        raise ValueError(f"Extensión de archivo no soportada: {file_extension}")
+
+
+def downcast_column(series):
+    """
+    Devuelve la columna numérica con el tipo más pequeño que conserva todos sus valores.
+    Los float con valores enteros y sin huecos pasan a enteros, y los float solo
+    pasan a float32 si ningún valor cambia al convertirlos.
+    """
+    if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+        return series
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast='integer')
+
+    values = series.to_numpy()
+    finite = np.isfinite(values)
+    if finite.all() and np.array_equal(values, np.round(values)):
+        return pd.to_numeric(series, downcast='integer')
+    if series.dtype != np.float32:
+        as_float32 = values.astype(np.float32)
+        same = (as_float32.astype(values.dtype) == values) | ~finite
+        if same.all():
+            return pd.Series(as_float32, index=series.index, name=series.name)
+    return series
+
+
+def compact_dataframe(df, category_ratio=CATEGORY_RATIO):
+    """
+    Reduce la memoria del DataFrame: reduce el tipo de las columnas numéricas y
+    convierte en categóricas las columnas de texto con pocos valores distintos.
+    La memoria antes y después (bytes) queda en df.attrs["memory_usage"].
+    """
+    memory_before = int(df.memory_usage(deep=True).sum())
+    compacted = {}
+    for column in df.columns:
+        series = df[column]
+        if series.dtype == object:
+            values = series.dropna()
+            if len(values) and values.map(type).eq(str).all() and series.nunique() <= category_ratio * len(series):
+                series = series.astype('category')
+        else:
+            series = downcast_column(series)
+        compacted[column] = series
+
+    compact_df = pd.DataFrame(compacted, index=df.index)
+    compact_df.attrs["memory_usage"] = {"before": memory_before,
+                                        "after": int(compact_df.memory_usage(deep=True).sum())}
+    return compact_df
+
+
+class ChunkedFrame:
+    """
+    Filas de un archivo que se lee por bloques, guardadas por columnas: cada
+    columna es una lista de trozos (una Series por bloque) con la fila inicial de
+    cada uno. concat une las columnas de una en una y suelta los trozos de cada
+    una en cuanto la ha unido, de modo que la memoria máxima es la del resultado
+    más una columna, no el doble como al concatenar los bloques enteros. Durante
+    una carga progresiva la tabla muestra las filas desde aquí (ver
+    DataTableModel.append_chunk), así que no guarda los bloques por su cuenta.
+    Cada columna se sustituye entera (una tupla), para que la tabla pueda leerla
+    desde otro hilo mientras se unen.
+    """
+    def __init__(self):
+        self.header = None  # DataFrame sin filas con las columnas del primer bloque
+        self.parts = []  # Por posición de columna: (filas iniciales, trozos)
+        self.n_rows = 0
+
+    def append(self, chunk, copy=True):
+        """
+        Añade un bloque. Con copy, cada columna se copia aparte, para poder soltarla
+        sin que el resto del bloque la mantenga en memoria.
+        """
+        if self.header is None:
+            self.header = chunk.iloc[:0]
+            self.parts = [([], []) for _ in range(chunk.shape[1])]
+        for position, (offsets, pieces) in enumerate(self.parts):
+            column = chunk.iloc[:, position]
+            pieces.append(column.copy() if copy else column)
+            offsets.append(self.n_rows)
+        self.n_rows += len(chunk)
+
+    def values(self, column, start, stop):
+        """Valores de la columna (por posición) entre las filas start y stop."""
+        offsets, pieces = self.parts[column]
+        stop = min(stop, self.n_rows)
+        result = []
+        position = bisect_right(offsets, start) - 1
+        while start < stop:
+            piece = pieces[position].iloc[start - offsets[position]:stop - offsets[position]]
+            result.append(piece)
+            start += len(piece)
+            position += 1
+        if not result:
+            return pieces[0].iloc[:0]
+        return result[0] if len(result) == 1 else pd.concat(result)
+
+    def concat(self):
+        """Une cada columna en una sola Series y devuelve el DataFrame completo."""
+        columns = {}
+        for position in range(len(self.parts)):
+            _, pieces = self.parts[position]
+            if len(pieces) == 1:
+                series = pieces[0].reset_index(drop=True)
+            else:
+                series = pd.concat(pieces, ignore_index=True)
+            self.parts[position] = ([0], [series])
+            del pieces
+            columns[position] = series
+        df = pd.DataFrame(columns, copy=False)
+        df.columns = self.header.columns
+        return df
+
+
+def read_file(file_name, progress=None, is_cancelled=None, chunk_size=CHUNK_SIZE, on_chunk=None, cache=None,
+              compact=False, sheet_name=None):
+    """
+    Carga el archivo completo como DataFrame.
+    progress(leido, total) se llama tras cada bloque y is_cancelled() permite
+    abortar la lectura entre bloques lanzando LoadCancelled.
+    on_chunk(frame) recibe el ChunkedFrame con las filas leídas tras cada bloque no
+    vacío, para mostrarlas antes de que termine la carga.
+    Si se indica una DatasetCache, los CSV y Excel se leen de ella cuando el
+    archivo no ha cambiado y se guardan en ella tras leerlos.
+    Con compact=True se reducen los tipos de las columnas (ver compact_dataframe).
+    sheet_name elige la hoja de un Excel.
+    Devuelve None si el archivo está vacío.
+    """
+    cacheable = cache is not None and os.path.splitext(file_name)[1].lower() in CACHEABLE_EXTENSIONS
+    if cacheable:
+        df = cache.get(file_name, variant=sheet_name)
+        if df is not None:
+            if on_chunk is not None:
+                frame = ChunkedFrame()
+                frame.append(df, copy=False)
+                on_chunk(frame)
+            if progress is not None:
+                progress(1, 1)
+            return compact_dataframe(df) if compact else df
+
+    try:
+        # Los bloques se guardan por columnas y se unen columna a columna (ver ChunkedFrame)
+        frame = ChunkedFrame()
+        for chunk, done, total in iter_file_chunks(file_name, chunk_size, sheet_name):
+            if is_cancelled is not None and is_cancelled():
+                raise LoadCancelled()
+            frame.append(chunk)
+            if on_chunk is not None and not chunk.empty:
+                on_chunk(frame)
+            del chunk
+            if progress is not None:
+                progress(done, total)
+
+        if frame.header is None:
+            raise ValueError("No data found.")
+        df = frame.concat()
+
+        if df.empty:
+            raise ValueError("No data found.")
+
+        if cacheable:
+            cache.put(file_name, df, variant=sheet_name)
+        return compact_dataframe(df) if compact else df
+
+    except LoadCancelled:
+        raise
+
+    except pd.errors.EmptyDataError:
+        print(f"Empty File: File contains no data.")
+        return None
+
+    except ValueError as ve:
+        if "excel file format cannot be determined" in str(ve).lower():
+            raise RuntimeError("Corrupt or unreadable file: Unable to determine file format.")
+
+        raise ValueError(str(ve))
+
+    except Exception as e:
+        raise Exception(f"Unexpected error: {str(e)}")
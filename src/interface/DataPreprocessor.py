@@ -1,46 +1,347 @@
+import numpy as np
 import pandas as pd
+import threading
 from PyQt5.QtWidgets import (QPushButton, QLabel, QComboBox, QLineEdit,
-                             QVBoxLayout, QWidget, QMessageBox, QGroupBox)
+                             QVBoxLayout, QHBoxLayout, QWidget, QMessageBox, QGroupBox, QProgressBar)
 from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal
 from PyQt5.QtGui import QColor
 
+from MissingIndex import MissingValueIndex
+from Imputation import IMPUTERS, ImputationCancelled, impute
+
+
+# Número máximo de pasos de preprocesado que se pueden deshacer
+MAX_HISTORY = 20
 
 
 class DataPreprocessorModel:
     def __init__(self):
         self.df = pd.DataFrame()
+        self.store = None  # ColumnStore cuando los datos se leen desde disco
+        self.touched_columns = []  # Columnas que cambió el último preprocesado
+        self.fill_counts = {}  # Celdas rellenadas por columna en el último preprocesado
+        self.removed_rows = None  # Filas quitadas (solo con "Remove Rows")
+        # Pasos que se pueden deshacer y rehacer. Cada paso guarda solo lo que cambió:
+        # las columnas anteriores y nuevas, las filas quitadas o las celdas rellenadas en disco
+        self.undo_stack = []
+        self.redo_stack = []
+        # Pasos aplicados, en forma declarativa (estrategia, columnas y valores de relleno),
+        # para repetirlos con datos nuevos al predecir (ver PreprocessingPipeline)
+        self.steps = []
+        # Vacíos de cada columna, indexados al cargar y actualizados con cada paso
+        self.missing_index = MissingValueIndex()
 
-    def set_dataframe(self, df):
+    def set_dataframe(self, df, store=None):
         self.df = df
+        self.store = store
+        self.missing_index.build(df, store)
+        self.clear_history()
+
+    def clear_history(self):
+        self.undo_stack = []
+        self.redo_stack = []
+        self.steps = []
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def push_step(self, step):
+        self.undo_stack.append(step)
+        del self.undo_stack[:-MAX_HISTORY]
+        self.redo_stack = []
+        self.steps.append(step["recipe"])
+
+    def undo(self):
+        """Deshace el último paso. Devuelve False si no hay nada que deshacer."""
+        if not self.undo_stack:
+            return False
+        step = self.undo_stack.pop()
+        if step["kind"] == "columns":
+            self.set_columns(step["before"])
+        elif step["kind"] == "rows":
+            # Se vuelven a poner las filas quitadas en su posición original
+            kept = np.ones(len(self.df) + len(step["positions"]), dtype=bool)
+            kept[step["positions"]] = False
+            order = np.argsort(np.concatenate([np.flatnonzero(kept), step["positions"]]), kind="stable")
+            self.df = pd.concat([self.df, step["rows"]]).iloc[order]
+            self.missing_index.insert_rows(step["positions"], step["rows"].isna())
+        elif step["kind"] == "store":
+            for column, positions in step["positions"].items():
+                self.store.set_values(column, positions, np.nan)
+        if "missing" in step:
+            self.missing_index.restore(step["missing"])
+        self.touched_columns = step["columns"]
+        self.redo_stack.append(step)
+        self.steps.pop()
+        return True
+
+    def redo(self):
+        """Vuelve a aplicar el último paso deshecho. Devuelve False si no hay ninguno."""
+        if not self.redo_stack:
+            return False
+        step = self.redo_stack.pop()
+        if step["kind"] == "columns":
+            self.set_columns(step["after"])
+        elif step["kind"] == "rows":
+            kept = np.ones(len(self.df), dtype=bool)
+            kept[step["positions"]] = False
+            self.df = self.df[kept]
+            self.missing_index.remove_rows(step["positions"])
+        elif step["kind"] == "store":
+            for column, positions in step["positions"].items():
+                self.store.set_values(column, positions, step["values"][column])
+        if "missing_after" in step:
+            self.missing_index.restore(step["missing_after"])
+        self.touched_columns = step["columns"]
+        self.undo_stack.append(step)
+        self.steps.append(step["recipe"])
+        return True
+
+    def set_columns(self, columns):
+        """Sustituye columnas enteras del DataFrame (Series guardadas en el historial)."""
+        for column, values in columns.items():
+            self.df[column] = values
 
     def get_dataframe(self):
         return self.df
 
     def preprocess_missing_data(self, columns, strategy, constant_value=None):
+        """
+        Trata los valores vacíos de las columnas con la estrategia elegida.
+        Las medias o medianas de todas las columnas se calculan de una vez y se
+        asignan en una sola operación. Después, fill_counts indica cuántas celdas
+        se rellenaron en cada columna y removed_rows cuántas filas se quitaron.
+        """
+        self.fill_counts = {}
+        self.removed_rows = None
+        if strategy in IMPUTERS:
+            if self.store is not None:
+                return False
+            # Normalmente se calculan en segundo plano (ver ImputationWorker); aquí, en el mismo hilo
+            columns, values = self.imputation_input(columns)
+            if not columns:
+                return False
+            return self.apply_imputation(columns, strategy, values, impute(strategy, values))
+        if self.store is not None:
+            return self.preprocess_store(columns, strategy, constant_value)
+
+        # Los vacíos se leen del índice, sin recorrer las columnas
+        missing = self.missing_index.missing_counts(columns)
         if strategy == "Remove Rows":
-            self.df.dropna(subset=columns, inplace=True)
-        elif strategy == "Fill with Mean":
-            for column in columns:
-                if self.df[column].dtype in ['float64', 'int64']:
-                    self.df[column].fillna(self.df[column].mean(), inplace=True)
+            # Para deshacer basta con guardar las filas quitadas y su posición
+            positions = self.missing_index.rows_with_missing(columns)
+            removed = self.df.iloc[positions]
+            kept = np.ones(len(self.df), dtype=bool)
+            kept[positions] = False
+            self.df = self.df[kept]
+            self.missing_index.remove_rows(positions)
+            self.removed_rows = len(positions)
+            # Quitar filas cambia todas las columnas
+            self.touched_columns = list(self.df.columns) if self.removed_rows else []
+            if self.removed_rows:
+                self.push_step({"kind": "rows", "positions": positions, "rows": removed,
+                                "columns": self.touched_columns,
+                                "recipe": {"strategy": strategy, "columns": list(columns), "values": {}}})
+            return True
+
+        # Cada asignación sustituye la columna, así que la Series anterior se guarda sin copiarla
+        before = {column: self.df[column] for column in columns}
+        values = pd.Series(dtype=object)
+        if strategy == "Fill with Mean":
+            values = self.df[self.numeric_columns(columns)].mean()
+            self.fill_values(values)
         elif strategy == "Fill with Median":
-            for column in columns:
-                if self.df[column].dtype in ['float64', 'int64']:
-                    self.df[column].fillna(self.df[column].median(), inplace=True)
+            values = self.df[self.numeric_columns(columns)].median()
+            self.fill_values(values)
         elif strategy == "Fill with Constant Value" and constant_value is not None:
             try:
                 constant_value = float(constant_value)
             except ValueError:
                 return False
-            self.df[columns] = self.df[columns].fillna(constant_value)
-        
+            # Las columnas categóricas (carga compacta) necesitan la categoría antes de rellenar
+            for column in columns:
+                if isinstance(self.df[column].dtype, pd.CategoricalDtype) \
+                        and constant_value not in self.df[column].cat.categories:
+                    self.df[column] = self.df[column].cat.add_categories([constant_value])
+            values = pd.Series(constant_value, index=columns)
+            self.fill_values(values)
+
+        # fillna rellena todos los vacíos de las columnas que tienen valor
+        values = values.dropna()
+        self.fill_counts = {column: missing[column] if column in values.index else 0 for column in columns}
+        self.touched_columns = [column for column, count in self.fill_counts.items() if count]
+        if self.touched_columns:
+            snapshot = self.missing_index.snapshot(self.touched_columns)
+            for column in self.touched_columns:
+                self.missing_index.clear(column)
+            self.push_step({"kind": "columns", "columns": self.touched_columns,
+                            "before": {column: before[column] for column in self.touched_columns},
+                            "missing": snapshot, "missing_after": self.missing_index.snapshot(self.touched_columns),
+                            "after": {column: self.df[column] for column in self.touched_columns},
+                            "recipe": {"strategy": strategy, "columns": list(columns),
+                                       "values": {column: float(value) for column, value in values.items()}}})
+        return True
+
+    def numeric_columns(self, columns):
+        """Columnas numéricas de la lista, sea cual sea su tipo (float32, Int64...), sin las booleanas."""
+        return [column for column in columns
+                if pd.api.types.is_numeric_dtype(self.df[column]) and not pd.api.types.is_bool_dtype(self.df[column])]
+
+    def fill_values(self, values):
+        """
+        Rellena los vacíos de cada columna del índice de values con su valor, en una
+        sola asignación. Las columnas enteras con huecos (Int64) pasan a float64 si
+        el valor no es entero.
+        """
+        values = values.dropna()  # Columnas sin ningún valor: no hay media que poner
+        if values.empty:
+            return
+        columns = list(values.index)
+        subset = self.df[columns]
+        casts = {column: "float64" for column in columns
+                 if pd.api.types.is_integer_dtype(subset[column]) and not float(values[column]).is_integer()}
+        if casts:
+            subset = subset.astype(casts)
+        self.df[columns] = subset.fillna(values)
+
+    def preprocess_store(self, columns, strategy, constant_value=None):
+        """Rellena los valores vacíos de un ColumnStore. No se pueden eliminar filas."""
+        if strategy == "Fill with Constant Value":
+            try:
+                constant_value = float(constant_value)
+            except (TypeError, ValueError):
+                return False
+        missing = self.missing_index.missing_counts(columns)
+        step = {"kind": "store", "positions": {}, "values": {}, "missing": self.missing_index.snapshot(columns),
+                "recipe": {"strategy": strategy, "columns": list(columns), "values": {}}}
+        for column in columns:
+            if not missing[column]:
+                continue
+            if strategy == "Fill with Mean":
+                value = self.store.mean(column)
+            elif strategy == "Fill with Median":
+                value = self.store.median(column)
+            elif strategy == "Fill with Constant Value":
+                value = constant_value
+            else:
+                continue
+            if np.isnan(value):
+                continue  # Columna sin ningún valor: no hay media que poner
+            # Para deshacer se guardan solo las posiciones de las celdas rellenadas
+            step["positions"][column] = self.missing_index.positions(column)
+            step["values"][column] = value
+            step["recipe"]["values"][column] = float(value)
+            self.store.fill_missing(column, value)
+            self.missing_index.clear(column)
+            self.fill_counts[column] = missing[column]
+        self.touched_columns = list(self.fill_counts)
+        if self.touched_columns:
+            step["columns"] = self.touched_columns
+            step["missing_after"] = self.missing_index.snapshot(self.touched_columns)
+            self.push_step(step)
+        return True
+
+    def imputation_input(self, columns):
+        """
+        Devuelve las columnas numéricas de la lista y una copia de sus valores como
+        array float64, que es lo que reciben las estrategias de Imputation (también
+        desde otro hilo, sin tocar el DataFrame). Solo con el DataFrame en memoria:
+        las estrategias necesitan todas las filas a la vez y un ColumnStore no cabe.
+        """
+        columns = self.numeric_columns(columns)
+        return columns, self.df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def apply_imputation(self, columns, strategy, values, imputed):
+        """
+        Escribe en las celdas que estaban vacías los valores calculados por una
+        estrategia de Imputation (imputed tiene las mismas filas y columnas que
+        values) y registra el paso para poder deshacerlo.
+        """
+        self.fill_counts = {}
+        self.removed_rows = None
+        still_missing = np.isnan(imputed)
+        filled = np.isnan(values) & ~still_missing
+        self.fill_counts = {column: int(filled[:, position].sum()) for position, column in enumerate(columns)}
+        touched = {column: position for position, column in enumerate(columns) if self.fill_counts[column]}
+        self.touched_columns = list(touched)
+        if not touched:
+            return True
+
+        snapshot = self.missing_index.snapshot(self.touched_columns)
+        for column, position in touched.items():
+            self.missing_index.set_mask(column, still_missing[:, position])
+        step = {"kind": "columns", "before": {column: self.df[column] for column in touched}}
+        for column, position in touched.items():
+            series = pd.Series(imputed[:, position], index=self.df.index, name=column)
+            # Las columnas float conservan su tipo; las enteras pasan a float64
+            if pd.api.types.is_float_dtype(self.df[column]):
+                series = series.astype(self.df[column].dtype)
+            self.df[column] = series
+        step["after"] = {column: self.df[column] for column in touched}
+        step["columns"] = self.touched_columns
+        step["missing"] = snapshot
+        step["missing_after"] = self.missing_index.snapshot(self.touched_columns)
+        # Al predecir no se tienen las filas de entrenamiento: los huecos se rellenan con la media ya imputada
+        step["recipe"] = {"strategy": strategy, "columns": list(columns),
+                          "values": {column: float(np.nanmean(imputed[:, position]))
+                                     for column, position in touched.items()}}
+        self.push_step(step)
         return True
 
     def get_missing_cells(self, columns):
-        return self.df[columns].isna()
+        """Array booleano (filas, columnas) con los vacíos de las columnas, sacado del índice."""
+        return self.missing_index.masks(columns)
+
+    def get_column_index(self, column):
+        if self.store is not None:
+            return self.store.columns.index(column)
+        return self.df.columns.get_loc(column)
+
+class ImputationWorker(QObject):
+    """
+    Calcula en un hilo secundario una estrategia de Imputation (KNN, regresión
+    iterativa), para no bloquear la interfaz con tablas grandes.
+    """
+    progress = pyqtSignal(int)  # Porcentaje hecho (0-100)
+    finished = pyqtSignal(object)  # Array con los vacíos rellenados
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, strategy, values):
+        super().__init__()
+        self.strategy = strategy
+        self.values = values
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """Solicita la cancelación. Se atiende entre bloques de filas."""
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def report_progress(self, done, total):
+        self.progress.emit(int(done * 100 / total) if total else 100)
+
+    def run(self):
+        try:
+            imputed = impute(self.strategy, self.values, self.report_progress, self.is_cancelled)
+        except ImputationCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.finished.emit(imputed)
+
 
 class DataPreprocessorView(QWidget):
+    preprocessing_applied = pyqtSignal()  # Un preprocesado en segundo plano ha cambiado los datos
+    data_changing = pyqtSignal()  # Se van a cambiar los datos: los hilos que los leen deben parar antes
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.init_ui()
@@ -62,7 +363,8 @@ class DataPreprocessorView(QWidget):
         group_layout.addWidget(self.strategy_label)
 
         self.strategy_combo = QComboBox()
-        self.strategy_combo.addItems(["Remove Rows", "Fill with Mean", "Fill with Median", "Fill with Constant Value"])
+        self.strategy_combo.addItems(["Remove Rows", "Fill with Mean", "Fill with Median", "Fill with Constant Value",
+                                      "Fill with KNN", "Fill with Iterative Regression"])
         group_layout.addWidget(self.strategy_combo)
 
         # Campo para valor constante
@@ -93,9 +395,25 @@ class DataPreprocessorView(QWidget):
         """)
         group_layout.addWidget(self.apply_button)
 
+        # Progreso de las estrategias que se calculan en segundo plano
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setVisible(False)
+        group_layout.addWidget(self.progress_bar)
+
+        # Botones para deshacer y rehacer el preprocesado
+        history_layout = QHBoxLayout()
+        self.undo_button = QPushButton("Undo")
+        self.redo_button = QPushButton("Redo")
+        for button in (self.undo_button, self.redo_button):
+            button.setFont(QFont("Arial", 10, QFont.Bold))
+            button.setEnabled(False)
+            history_layout.addWidget(button)
+        group_layout.addLayout(history_layout)
+
         # Configuración del GroupBox
         self.group_box.setLayout(group_layout)
-        self.group_box.setFixedHeight(200)  # Ajustar el ancho del selector de columnas
+        self.group_box.setFixedHeight(270)  # Ajustar el ancho del selector de columnas
         main_layout.addWidget(self.group_box)
 
         # Botón para resaltar celdas vacías
@@ -120,6 +438,13 @@ class DataPreprocessorController:
         self.model = model
         self.view = view
 
+        # Imputación en segundo plano: hilo y worker en curso, y columnas y valores que recibió
+        self.imputation_worker = None
+        self.imputation_job = None
+        self.running_workers = []
+        # Otro cálculo en segundo plano (la búsqueda de subconjuntos) lee los datos
+        self.blocked = False
+
         # Conectar señales de la vista
         self.view.strategy_combo.currentIndexChanged.connect(self.toggle_constant_input)
 
@@ -141,16 +466,134 @@ class DataPreprocessorController:
             self.view.show_message("Error", "Select entry and target columns.", "warning")
             return False
 
+        if self.model.store is not None and strategy == "Remove Rows":
+            self.view.show_message("Warning", "Rows can't be removed from files loaded from disk.", "warning")
+            return False
+
+        if self.model.store is not None and strategy in IMPUTERS:
+            # KNN e Iterative necesitan todas las filas en memoria, que es justo lo que el almacén evita
+            self.view.show_message("Warning", f"'{strategy}' needs the whole file in memory and isn't available "
+                                              f"for files loaded from disk. Use the mean, median or a constant "
+                                              f"value instead.", "warning")
+            return False
+
         # Procesar columnas seleccionadas
         columns_to_process = entry_columns + ([target_column] if target_column not in entry_columns else [])
+        if strategy in IMPUTERS:
+            # Se aplica al terminar el hilo: la vista lo avisa con preprocessing_applied
+            self.start_imputation(columns_to_process, strategy)
+            return False
+        self.view.data_changing.emit()
         if self.model.preprocess_missing_data(columns_to_process, strategy, constant_value):
-            self.view.show_message("Success", "Changes applied.", "info")
+            self.update_history_buttons()
+            self.view.show_message("Success", "Changes applied.\n" + self.describe_changes(), "info")
             return True
         else:
             self.view.show_message("Warning", "No numeric value", "warning")
             return False
 
-        
+
+    def start_imputation(self, columns, strategy):
+        """Calcula la estrategia en un hilo secundario, mostrando el progreso."""
+        if self.imputation_worker is not None:
+            return
+        columns, values = self.model.imputation_input(columns)
+        if not columns:
+            self.view.show_message("Warning", "No numeric value", "warning")
+            return
+        thread = QThread(self.view)
+        worker = ImputationWorker(strategy, values)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(self.view.progress_bar.setValue)
+        worker.finished.connect(self.on_imputation_done)
+        worker.failed.connect(self.on_imputation_failed)
+        # Directa: el hilo debe poder terminar aunque el principal esté esperando en wait_imputation
+        for signal in (worker.finished, worker.failed, worker.cancelled):
+            signal.connect(thread.quit, Qt.DirectConnection)
+        thread.finished.connect(lambda: self.running_workers.remove((thread, worker)))
+        thread.finished.connect(thread.deleteLater)
+        self.running_workers.append((thread, worker))
+        self.imputation_worker = worker
+        self.imputation_job = (columns, strategy, values)
+        self.set_busy(True)
+        thread.start()
+
+    def on_imputation_done(self, imputed):
+        columns, strategy, values = self.imputation_job
+        self.release_imputation()
+        self.view.data_changing.emit()
+        self.model.apply_imputation(columns, strategy, values, imputed)
+        self.update_history_buttons()
+        self.view.preprocessing_applied.emit()
+        self.view.show_message("Success", "Changes applied.\n" + self.describe_changes(), "info")
+
+    def on_imputation_failed(self, message):
+        self.release_imputation()
+        self.view.show_message("Error", message, "warning")
+
+    def stop_imputation(self):
+        """Cancela la imputación en curso; su resultado ya no se aplica."""
+        worker = self.imputation_worker
+        if worker is not None:
+            worker.cancel()
+            worker.progress.disconnect(self.view.progress_bar.setValue)
+            worker.finished.disconnect(self.on_imputation_done)
+            worker.failed.disconnect(self.on_imputation_failed)
+            self.release_imputation()
+
+    def wait_imputation(self):
+        """Espera a que terminen los hilos de imputación (al cerrar la aplicación)."""
+        self.stop_imputation()
+        for thread, _ in list(self.running_workers):
+            thread.wait()
+
+    def release_imputation(self):
+        self.imputation_worker = None
+        self.imputation_job = None
+        self.set_busy(False)
+
+    def set_busy(self, busy):
+        """Mientras se calcula en segundo plano no se pueden aplicar, deshacer ni rehacer pasos."""
+        self.view.apply_button.setEnabled(not busy and not self.blocked)
+        self.view.progress_bar.setValue(0)
+        self.view.progress_bar.setVisible(busy)
+        self.update_history_buttons()
+
+    def set_blocked(self, blocked):
+        """Bloquea aplicar, deshacer y rehacer mientras otro cálculo en segundo plano lee los datos."""
+        self.blocked = blocked
+        self.view.apply_button.setEnabled(not blocked and self.imputation_worker is None)
+        self.update_history_buttons()
+
+    def undo(self):
+        """Deshace el último preprocesado."""
+        if self.model.can_undo():
+            self.view.data_changing.emit()
+        done = self.model.undo()
+        self.update_history_buttons()
+        return done
+
+    def redo(self):
+        """Rehace el último preprocesado deshecho."""
+        if self.model.can_redo():
+            self.view.data_changing.emit()
+        done = self.model.redo()
+        self.update_history_buttons()
+        return done
+
+    def update_history_buttons(self):
+        busy = self.imputation_worker is not None or self.blocked
+        self.view.undo_button.setEnabled(self.model.can_undo() and not busy)
+        self.view.redo_button.setEnabled(self.model.can_redo() and not busy)
+
+    def describe_changes(self):
+        """Resumen del último preprocesado: filas quitadas o celdas rellenadas por columna."""
+        if self.model.removed_rows is not None:
+            return f"Removed rows: {self.model.removed_rows}"
+        filled = [f"{column}: {count}" for column, count in self.model.fill_counts.items()]
+        return "Filled cells: " + (", ".join(filled) if filled else "0")
+
     def highlight_empty_cells(self, entry_columns, target_column):
         """Resalta las celdas vacías en las columnas seleccionadas."""
         selected_columns = entry_columns + [target_column]
@@ -160,7 +603,7 @@ class DataPreprocessorController:
             return
 
         missing_cells = self.model.get_missing_cells(selected_columns)
-        column_indices = [self.model.df.columns.get_loc(col) for col in selected_columns]
+        column_indices = [self.model.get_column_index(col) for col in selected_columns]
 
         return column_indices, missing_cells
 
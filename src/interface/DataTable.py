@@ -1,15 +1,136 @@
 import os
-import pandas as pd
+import re
 import sqlite3
-from PyQt5.QtWidgets import QHeaderView, QTableView, QSizePolicy, QAbstractScrollArea
-from PyQt5.QtCore import Qt, QAbstractTableModel
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from PyQt5.QtWidgets import (QHeaderView, QTableView, QSizePolicy, QAbstractScrollArea, QMenu, QInputDialog,
+                             QMessageBox, QShortcut)
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject, pyqtSignal
+
+from DataLoader import ChunkedFrame, read_file, get_first_table, list_sheets, LoadCancelled, CHUNK_SIZE, STREAMING_CHUNK_SIZE
+from DatasetCache import DatasetCache
+from ColumnStore import ColumnStore
+from MissingIndex import next_position
+
+# Los archivos a partir de este tamaño se cargan en un ColumnStore en disco
+OUT_OF_CORE_MIN_BYTES = 1024 ** 3
+# Filas de cada bloque de texto ya formateado y número máximo de bloques guardados
+WINDOW_ROWS = 256
+MAX_WINDOWS = 512
+# Filas que se muestran de golpe en cada fetchMore
+FETCH_ROWS = 10000
+# A partir de este número de filas la tabla usa alturas fijas y anchos calculados con una muestra
+LARGE_TABLE_ROWS = 100000
+# Filas que se miden para calcular el ancho de cada columna en tablas grandes
+WIDTH_SAMPLE_ROWS = 100
+
+
+def format_values(values, number_format=None):
+    """
+    Convierte una columna (array o Series) en la lista de textos que muestra la tabla.
+    Las columnas numéricas se formatean de una vez con NumPy; number_format es un
+    formato de estilo printf ("%.2f", "%.3e"...) que no se aplica a los vacíos.
+    """
+    array = values if isinstance(values, np.ndarray) else values.to_numpy()
+    if array.dtype.kind in "biuf":
+        text = array.astype(str).astype(object)
+        if number_format is not None:
+            valid = ~np.isnan(array) if array.dtype.kind == "f" else slice(None)
+            text[valid] = np.char.mod(number_format, array[valid])
+        return text.tolist()
+    return [str(value) for value in values.tolist()]
+
+
+def sort_permutation(values):
+    """
+    Devuelve (orden, válidos): las posiciones de las filas ordenadas de menor a
+    mayor, con los vacíos al final, y el número de valores no vacíos.
+    """
+    array = values.to_numpy() if isinstance(values, pd.Series) else np.asarray(values)
+    if array.dtype.kind in "biuf":
+        order = np.argsort(array, kind="stable")  # NaN queda al final
+        valid = len(array) - int(np.isnan(array).sum()) if array.dtype.kind == "f" else len(array)
+        return order, valid
+    series = pd.Series(values).reset_index(drop=True)
+    try:
+        order = series.sort_values(kind="stable", na_position="last").index.to_numpy()
+    except TypeError:
+        # Columnas con tipos mezclados: se ordenan por su texto
+        order = series.sort_values(kind="stable", na_position="last", key=lambda column: column.astype(str)).index.to_numpy()
+    return order, int(series.notna().sum())
+
+
+FILTER_PATTERN = re.compile(r"^\s*(<=|>=|!=|<|>|=)\s*(.*?)\s*$")
+
+
+def filter_mask(values, text):
+    """
+    Devuelve la máscara de filas que cumplen el filtro text sobre la columna.
+    Admite comparaciones ("> 5", "<= 2.5", "= 3", "!= 0") en columnas numéricas,
+    "= texto" y "!= texto" en el resto, y un texto sin operador, que busca las
+    celdas que lo contienen sin distinguir mayúsculas.
+    Lanza ValueError si la comparación no tiene sentido para la columna.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+    match = FILTER_PATTERN.match(text)
+    if match is None:
+        return series.astype(str).str.contains(text.strip(), case=False, regex=False).to_numpy()
+
+    operator, operand = match.groups()
+    if numeric:
+        try:
+            operand = float(operand)
+        except ValueError:
+            raise ValueError(f"'{operand}' is not a number.")
+        array = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    elif operator in ("=", "!="):
+        array = series.astype(str).to_numpy()
+    else:
+        raise ValueError("Only = and != can be used with text columns.")
+
+    compare = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+               "=": np.equal, "!=": np.not_equal}[operator]
+    return np.asarray(compare(array, operand), dtype=bool)
 
 
 class DataTableModel(QAbstractTableModel):
-    def __init__(self):
+    def __init__(self, window_rows=WINDOW_ROWS, max_windows=MAX_WINDOWS, fetch_rows=FETCH_ROWS):
         super().__init__()
         self.df = pd.DataFrame()  # Inicialmente vacío
         self.backgrounds = {}
+        # Celdas resaltadas: posición de columna -> array booleano por fila, y su color
+        self.highlight = {}
+        self.highlight_color = None
+        # Caché LRU del texto de las celdas: (bloque de filas, columna) -> lista de textos
+        self.window_rows = window_rows
+        self.max_windows = max_windows
+        self.windows = OrderedDict()
+        # Formato de número de cada columna (por nombre), ver format_values
+        self.number_formats = {}
+        self.known_rows = 0
+        # Las filas se van mostrando por tandas de fetch_rows (canFetchMore/fetchMore)
+        self.fetch_rows = fetch_rows
+        self.exposed_rows = 0
+        # Filas recibidas durante una carga progresiva (ChunkedFrame) y cuántas se muestran ya
+        self.stream = None
+        self.streamed_rows = 0
+        # Almacén en disco cuando el archivo no cabe en memoria
+        self.store = None
+        # Orden y filtros de la vista: row_order son las filas del DataFrame que se
+        # muestran, en orden (None muestra todas tal cual). Se guardan los órdenes
+        # ya calculados de cada columna y la máscara de cada filtro.
+        self.row_order = None
+        self.sort_column = -1
+        self.sort_order = Qt.AscendingOrder
+        self.sort_cache = {}
+        self.filters = {}
+        self.filter_masks = {}
+        # Fila de la vista de cada fila del DataFrame (-1 si está filtrada), ver view_rows
+        self.inverse_order = None
 
     def setDataFrame(self, dataframe):
         """
@@ -17,18 +138,131 @@ class DataTableModel(QAbstractTableModel):
         """
         self.beginResetModel()  # Notificar el inicio del cambio de datos
         self.df = dataframe
+        self.store = None
+        self.stream = None
+        self.streamed_rows = 0
+        self.windows.clear()
+        self.highlight = {}
+        self.clear_order()
+        self.known_rows = self.source_rows()
+        self.exposed_rows = min(self.known_rows, self.fetch_rows)
         self.endResetModel()  # Notificar el fin del cambio de datos
 
+    def setColumnStore(self, store):
+        """
+        Muestra las columnas de un ColumnStore, leyendo cada celda del array en disco.
+        """
+        self.beginResetModel()
+        self.df = pd.DataFrame()
+        self.store = store
+        self.backgrounds = {}
+        self.highlight = {}
+        self.stream = None
+        self.streamed_rows = 0
+        self.windows.clear()
+        self.clear_order()
+        self.known_rows = self.source_rows()
+        self.exposed_rows = min(self.known_rows, self.fetch_rows)
+        self.endResetModel()
+
+    def is_streaming(self):
+        """Indica si el modelo está mostrando bloques de una carga progresiva."""
+        return self.stream is not None
+
+    def append_chunk(self, chunk):
+        """
+        Muestra las filas nuevas de una carga progresiva. chunk es el ChunkedFrame
+        de read_file, que la tabla lee sin copiarlo (con las filas que tenga al
+        llegar la señal), o un bloque suelto, que se añade a un ChunkedFrame propio.
+        """
+        if isinstance(chunk, pd.DataFrame):
+            frame = self.stream if self.stream is not None else ChunkedFrame()
+            frame.append(chunk, copy=False)
+            chunk = frame
+        n_rows = chunk.n_rows
+        if self.stream is None:
+            self.beginResetModel()
+            self.df = chunk.header  # Para las cabeceras mientras dura la carga
+            self.backgrounds = {}
+            self.highlight = {}
+            self.stream = chunk
+            self.streamed_rows = n_rows
+            self.windows.clear()
+            self.clear_order()
+            self.known_rows = self.exposed_rows = self.streamed_rows
+            self.endResetModel()
+            return
+        if n_rows <= self.streamed_rows:
+            return
+
+        first_row = self.streamed_rows
+        self.beginInsertRows(QModelIndex(), first_row, n_rows - 1)
+        self.stream = chunk
+        self.streamed_rows = n_rows
+        self.known_rows = self.exposed_rows = self.streamed_rows
+        # El último bloque formateado puede haberse quedado corto
+        last_window = first_row // self.window_rows
+        for key in [key for key in self.windows if key[0] == last_window]:
+            del self.windows[key]
+        self.endInsertRows()
+
+    def finish_streaming(self, dataframe):
+        """
+        Sustituye los bloques por el DataFrame final, que contiene las mismas filas,
+        sin reiniciar la vista.
+        """
+        self.df = dataframe
+        self.stream = None
+        self.streamed_rows = 0
+        self.windows.clear()
+        self.known_rows = self.source_rows()
+
     def rowCount(self, parent=None):
+        """
+        Devuelve el número de filas que se muestran por ahora (ver fetchMore).
+        """
+        return self.exposed_rows
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.exposed_rows < self.total_rows()
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Muestra la siguiente tanda de filas. La vista lo llama al llegar al final."""
+        self.ensure_rows(self.exposed_rows + self.fetch_rows - 1)
+
+    def ensure_rows(self, row):
+        """Muestra todas las filas hasta row (incluida), por ejemplo para saltar a ella."""
+        last_row = min(row + 1, self.total_rows())
+        if last_row <= self.exposed_rows:
+            return
+        self.beginInsertRows(QModelIndex(), self.exposed_rows, last_row - 1)
+        self.exposed_rows = last_row
+        self.endInsertRows()
+
+    def total_rows(self):
+        """
+        Devuelve el número de filas que deja ver el filtro.
+        """
+        if self.row_order is not None:
+            return len(self.row_order)
+        return self.source_rows()
+
+    def source_rows(self):
         """
         Devuelve el número de filas en el DataFrame.
         """
+        if self.store is not None:
+            return self.store.n_rows
+        if self.stream is not None:
+            return self.streamed_rows
         return self.df.shape[0]
 
     def columnCount(self, parent=None):
         """
         Devuelve el número de columnas en el DataFrame.
         """
+        if self.store is not None:
+            return len(self.store.columns)
         return self.df.shape[1]
 
     def data(self, index, role=Qt.DisplayRole):
@@ -36,14 +270,99 @@ class DataTableModel(QAbstractTableModel):
             return None
 
         if role == Qt.DisplayRole:
-            value = self.df.iloc[index.row(), index.column()]
-            return str(value)
-        
+            window, offset = divmod(index.row(), self.window_rows)
+            return self.get_window(window, index.column())[offset]
+
         if role == Qt.BackgroundRole:
+            mask = self.highlight.get(index.column())
+            if mask is not None:
+                row = self.source_row(index.row())
+                if row < len(mask) and mask[row]:
+                    return self.highlight_color
             return self.backgrounds.get((index.row(), index.column()), None)
 
         return None
 
+    def source_row(self, row):
+        """Posición en el DataFrame de una fila de la vista."""
+        return int(self.row_order[row]) if self.row_order is not None else row
+
+    def column_values(self, column, start, stop):
+        """Devuelve los valores de la columna (por posición) entre las filas start y stop de la vista."""
+        if self.row_order is not None:
+            positions = self.row_order[start:stop]
+            if self.store is not None:
+                return np.asarray(self.store.column(self.store.columns[column])[positions])
+            return self.df.iloc[positions, column]
+        if self.store is not None:
+            return np.asarray(self.store.column(self.store.columns[column])[start:stop])
+        if self.stream is not None:
+            return self.stream.values(column, start, min(stop, self.streamed_rows))
+        return self.df.iloc[start:stop, column]
+
+    def column_name(self, column):
+        return self.store.columns[column] if self.store is not None else self.df.columns[column]
+
+    def get_window(self, window, column):
+        """Devuelve el texto de un bloque de filas de una columna, formateándolo si no está en caché."""
+        key = (window, column)
+        if key in self.windows:
+            self.windows.move_to_end(key)
+            return self.windows[key]
+        start = window * self.window_rows
+        values = self.column_values(column, start, start + self.window_rows)
+        text = format_values(values, self.number_formats.get(self.column_name(column)))
+        self.windows[key] = text
+        if len(self.windows) > self.max_windows:
+            self.windows.popitem(last=False)
+        return text
+
+    def set_number_format(self, column, number_format):
+        """
+        Cambia el formato de los números de una columna, por ejemplo "%.2f".
+        Con None se vuelve a mostrar el valor completo.
+        """
+        if number_format is None:
+            self.number_formats.pop(column, None)
+        else:
+            self.number_formats[column] = number_format
+        self.invalidate([column])
+
+    def invalidate(self, columns=None):
+        """
+        Descarta el texto formateado de las columnas indicadas (por nombre; todas
+        si es None) tras cambiar sus datos, y avisa a la vista. Si ha cambiado el
+        número de filas se reinicia el modelo.
+        """
+        if self.source_rows() != self.known_rows:
+            # Los órdenes y máscaras guardados ya no valen: se recalculan con los nuevos datos
+            self.beginResetModel()
+            self.windows.clear()
+            self.highlight = {}
+            self.sort_cache = {}
+            self.filter_masks = {}
+            self.known_rows = self.source_rows()
+            self.update_order()
+            self.exposed_rows = min(self.total_rows(), max(self.exposed_rows, self.fetch_rows))
+            self.endResetModel()
+            return
+        if columns is None:
+            positions = list(range(self.columnCount()))
+        else:
+            names = [self.column_name(position) for position in range(self.columnCount())]
+            positions = [names.index(column) for column in columns if column in names]
+        for position in positions:
+            self.sort_cache.pop(position, None)
+            self.filter_masks.pop(position, None)
+        if self.sort_column in positions or any(position in self.filters for position in positions):
+            self.apply_order()
+            return
+        for key in [key for key in self.windows if key[1] in positions]:
+            del self.windows[key]
+        if positions and self.rowCount():
+            self.dataChanged.emit(self.index(0, min(positions)),
+                                  self.index(self.rowCount() - 1, max(positions)), [Qt.DisplayRole])
+
     def headerData(self, section, orientation, role=Qt.DisplayRole):
         """
         Devuelve los encabezados de las columnas o los índices de las filas.
@@ -51,54 +370,116 @@ class DataTableModel(QAbstractTableModel):
         if role == Qt.DisplayRole:
             if orientation == Qt.Horizontal:
                 # Encabezados de columna
+                if self.store is not None:
+                    return self.store.columns[section]
                 return self.df.columns[section]
             elif orientation == Qt.Vertical:
-                # Encabezados de fila
-                return section + 1 
+                # Encabezados de fila: número de la fila en el archivo
+                return self.source_row(section) + 1
 
         return None
 
-    def load_file(self, file_name):
+    def sort(self, column, order=Qt.AscendingOrder):
         """
-        Carga el archivo seleccionado en el modelo como DataFrame.
+        Ordena la vista por la columna (la llama QTableView al pulsar la cabecera).
+        El orden de cada columna se calcula una vez con argsort; el descendente es
+        el mismo invertido. Con column=-1 se vuelve al orden del archivo.
         """
-        try:
-            file_extension = os.path.splitext(file_name)[1].lower()
-
-            if file_extension == '.csv':
-                df = pd.read_csv(file_name)
-            elif file_extension in ['.xlsx', '.xls']:
-                df = pd.read_excel(file_name)
-            elif file_extension in ['.sqlite', '.db']:
-                conn = sqlite3.connect(file_name)
-                query = "SELECT name FROM sqlite_master WHERE type='table';"
-                tables = pd.read_sql(query, conn)
-                if tables.empty:
-                    raise ValueError("The SQLite file doesn't contain any tables.")
-                first_table = tables['name'][0]
-                df = pd.read_sql(f"SELECT * FROM {first_table};", conn)
-                conn.close()
-            else:
-                raise ValueError(f"Extensión de archivo no soportada: {file_extension}")
-
-            if df.empty:
-                raise ValueError("No data found.")
-
-            self.setDataFrame(df)
-            return True
+        if self.is_streaming():
+            return
+        self.sort_column = column
+        self.sort_order = order
+        self.apply_order()
 
-        except pd.errors.EmptyDataError:
-            print(f"Empty File: File contains no data.")
-            return False
+    def set_filter(self, column, text):
+        """
+        Filtra las filas por el texto de una columna (ver filter_mask).
+        Un texto vacío quita el filtro de la columna.
+        """
+        if self.is_streaming():
+            return
+        if text is None or not text.strip():
+            self.filters.pop(column, None)
+            self.filter_masks.pop(column, None)
+        else:
+            self.filter_masks[column] = filter_mask(self.source_column(column), text)
+            self.filters[column] = text
+        self.apply_order()
 
-        except ValueError as ve:
-            if "excel file format cannot be determined" in str(ve).lower():
-                raise RuntimeError("Corrupt or unreadable file: Unable to determine file format.")
+    def clear_filters(self):
+        self.filters = {}
+        self.filter_masks = {}
+        self.apply_order()
 
-            raise ValueError(str(ve))
-        
-        except Exception as e:
-            raise Exception(f"Unexpected error: {str(e)}") 
+    def clear_order(self):
+        """Quita el orden, los filtros y lo calculado para ellos (sin avisar a la vista)."""
+        self.row_order = None
+        self.inverse_order = None
+        self.sort_column = -1
+        self.sort_order = Qt.AscendingOrder
+        self.sort_cache = {}
+        self.filters = {}
+        self.filter_masks = {}
+
+    def source_column(self, column):
+        """Devuelve la columna completa del DataFrame o del almacén."""
+        if self.store is not None:
+            return self.store.column(self.store.columns[column])
+        return self.df.iloc[:, column]
+
+    def update_order(self):
+        """Calcula row_order combinando el orden de la columna elegida y las máscaras de los filtros."""
+        for column, text in self.filters.items():
+            if column not in self.filter_masks:
+                self.filter_masks[column] = filter_mask(self.source_column(column), text)
+        self.inverse_order = None
+        mask = None
+        for column_mask in self.filter_masks.values():
+            mask = column_mask if mask is None else mask & column_mask
+
+        if 0 <= self.sort_column < self.columnCount():
+            if self.sort_column not in self.sort_cache:
+                self.sort_cache[self.sort_column] = sort_permutation(self.source_column(self.sort_column))
+            order, valid = self.sort_cache[self.sort_column]
+            if self.sort_order == Qt.DescendingOrder:
+                order = np.concatenate([order[:valid][::-1], order[valid:]])
+            self.row_order = order if mask is None else order[mask[order]]
+        else:
+            self.row_order = None if mask is None else np.flatnonzero(mask)
+
+    def view_rows(self, positions):
+        """
+        Devuelve, ordenadas, las filas de la vista en que se muestran las filas del
+        DataFrame indicadas. Las que quedan fuera del filtro no aparecen.
+        """
+        if self.row_order is None:
+            return positions
+        if self.inverse_order is None:
+            self.inverse_order = np.full(self.source_rows(), -1, dtype=np.int64)
+            self.inverse_order[self.row_order] = np.arange(len(self.row_order))
+        rows = self.inverse_order[positions]
+        return np.sort(rows[rows >= 0])
+
+    def apply_order(self):
+        """Recalcula el orden y los filtros y vuelve a mostrar la tabla."""
+        self.beginResetModel()
+        self.windows.clear()
+        self.update_order()
+        self.exposed_rows = min(self.total_rows(), max(self.exposed_rows, self.fetch_rows))
+        self.endResetModel()
+
+    def load_file(self, file_name, cache=None, compact=False, sheet_name=None):
+        """
+        Carga el archivo seleccionado en el modelo como DataFrame.
+        Con compact=True se reducen los tipos de las columnas para ocupar menos memoria.
+        sheet_name elige la hoja de un Excel (por defecto, la primera).
+        """
+        df = read_file(file_name, cache=cache, compact=compact, sheet_name=sheet_name)
+        if df is None:
+            return False
+
+        self.setDataFrame(df)
+        return True
 
     def get_data(self):
         """
@@ -106,6 +487,28 @@ class DataTableModel(QAbstractTableModel):
         """
         return self.df
     
+    def set_highlight(self, column_indices, mask, color):
+        """
+        Resalta con color las celdas marcadas en mask, un array o DataFrame booleano
+        con una columna por cada posición de column_indices. La vista se avisa con
+        un único dataChanged que cubre todas las columnas.
+        """
+        mask = np.asarray(mask, dtype=bool)
+        self.highlight = {column: np.ascontiguousarray(mask[:, position])
+                          for position, column in enumerate(column_indices)}
+        self.highlight_color = color
+        if self.highlight and self.rowCount():
+            self.dataChanged.emit(self.index(0, min(self.highlight)),
+                                  self.index(self.rowCount() - 1, max(self.highlight)), [Qt.BackgroundRole])
+
+    def clear_highlight(self):
+        """Quita el resaltado de las celdas."""
+        columns = list(self.highlight)
+        self.highlight = {}
+        if columns and self.rowCount():
+            self.dataChanged.emit(self.index(0, min(columns)),
+                                  self.index(self.rowCount() - 1, max(columns)), [Qt.BackgroundRole])
+
     def set_background(self, row, column, color):
         """Establece el color de fondo para una celda específica."""
         self.backgrounds[(row, column)] = color
@@ -113,7 +516,128 @@ class DataTableModel(QAbstractTableModel):
         self.dataChanged.emit(self.index(row, column), self.index(row, column))
 
 
+class SQLiteTableModel(QAbstractTableModel):
+    """
+    Modelo de tabla que muestra la primera tabla de una base de datos SQLite sin
+    cargarla en memoria: mantiene la conexión abierta y solo lee las páginas de
+    filas visibles, guardando las últimas en una caché.
+    """
+    def __init__(self, file_name, page_size=200, max_pages=32):
+        super().__init__()
+        self.file_name = file_name
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.pages = OrderedDict()  # Caché LRU: número de página -> filas
+        self.page_last_rowid = {}  # Último rowid de cada página leída, para paginar por clave
+        self.backgrounds = {}
+        self.conn = sqlite3.connect(file_name)
+        try:
+            self.table = get_first_table(self.conn)
+            cursor = self.conn.execute(f'SELECT * FROM "{self.table}" LIMIT 0;')
+            self.columns = [description[0] for description in cursor.description]
+            self.row_count = self.conn.execute(f'SELECT COUNT(*) FROM "{self.table}";').fetchone()[0]
+            self.has_rowid = self._check_rowid()
+        except Exception:
+            self.conn.close()
+            raise
+        if self.row_count == 0:
+            self.conn.close()
+            raise ValueError("No data found.")
+
+    def _check_rowid(self):
+        """Las tablas WITHOUT ROWID no admiten paginación por clave."""
+        try:
+            self.conn.execute(f'SELECT rowid FROM "{self.table}" LIMIT 1;')
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def _fetch_page(self, page):
+        """Lee una página de filas, usando el rowid de la página anterior si se conoce."""
+        if not self.has_rowid:
+            return self.conn.execute(f'SELECT * FROM "{self.table}" LIMIT ? OFFSET ?;',
+                                     (self.page_size, page * self.page_size)).fetchall()
+
+        if page - 1 in self.page_last_rowid:
+            rows = self.conn.execute(f'SELECT rowid, * FROM "{self.table}" WHERE rowid > ? ORDER BY rowid LIMIT ?;',
+                                     (self.page_last_rowid[page - 1], self.page_size)).fetchall()
+        else:
+            rows = self.conn.execute(f'SELECT rowid, * FROM "{self.table}" ORDER BY rowid LIMIT ? OFFSET ?;',
+                                     (self.page_size, page * self.page_size)).fetchall()
+        if rows:
+            self.page_last_rowid[page] = rows[-1][0]
+        return [row[1:] for row in rows]
+
+    def get_page(self, page):
+        """Devuelve una página desde la caché o leyéndola de la base de datos."""
+        if page in self.pages:
+            self.pages.move_to_end(page)
+            return self.pages[page]
+        rows = self._fetch_page(page)
+        self.pages[page] = rows
+        if len(self.pages) > self.max_pages:
+            self.pages.popitem(last=False)
+        return rows
+
+    def rowCount(self, parent=None):
+        return self.row_count
+
+    def total_rows(self):
+        return self.row_count
+
+    def columnCount(self, parent=None):
+        return len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        if role == Qt.DisplayRole:
+            page, offset = divmod(index.row(), self.page_size)
+            rows = self.get_page(page)
+            if offset >= len(rows):
+                return None
+            value = rows[offset][index.column()]
+            return "nan" if value is None else str(value)
+
+        if role == Qt.BackgroundRole:
+            return self.backgrounds.get((index.row(), index.column()), None)
+
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            if orientation == Qt.Horizontal:
+                return self.columns[section]
+            elif orientation == Qt.Vertical:
+                return section + 1
+
+        return None
+
+    def numeric_columns(self, columns):
+        """Indica si las columnas solo tienen números en la primera página (para entrenar sin cargar la tabla)."""
+        rows = self.get_page(0)
+        for column in columns:
+            if column not in self.columns:
+                return False
+            position = self.columns.index(column)
+            if any(not isinstance(row[position], (int, float)) for row in rows if row[position] is not None):
+                return False
+        return True
+
+    def to_dataframe(self):
+        """Carga la tabla completa como DataFrame."""
+        return pd.read_sql(f'SELECT * FROM "{self.table}";', self.conn)
+
+    def close(self):
+        self.conn.close()
+
+
 class DataTableView(QTableView):
+    filter_requested = pyqtSignal(int)  # Columna que se quiere filtrar
+    filter_cleared = pyqtSignal(int)  # Columna cuyo filtro se quita (-1 para todos)
+    missing_requested = pyqtSignal(int, bool)  # Columna en que buscar la siguiente celda vacía (o la anterior)
+
     def __init__(self):
         super().__init__()
         self.setVisible(False)  # Inicialmente oculto
@@ -133,33 +657,331 @@ class DataTableView(QTableView):
             background-color: #4A4A4A;  /* Fondo gris claro para la esquina superior izquierda */
             border: 1px solid #666666;  /* Mismo borde que las cabeceras */
         }""")
-        
+        self.large_table_rows = LARGE_TABLE_ROWS
+        self.max_column_width = 300
+        # Pulsar una cabecera ordena por esa columna; el menú de la cabecera permite filtrar
+        self.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.horizontalHeader().setContextMenuPolicy(Qt.CustomContextMenu)
+        self.horizontalHeader().customContextMenuRequested.connect(self.show_header_menu)
+        # F3 / Mayús+F3 saltan a la celda vacía siguiente o anterior de la columna actual
+        QShortcut(QKeySequence(Qt.Key_F3), self, lambda: self.request_missing(False))
+        QShortcut(QKeySequence(Qt.SHIFT + Qt.Key_F3), self, lambda: self.request_missing(True))
+
+    def show_header_menu(self, position):
+        """Muestra el menú de filtros de la columna pulsada con el botón derecho."""
+        column = self.horizontalHeader().logicalIndexAt(position)
+        if column < 0 or not isinstance(self.model(), DataTableModel):
+            return
+        menu = QMenu(self)
+        menu.addAction("Filter...", lambda: self.filter_requested.emit(column))
+        clear_filter = menu.addAction("Clear Filter", lambda: self.filter_cleared.emit(column))
+        clear_filter.setEnabled(column in self.model().filters)
+        clear_all = menu.addAction("Clear All Filters", lambda: self.filter_cleared.emit(-1))
+        clear_all.setEnabled(bool(self.model().filters))
+        menu.addSeparator()
+        menu.addAction("Next Missing Cell", lambda: self.missing_requested.emit(column, False))
+        menu.addAction("Previous Missing Cell", lambda: self.missing_requested.emit(column, True))
+        menu.exec_(self.horizontalHeader().mapToGlobal(position))
+
+    def request_missing(self, backwards):
+        """Pide la siguiente celda vacía de la columna de la celda actual."""
+        if isinstance(self.model(), DataTableModel) and self.model().columnCount():
+            self.missing_requested.emit(max(self.currentIndex().column(), 0), backwards)
+
+    def select_cell(self, row, column):
+        """Selecciona la celda y la lleva al centro de la tabla."""
+        index = self.model().index(row, column)
+        self.setCurrentIndex(index)
+        self.scrollTo(index, QTableView.PositionAtCenter)
+
+    def ask_filter(self, column_name, current_text):
+        """Pide el filtro de una columna. Devuelve None si se cancela."""
+        text, ok = QInputDialog.getText(self, "Filter", f"Filter for '{column_name}' (e.g. > 5, = 0, text):",
+                                        text=current_text)
+        return text if ok else None
+
+    def show_message(self, title, message):
+        QMessageBox.warning(self, title, message)
+
     def update_table(self, model):
         """
         Actualiza el contenido de la tabla con el modelo.
+        Las tablas grandes no se ajustan al contenido: las filas tienen altura fija
+        y el ancho de cada columna se calcula con una muestra de filas, para que
+        el coste dependa solo de lo que se ve.
         """
         self.setModel(model)
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.setSizeAdjustPolicy(QAbstractScrollArea.AdjustToContents)
-        self.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # Solo el DataTableModel sabe ordenar; se empieza con el orden del archivo
+        self.horizontalHeader().blockSignals(True)
+        self.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.horizontalHeader().blockSignals(False)
+        self.setSortingEnabled(isinstance(model, DataTableModel))
+        if model.total_rows() < self.large_table_rows:
+            self.setSizeAdjustPolicy(QAbstractScrollArea.AdjustToContents)
+            self.verticalHeader().setSectionResizeMode(QHeaderView.Interactive)
+            self.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+            return
+
+        self.setSizeAdjustPolicy(QAbstractScrollArea.AdjustIgnored)
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.verticalHeader().setDefaultSectionSize(self.fontMetrics().height() + 8)
+        self.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        for column in range(model.columnCount()):
+            self.horizontalHeader().resizeSection(column, self.sample_column_width(model, column))
+
+    def sample_column_width(self, model, column):
+        """Ancho de la columna según su cabecera y el texto de las primeras filas."""
+        metrics = self.fontMetrics()
+        texts = [str(model.headerData(column, Qt.Horizontal))]
+        texts += [model.data(model.index(row, column)) or ""
+                  for row in range(min(model.rowCount(), WIDTH_SAMPLE_ROWS))]
+        width = max(metrics.horizontalAdvance(text) for text in texts) + 24
+        return min(width, self.max_column_width)
+
+
+class FileLoaderWorker(QObject):
+    """
+    Carga un archivo en un hilo secundario para no bloquear la interfaz.
+    """
+    progress = pyqtSignal(int)  # Porcentaje leído (0-100)
+    chunk_loaded = pyqtSignal(object)  # Bloque de filas leído (solo en carga progresiva)
+    finished = pyqtSignal(object)  # DataFrame o ColumnStore cargado, o None si el archivo está vacío
+    failed = pyqtSignal(str, str, str)  # Título, mensaje y tipo de mensaje
+    cancelled = pyqtSignal()
+
+    def __init__(self, file_name, streaming=False, chunk_size=CHUNK_SIZE, cache=None, compact=False,
+                 out_of_core=False, sheet_name=None):
+        super().__init__()
+        self.out_of_core = out_of_core
+        self.sheet_name = sheet_name
+        self.file_name = file_name
+        self.streaming = streaming
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self.compact = compact
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """Solicita la cancelación de la carga. Se atiende entre bloques."""
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def report_progress(self, done, total):
+        self.progress.emit(int(done * 100 / total) if total else 100)
+
+    def run(self):
+        try:
+            if self.out_of_core:
+                df = ColumnStore.build(self.file_name, progress=self.report_progress,
+                                       is_cancelled=self.is_cancelled, sheet_name=self.sheet_name)
+                self.finished.emit(df)
+                return
+            on_chunk = self.chunk_loaded.emit if self.streaming else None
+            df = read_file(self.file_name, self.report_progress, self.is_cancelled,
+                           chunk_size=self.chunk_size, on_chunk=on_chunk, cache=self.cache,
+                           compact=self.compact, sheet_name=self.sheet_name)
+        except LoadCancelled:
+            self.cancelled.emit()
+        except ValueError as ve:
+            self.failed.emit("Error", str(ve), "warning")
+        except Exception as e:
+            self.failed.emit("Critical Error", str(e), "critical")
+        else:
+            self.finished.emit(df)
 
 
 class DataTableController:
     def __init__(self, view, model):
         self.view = view
         self.model = model
+        # Carga progresiva: la tabla se va rellenando mientras se lee el archivo
+        self.streaming = True
+        self.streaming_chunk_size = STREAMING_CHUNK_SIZE
+        # Las bases de datos SQLite se muestran por páginas sin cargarlas en memoria
+        self.lazy_sqlite = True
+        self.lazy_model = None
+        # Caché en disco de los CSV y Excel ya leídos
+        self.cache = DatasetCache()
+        # Reducir los tipos de las columnas al cargar (ver compact_dataframe)
+        self.compact = False
+        # Tamaño de archivo a partir del cual se trabaja desde disco con un ColumnStore
+        self.out_of_core_min_bytes = OUT_OF_CORE_MIN_BYTES
+
+        self.view.filter_requested.connect(self.ask_filter)
+        self.view.filter_cleared.connect(self.clear_filter)
+        self.view.missing_requested.connect(self.next_missing)
+        # Índice de vacíos de los datos cargados (MissingValueIndex), para navegar por ellos
+        self.missing_index = None
+
+    def ask_filter(self, column):
+        """Pide el filtro de la columna y lo aplica a la tabla."""
+        text = self.view.ask_filter(self.model.column_name(column), self.model.filters.get(column, ""))
+        if text is None:
+            return
+        try:
+            self.model.set_filter(column, text)
+        except ValueError as ve:
+            self.view.show_message("Filter", str(ve))
+
+    def clear_filter(self, column):
+        if column < 0:
+            self.model.clear_filters()
+        else:
+            self.model.set_filter(column, "")
+
+    def next_missing(self, column, backwards=False):
+        """
+        Selecciona la siguiente celda vacía de la columna (o la anterior), en el orden
+        y con los filtros con que se ve la tabla. Las posiciones salen del índice de
+        vacíos, sin recorrer la columna.
+        """
+        if self.missing_index is None or self.is_lazy() or self.missing_index.n_rows != self.model.source_rows():
+            return
+        name = self.model.column_name(column)
+        rows = self.model.view_rows(self.missing_index.positions(name))
+        current = self.view.currentIndex()
+        row = current.row() if current.isValid() and current.column() == column else -1
+        target = next_position(rows, row, backwards)
+        if target is None:
+            self.view.show_message("Missing Values", f"There are no missing cells in '{name}'.")
+            return
+        self.model.ensure_rows(target)
+        self.view.select_cell(target, column)
 
     def load_file(self, file_name):
         """
         Carga los datos desde el archivo usando el modelo y actualiza la vista.
         """
-        if self.model.load_file(file_name):
+        self.close_lazy_model()
+        self.delete_store()
+        if self.model.load_file(file_name, cache=self.cache, compact=self.compact):
             self.view.update_table(self.model)
             return True
         else:
             self.view.setVisible(False)
             return False
 
+    def use_out_of_core(self, file_name):
+        """Indica si el archivo es tan grande que conviene trabajar con él desde disco."""
+        return os.path.getsize(file_name) >= self.out_of_core_min_bytes \
+            and os.path.splitext(file_name)[1].lower() in ['.csv', '.xlsx', '.sqlite', '.db']
+
+    def can_open_lazily(self, file_name):
+        """Indica si el archivo se puede mostrar por páginas sin cargarlo entero."""
+        return not self.use_out_of_core(file_name) and self.lazy_sqlite and os.path.splitext(file_name)[1].lower() in ['.sqlite', '.db']
+
+    def open_lazily(self, file_name):
+        """
+        Muestra la primera tabla de una base de datos SQLite con un SQLiteTableModel.
+        """
+        try:
+            lazy_model = SQLiteTableModel(file_name)
+        except sqlite3.DatabaseError as e:
+            raise Exception(f"Unexpected error: {str(e)}")
+        self.close_lazy_model()
+        self.delete_store()
+        self.model.setDataFrame(pd.DataFrame())
+        self.lazy_model = lazy_model
+        self.view.update_table(self.lazy_model)
+        return True
+
+    def is_lazy(self):
+        return self.lazy_model is not None
+
+    def current_model(self):
+        """Devuelve el modelo que está mostrando la tabla."""
+        return self.lazy_model if self.lazy_model is not None else self.model
+
+    def materialize(self):
+        """
+        Carga en memoria la tabla SQLite mostrada por páginas y pasa a mostrarla
+        con el DataTableModel. Se usa cuando hace falta el DataFrame completo.
+        """
+        if self.lazy_model is None:
+            return self.model.df
+        df = self.lazy_model.to_dataframe()
+        self.close_lazy_model()
+        self.model.setDataFrame(df)
+        self.view.update_table(self.model)
+        return df
+
+    def close_lazy_model(self):
+        if self.lazy_model is not None:
+            self.lazy_model.close()
+            self.lazy_model = None
+
+    def list_sheets(self, file_name):
+        """Devuelve las hojas del archivo si es un Excel, o una lista vacía."""
+        if os.path.splitext(file_name)[1].lower() not in ['.xlsx', '.xls']:
+            return []
+        return list_sheets(file_name)
+
+    def create_loader(self, file_name, sheet_name=None):
+        """
+        Crea el FileLoaderWorker para el archivo. En modo progresivo cada bloque
+        leído se añade a la tabla en cuanto llega.
+        """
+        if self.use_out_of_core(file_name):
+            return FileLoaderWorker(file_name, out_of_core=True, sheet_name=sheet_name)
+        if not self.streaming:
+            return FileLoaderWorker(file_name, cache=self.cache, compact=self.compact, sheet_name=sheet_name)
+
+        worker = FileLoaderWorker(file_name, streaming=True, chunk_size=self.streaming_chunk_size,
+                                  cache=self.cache, compact=self.compact, sheet_name=sheet_name)
+        worker.chunk_loaded.connect(self.append_chunk)
+        return worker
+
+    def append_chunk(self, chunk):
+        """Añade un bloque a la tabla y la muestra con el primero."""
+        first_chunk = not self.model.is_streaming()
+        self.model.append_chunk(chunk)
+        if first_chunk:
+            self.view.update_table(self.model)
+            self.view.setVisible(True)
+
+    def set_compact(self, compact):
+        """Activa o desactiva la reducción de tipos en las próximas cargas."""
+        self.compact = bool(compact)
+
+    def set_dataframe(self, df):
+        """
+        Muestra en la tabla un DataFrame ya cargado (por ejemplo, desde un FileLoaderWorker).
+        """
+        if df is None:
+            self.clear()
+            return False
+        self.close_lazy_model()
+        self.delete_store()
+        if isinstance(df, ColumnStore):
+            self.model.setColumnStore(df)
+        elif self.model.is_streaming():
+            self.model.finish_streaming(df)
+        else:
+            self.model.setDataFrame(df)
+        self.view.update_table(self.model)
+        return True
+
+    def clear(self):
+        """Vacía y oculta la tabla, por ejemplo tras cancelar una carga."""
+        self.close_lazy_model()
+        self.delete_store()
+        self.model.setDataFrame(pd.DataFrame())
+        self.view.setVisible(False)
+
+    def delete_store(self):
+        """Borra del disco el ColumnStore que se estaba mostrando, si lo hay."""
+        if self.model.store is not None:
+            store = self.model.store
+            self.model.setDataFrame(pd.DataFrame())
+            store.delete()
+
+    def clear_cache(self):
+        """Borra la caché de archivos leídos."""
+        self.cache.clear()
+
     def update_table(self):
         """
         Actualiza el contenido de la tabla con el modelo actual.
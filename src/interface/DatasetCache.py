@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+
+# Tamaño máximo de la caché en disco (bytes)
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+def default_cache_dir():
+    """Devuelve la carpeta de datos de usuario donde se guarda la caché."""
+    if os.environ.get("PROJECTA_CACHE_DIR"):
+        return os.environ["PROJECTA_CACHE_DIR"]
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME", os.path.expanduser("~/.local/share"))
+    return os.path.join(base, "Projecta", "dataset_cache")
+
+
+class DatasetCache:
+    """
+    Caché en disco de los DataFrames ya leídos, para no volver a interpretar el
+    mismo CSV o Excel. Cada entrada se identifica por ruta, tamaño y fecha de
+    modificación del archivo y guarda cada columna como un .npy que se abre
+    mapeado en memoria. Cuando se supera max_bytes se eliminan las entradas
+    usadas hace más tiempo.
+    """
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def key(self, file_name, variant=None):
+        """variant distingue distintas lecturas del mismo archivo, como las hojas de un Excel."""
+        stat = os.stat(file_name)
+        identity = f"{os.path.abspath(file_name)}|{stat.st_size}|{stat.st_mtime_ns}|{variant or ''}"
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+    def entry_dir(self, file_name, variant=None):
+        return os.path.join(self.cache_dir, self.key(file_name, variant))
+
+    def get(self, file_name, variant=None):
+        """Devuelve el DataFrame guardado para el archivo o None si no está en caché."""
+        try:
+            entry = self.entry_dir(file_name, variant)
+            with open(os.path.join(entry, "meta.json"), encoding="utf-8") as handle:
+                meta = json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            data = {}
+            for position, column in enumerate(meta["columns"]):
+                # mmap_mode='c': se lee bajo demanda y los cambios no llegan al disco
+                values = np.load(os.path.join(entry, f"{position}.npy"), mmap_mode="c")
+                if meta["kinds"][position] == "object":
+                    categories = np.load(os.path.join(entry, f"{position}.categories.npy"), allow_pickle=True)
+                    values = np.append(categories, np.nan).take(values)
+                data[column] = values
+            df = pd.DataFrame(data, columns=meta["columns"], copy=False)
+        except (OSError, ValueError, KeyError):
+            self.remove(file_name, variant)
+            return None
+
+        # La fecha de modificación de meta.json marca el último uso (LRU)
+        try:
+            os.utime(os.path.join(entry, "meta.json"))
+        except OSError:
+            pass
+        return df
+
+    def put(self, file_name, df, variant=None):
+        """Guarda el DataFrame en la caché. Devuelve False si no se puede guardar."""
+        if not self.can_store(df):
+            return False
+
+        entry = self.entry_dir(file_name, variant)
+        tmp_entry = f"{entry}.{os.getpid()}.tmp"
+        os.makedirs(tmp_entry, exist_ok=True)
+        try:
+            kinds = []
+            for position, column in enumerate(df.columns):
+                values = df[column].to_numpy()
+                if values.dtype == object:
+                    codes, categories = pd.factorize(values, use_na_sentinel=True)
+                    np.save(os.path.join(tmp_entry, f"{position}.categories.npy"),
+                            np.asarray(categories, dtype=object), allow_pickle=True)
+                    values = np.where(codes < 0, len(categories), codes).astype(np.int32)
+                    kinds.append("object")
+                else:
+                    kinds.append("array")
+                np.save(os.path.join(tmp_entry, f"{position}.npy"), values)
+
+            meta = {"source": os.path.abspath(file_name), "columns": list(df.columns), "kinds": kinds}
+            with open(os.path.join(tmp_entry, "meta.json"), "w", encoding="utf-8") as handle:
+                json.dump(meta, handle)
+
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp_entry, entry)
+        except OSError:
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            return False
+
+        self.evict()
+        return True
+
+    def can_store(self, df):
+        """Solo se guardan columnas con nombre de texto, índice por defecto y tipos de NumPy."""
+        if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+            return False
+        if not all(isinstance(column, str) for column in df.columns) or df.columns.has_duplicates:
+            return False
+        return all(isinstance(dtype, np.dtype) and dtype.kind in "biufMO" for dtype in df.dtypes)
+
+    def entries(self):
+        """Devuelve (ruta, tamaño, último uso) de cada entrada de la caché."""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        result = []
+        for name in os.listdir(self.cache_dir):
+            entry = os.path.join(self.cache_dir, name)
+            meta_file = os.path.join(entry, "meta.json")
+            if not os.path.isfile(meta_file):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, file)) for file in os.listdir(entry))
+            result.append((entry, size, os.path.getmtime(meta_file)))
+        return result
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Elimina las entradas menos usadas hasta quedar por debajo de max_bytes."""
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for entry, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def remove(self, file_name, variant=None):
+        shutil.rmtree(self.entry_dir(file_name, variant), ignore_errors=True)
+
+    def clear(self):
+        """Borra toda la caché."""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
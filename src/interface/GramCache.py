@@ -0,0 +1,229 @@
+import numpy as np
+import pandas as pd
+
+from DataLoader import CHUNK_SIZE
+
+# Al recorrer las filas se aprovecha para incluir las demás columnas numéricas, hasta este total
+GRAM_MAX_COLUMNS = 50
+
+
+def frame_blocks(df, columns, block_size=CHUNK_SIZE):
+    """
+    Bloques de filas de las columnas del DataFrame: tuplas (fila inicial, array
+    float64 filas x columnas). Cada bloque se arma columna a columna, de modo que
+    nunca se copian las columnas enteras (df[columns] lo haría).
+    """
+    series = [df[column] for column in columns]
+    for start in range(0, len(df), block_size):
+        stop = min(start + block_size, len(df))
+        block = np.empty((stop - start, len(series)))
+        for position, values in enumerate(series):
+            block[:, position] = values.iloc[start:stop].to_numpy(dtype=np.float64, na_value=np.nan)
+        yield start, block
+
+
+class GramCache:
+    """
+    Estadísticos suficientes de la regresión lineal para las columnas numéricas
+    de un DataFrame: número de filas, sumas y productos cruzados (XᵀX, Xᵀy) de
+    cada grupo de filas de una división (por ejemplo, entrenamiento y prueba).
+    Se calculan recorriendo las filas una vez por versión de los datos y de la
+    división, y con ellos cualquier subconjunto de columnas se resuelve con las
+    ecuaciones normales en un tiempo que no depende del número de filas.
+    Como StatisticsCache, set_data empieza una versión nueva de los datos y
+    touch marca las columnas que han cambiado, de modo que solo se vuelven a
+    calcular sus productos con las demás.
+    Los valores se desplazan por la media del primer bloque de cada columna antes
+    de multiplicarlos, para no perder precisión con columnas de valores grandes.
+    """
+    def __init__(self, block_size=CHUNK_SIZE, max_columns=GRAM_MAX_COLUMNS):
+        self.block_size = block_size
+        self.max_columns = max_columns
+        self.df = None
+        self.missing_index = None
+        self.data_version = 0
+        self.split_key = None
+        self.groups = None  # Grupo de cada fila (0, 1, ...) o función posiciones -> grupos
+        self.n_groups = 0
+        self.stale = set()  # Columnas con productos que hay que volver a calcular
+        self.reset()
+
+    def reset(self):
+        self.columns = []  # Columnas con estadísticos, en el orden de las matrices
+        self.positions = {}
+        self.shift = np.empty(0)
+        self.counts = np.zeros(self.n_groups)
+        self.sums = np.zeros((self.n_groups, 0))
+        self.products = np.zeros((self.n_groups, 0, 0))
+
+    def set_data(self, df, missing_index=None):
+        """Empieza una versión nueva de los datos. missing_index (MissingValueIndex) evita buscar vacíos."""
+        self.df = df
+        self.missing_index = missing_index
+        self.data_version += 1
+        self.split_key = None
+        self.groups = None
+        self.n_groups = 0
+        self.stale = set()
+        self.reset()
+
+    def touch(self, columns):
+        """Marca las columnas cuyos datos han cambiado."""
+        self.stale.update(column for column in columns if column in self.positions)
+
+    def set_split(self, key, groups, n_groups=None):
+        """
+        Usa la división de filas groups: un array con el grupo de cada fila o, para
+        datos que se leen por bloques, una función que da el grupo de cada posición
+        (con n_groups grupos). key la identifica: si es la misma que la actual se
+        conservan los estadísticos.
+        """
+        if key == self.split_key:
+            return
+        self.split_key = key
+        if callable(groups):
+            self.groups = groups
+            self.n_groups = n_groups
+        else:
+            self.groups = np.asarray(groups)
+            self.n_groups = int(self.groups.max()) + 1 if len(self.groups) else 0
+        self.stale = set()
+        self.reset()
+
+    def usable(self, column):
+        """Si la columna es numérica y no tiene vacíos (solo esas entran en las ecuaciones normales)."""
+        values = self.df[column]
+        if not pd.api.types.is_numeric_dtype(values):
+            return False
+        if self.missing_index is not None and self.missing_index.n_rows == len(self.df):
+            return not self.missing_index.count(column)
+        return not values.isna().any()
+
+    def ensure(self, columns):
+        """
+        Calcula lo que falte de los estadísticos de las columnas. Devuelve False
+        si alguna no es numérica o tiene vacíos.
+        """
+        stale = [column for column in self.columns if column in self.stale]
+        kept = [column for column in self.columns if column not in self.stale]
+        if stale:
+            usable = [column for column in stale if self.usable(column)]
+            if len(usable) < len(stale):
+                # Columnas que han vuelto a tener vacíos (al deshacer un relleno): se dejan fuera
+                self.select(kept + usable)
+            stale = usable
+        new = [column for column in dict.fromkeys(columns) if column not in self.positions]
+        if any(not self.usable(column) for column in new):
+            return False
+        if new or stale:
+            # Ya que hay que recorrer las filas, se incluyen también las demás columnas numéricas
+            for column in self.df.columns:
+                if len(self.columns) + len(new) >= self.max_columns:
+                    break
+                if column not in self.positions and column not in new and self.usable(column):
+                    new.append(column)
+            self.select(self.columns + new)
+            self.accumulate(stale + new)
+        self.stale = set()
+        return True
+
+    def select(self, columns):
+        """Deja los estadísticos de las columnas indicadas; las nuevas empiezan a cero."""
+        old = [self.positions.get(column, -1) for column in columns]
+        present = np.array([position >= 0 for position in old], dtype=bool)
+        taken = np.array([position for position in old if position >= 0], dtype=int)
+        size = len(columns)
+        shift, sums = np.zeros(size), np.zeros((self.n_groups, size))
+        products = np.zeros((self.n_groups, size, size))
+        shift[present] = self.shift[taken]
+        sums[:, present] = self.sums[:, taken]
+        products[np.ix_(np.arange(self.n_groups), present, present)] = self.products[:, taken][:, :, taken]
+        self.columns = list(columns)
+        self.positions = {column: position for position, column in enumerate(self.columns)}
+        self.shift, self.sums, self.products = shift, sums, products
+
+    def blocks(self):
+        """Bloques de filas del DataFrame: tuplas (fila inicial, array float64 con las columnas)."""
+        return frame_blocks(self.df, self.columns, self.block_size)
+
+    def labels(self, start, count):
+        """Grupo de las filas start, ..., start + count - 1."""
+        if callable(self.groups):
+            return self.groups(np.arange(start, start + count))
+        return self.groups[start:start + count]
+
+    def accumulate(self, columns, blocks=None):
+        """
+        Recorre las filas por bloques y calcula las sumas y los productos de las
+        columnas con todas las demás. blocks da los bloques como blocks() (por
+        defecto, los del DataFrame), de modo que también sirve para datos que se
+        leen de disco sin tenerlos enteros en memoria.
+        """
+        targets = np.array([self.positions[column] for column in columns], dtype=int)
+        counts = np.zeros(self.n_groups)
+        sums = np.zeros((self.n_groups, len(targets)))
+        products = np.zeros((self.n_groups, len(self.columns), len(targets)))
+        first = True
+        for start, block in (self.blocks() if blocks is None else blocks):
+            if first:
+                self.shift[targets] = block[:, targets].mean(axis=0)
+                first = False
+            block = block - self.shift
+            labels = self.labels(start, len(block))
+            counts += np.bincount(labels, minlength=self.n_groups)
+            for group in range(self.n_groups):
+                rows = block[labels == group]
+                sums[group] += rows[:, targets].sum(axis=0)
+                products[group] += rows.T @ rows[:, targets]
+        self.counts = counts
+        self.sums[:, targets] = sums
+        self.products[:, :, targets] = products
+        self.products[:, targets, :] = np.transpose(products, (0, 2, 1))
+
+    def moments(self, columns, groups):
+        """Filas, medias y productos cruzados centrados de las columnas en la unión de los grupos."""
+        positions = np.array([self.positions[column] for column in columns], dtype=int)
+        groups = list(groups)
+        count = self.counts[groups].sum()
+        sums = self.sums[groups][:, positions].sum(axis=0)
+        products = self.products[groups][:, positions][:, :, positions].sum(axis=0)
+        mean = sums / count
+        return count, self.shift[positions] + mean, products - np.outer(sums, mean)
+
+    def solve(self, entry_columns, target_column, groups=(0,)):
+        """
+        Coeficientes y término independiente de la regresión de target_column sobre
+        entry_columns con las filas de los grupos indicados (mínimos cuadrados, con
+        la solución de norma mínima si hay columnas colineales, igual que LinearRegression).
+        """
+        _, mean, centered = self.moments(list(entry_columns) + [target_column], groups)
+        n_features = len(entry_columns)
+        # Se resuelve con las columnas en escala unitaria para que el sistema esté bien condicionado
+        scale = np.sqrt(np.diag(centered)[:n_features])
+        scale[~(scale > 0)] = 1.0
+        solution, _, rank, _ = np.linalg.lstsq(centered[:n_features, :n_features] / np.outer(scale, scale),
+                                               centered[:n_features, n_features] / scale, rcond=None)
+        coefficients = solution / scale
+        if rank < n_features:
+            # Con columnas colineales la solución de norma mínima depende de la escala: se usa la original
+            coefficients = np.linalg.lstsq(centered[:n_features, :n_features], centered[:n_features, n_features],
+                                           rcond=None)[0]
+        return coefficients, mean[n_features] - coefficients @ mean[:n_features]
+
+    def sums_of_squares(self, entry_columns, target_column, coefficients, intercept, groups):
+        """
+        Filas, suma de residuos al cuadrado y suma de cuadrados total (respecto a la
+        media de esas filas) del modelo en la unión de los grupos, sin recorrer las filas.
+        """
+        columns = list(entry_columns) + [target_column]
+        positions = np.array([self.positions[column] for column in columns], dtype=int)
+        groups = list(groups)
+        count = self.counts[groups].sum()
+        sums = self.sums[groups][:, positions].sum(axis=0)
+        products = self.products[groups][:, positions][:, :, positions].sum(axis=0)
+        # Residuo = wᵀ(z - shift) + offset, con z = (x, y) y w = (-coeficientes, 1)
+        weights = np.append(-np.asarray(coefficients, dtype=np.float64), 1.0)
+        offset = weights @ self.shift[positions] - intercept
+        residual_squares = weights @ products @ weights + 2 * offset * (weights @ sums) + count * offset ** 2
+        total_squares = products[-1, -1] - sums[-1] ** 2 / count if count else 0.0
+        return count, max(residual_squares, 0.0), total_squares
@@ -0,0 +1,167 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from DataLoader import CHUNK_SIZE
+
+# Vecinos que se promedian en "Fill with KNN"
+KNN_NEIGHBORS = 5
+# Vueltas máximas de "Fill with Iterative Regression" y cambio (en desviaciones típicas) para parar antes
+ITERATIVE_MAX_ITER = 10
+ITERATIVE_TOLERANCE = 1e-3
+# Hilos del grupo de trabajo: las búsquedas del KD-tree y los productos de NumPy liberan el GIL
+WORKERS = min(8, os.cpu_count() or 1)
+
+
+class ImputationCancelled(Exception):
+    """Se lanza cuando se cancela una imputación en curso."""
+
+
+def row_chunks(rows, chunk_size):
+    return [rows[start:start + chunk_size] for start in range(0, len(rows), chunk_size)]
+
+
+def column_means(values, missing):
+    """Media de cada columna sin contar los vacíos (NaN en las columnas sin ningún valor)."""
+    counts = (~missing).sum(axis=0)
+    sums = np.where(missing, 0.0, values).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts
+
+
+def standardize(values, missing):
+    """Columnas centradas y divididas por su desviación típica; los vacíos quedan en 0 (la media)."""
+    means = column_means(values, missing)
+    centered = np.where(missing, 0.0, values - np.nan_to_num(means))
+    counts = np.maximum((~missing).sum(axis=0), 1)
+    std = np.sqrt((centered ** 2).sum(axis=0) / counts)
+    std[~(std > 0)] = 1.0
+    return centered / std
+
+
+def knn_impute(values, n_neighbors=KNN_NEIGHBORS, chunk_size=CHUNK_SIZE, workers=WORKERS, progress=None,
+               is_cancelled=None):
+    """
+    Rellena los vacíos de cada columna de values (array float64 filas x columnas)
+    con la media de esa columna en las n_neighbors filas más parecidas que sí la
+    tienen. El parecido se mide con las demás columnas estandarizadas, en las que
+    los vacíos cuentan como la media. Para cada columna se construye un KD-tree
+    con las filas donantes y las filas que hay que rellenar se buscan por bloques
+    de chunk_size en un grupo de hilos, de modo que el coste es O(n log n) en
+    lugar de comparar todas las filas entre sí.
+    progress(hechos, total) se llama tras cada bloque y is_cancelled() permite
+    abortar entre bloques lanzando ImputationCancelled. Devuelve una copia.
+    """
+    from scipy.spatial import cKDTree
+
+    result = values.copy()
+    missing = np.isnan(values)
+    scaled = standardize(values, missing)
+    n_columns = values.shape[1]
+    work = []
+    for column in range(n_columns):
+        recipients = np.flatnonzero(missing[:, column])
+        donors = np.flatnonzero(~missing[:, column])
+        if len(recipients) and len(donors):
+            work.append((column, donors, row_chunks(recipients, chunk_size)))
+    total = sum(len(chunks) for _, _, chunks in work)
+    done = 0
+
+    def query(tree, points, k, donor_values):
+        _, neighbours = tree.query(points, k=k)
+        return donor_values[neighbours.reshape(len(points), k)].mean(axis=1)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for column, donors, chunks in work:
+            features = [other for other in range(n_columns) if other != column]
+            donor_values = values[donors, column]
+            if not features:
+                # Sin más columnas no hay con qué comparar las filas: se usa la media
+                result[np.concatenate(chunks), column] = donor_values.mean()
+                done += len(chunks)
+                continue
+            tree = cKDTree(scaled[np.ix_(donors, features)])
+            k = min(n_neighbors, len(donors))
+            futures = [pool.submit(query, tree, scaled[np.ix_(rows, features)], k, donor_values) for rows in chunks]
+            for rows, future in zip(chunks, futures):
+                if is_cancelled is not None and is_cancelled():
+                    for pending in futures:
+                        pending.cancel()
+                    raise ImputationCancelled()
+                result[rows, column] = future.result()
+                done += 1
+                if progress is not None:
+                    progress(done, total)
+    return result
+
+
+def least_squares(values, shift, features, target, rows, chunk_size, pool):
+    """
+    Ajusta target ~ features + término independiente con las filas indicadas,
+    acumulando XᵀX y Xᵀy por bloques en el grupo de hilos. Las columnas se
+    desplazan por shift para que el sistema esté bien condicionado. Devuelve los
+    coeficientes de las columnas desplazadas (el último es el término independiente).
+    """
+    def gram(block_rows):
+        X = np.column_stack([values[np.ix_(block_rows, features)] - shift[features], np.ones(len(block_rows))])
+        return X.T @ X, X.T @ (values[block_rows, target] - shift[target])
+
+    size = len(features) + 1
+    xtx, xty = np.zeros((size, size)), np.zeros(size)
+    for block_xtx, block_xty in pool.map(gram, row_chunks(rows, chunk_size)):
+        xtx += block_xtx
+        xty += block_xty
+    solution = np.linalg.lstsq(xtx, xty, rcond=None)[0]
+    solution[-1] += shift[target]
+    return solution
+
+
+def iterative_impute(values, max_iter=ITERATIVE_MAX_ITER, tolerance=ITERATIVE_TOLERANCE, chunk_size=CHUNK_SIZE,
+                     workers=WORKERS, progress=None, is_cancelled=None):
+    """
+    Rellena los vacíos empezando por la media de cada columna y después, por
+    turnos, con la regresión lineal de cada columna con vacíos sobre las demás,
+    hasta que los valores rellenados cambian menos de tolerance desviaciones
+    típicas o se llega a max_iter vueltas. Cada regresión se ajusta por bloques
+    de filas (ver least_squares), así que la memoria no depende del número de
+    filas. progress e is_cancelled funcionan como en knn_impute. Devuelve una copia.
+    """
+    missing = np.isnan(values)
+    means = column_means(values, missing)
+    result = np.where(missing, means, values)
+    usable = [column for column in range(values.shape[1]) if not np.isnan(means[column])]
+    columns = [column for column in usable if missing[:, column].any()]
+    if len(usable) < 2 or not columns:
+        return result  # Sin otras columnas con valores no hay regresión posible: se queda la media
+
+    scales = {column: np.nanstd(values[:, column]) or 1.0 for column in columns}
+    total = max_iter * len(columns)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for iteration in range(max_iter):
+            change = 0.0
+            for position, column in enumerate(columns):
+                if is_cancelled is not None and is_cancelled():
+                    raise ImputationCancelled()
+                features = [other for other in usable if other != column]
+                coefficients = least_squares(result, means, features, column, np.flatnonzero(~missing[:, column]),
+                                             chunk_size, pool)
+                rows = np.flatnonzero(missing[:, column])
+                predicted = (result[np.ix_(rows, features)] - means[features]) @ coefficients[:-1] + coefficients[-1]
+                change = max(change, float(np.max(np.abs(predicted - result[rows, column]))) / scales[column])
+                result[rows, column] = predicted
+                if progress is not None:
+                    progress(iteration * len(columns) + position + 1, total)
+            if change < tolerance:
+                break
+    if progress is not None:
+        progress(total, total)
+    return result
+
+
+# Estrategias de DataPreprocessorView que se calculan en segundo plano
+IMPUTERS = {"Fill with KNN": knn_impute, "Fill with Iterative Regression": iterative_impute}
+
+
+def impute(strategy, values, progress=None, is_cancelled=None):
+    """Aplica a values la estrategia de imputación indicada (ver IMPUTERS)."""
+    return IMPUTERS[strategy](values, progress=progress, is_cancelled=is_cancelled)
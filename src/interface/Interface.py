@@ -1,8 +1,8 @@
 import sys
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QFileDialog, QLabel,
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QFileDialog, QLabel, QCheckBox, QInputDialog,
                              QVBoxLayout, QHBoxLayout, QWidget, QMessageBox, QProgressBar, QDesktopWidget)
 from PyQt5.QtGui import QFont, QPalette, QColor
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread
 
 from DataTable import DataTableModel, DataTableView, DataTableController
 from ColumnSelector import ColumnSelectorModel, ColumnSelectorView, ColumnSelectorController
@@ -55,10 +55,32 @@ class Interface(QMainWindow):
         self.label.setStyleSheet("color: white;")
         main_layout.addWidget(self.label)
 
+        # Barra de progreso y botón de cancelar para la carga de archivos
+        loading_layout = QHBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setVisible(False)
+        loading_layout.addWidget(self.progress_bar)
+        self.cancel_load_button = QPushButton("Cancel")
+        self.cancel_load_button.setFont(QFont("Arial", 12, QFont.Bold))
+        self.cancel_load_button.clicked.connect(self.cancel_file_loading)
+        self.cancel_load_button.setVisible(False)
+        loading_layout.addWidget(self.cancel_load_button)
+        main_layout.addLayout(loading_layout)
+
+        # Opción para cargar los datos con tipos reducidos (menos memoria)
+        self.compact_checkbox = QCheckBox("Compact data types on load")
+        self.compact_checkbox.setStyleSheet("color: white;")
+        main_layout.addWidget(self.compact_checkbox, alignment=Qt.AlignCenter)
+        self.load_thread = None
+        self.load_worker = None
+        self.running_loaders = []  # Hilos y workers vivos hasta que termine el hilo
+
         # Tabla para mostrar los datos
         self.table_model = DataTableModel()
         self.table_view = DataTableView()
         self.table_controller = DataTableController(self.table_view, self.table_model)
+        self.compact_checkbox.toggled.connect(self.table_controller.set_compact)
         main_layout.addWidget(self.table_view)
 
         # Layout horizontal para el selector de columnas y el preprocesador
@@ -69,8 +91,10 @@ class Interface(QMainWindow):
         self.column_selector_model = ColumnSelectorModel()
         self.column_selector_view = ColumnSelectorView()
         self.column_selector_controller = ColumnSelectorController(self.column_selector_model, self.column_selector_view)
+        self.column_selector_view.search_button.clicked.connect(self.search_subsets)
 
-        self.column_selector_view.setFixedSize(800,400)  # Ajustar el ancho del selector de columnas
+        self.column_selector_view.setFixedHeight(400)  # Ajustar el alto del selector de columnas
+        self.column_selector_view.setMinimumWidth(800)  # Listas y panel de estadísticas
         selector_preprocessor_layout.addWidget(self.column_selector_view)
 
         # Preprocesador
@@ -79,6 +103,13 @@ class Interface(QMainWindow):
         self.data_preprocessor_controller = DataPreprocessorController(self.data_preprocessor_model, self.data_preprocessor_view)
         self.data_preprocessor_view.empty_cells_button.clicked.connect(self.highlight_empty_cells)
         self.data_preprocessor_view.apply_button.clicked.connect(self.apply_preprocess)
+        self.data_preprocessor_view.undo_button.clicked.connect(self.undo_preprocess)
+        self.data_preprocessor_view.redo_button.clicked.connect(self.redo_preprocess)
+        self.data_preprocessor_view.preprocessing_applied.connect(self.refresh_preprocessed_data)
+        # Los hilos de estadísticas y de búsqueda leen los datos: el preprocesado espera a que paren
+        # y no se puede aplicar mientras una búsqueda está en curso
+        self.data_preprocessor_view.data_changing.connect(self.column_selector_controller.stop_readers)
+        self.column_selector_view.searching_changed.connect(self.data_preprocessor_controller.set_blocked)
         selector_preprocessor_layout.addWidget(self.data_preprocessor_view)
         self.data_preprocessor_view.setVisible(False)  # Ocultamos el preprocesador hasta que se cargue un archivo
 
@@ -128,6 +159,11 @@ class Interface(QMainWindow):
                 " created but you cant modify it.\n\n"
             "🎉 Enjoy experimenting with data! 🎉")
 
+    def clear_cache(self):
+        """Borra la caché de archivos ya leídos"""
+        self.table_controller.clear_cache()
+        QMessageBox.information(self, "Cache", "The cache of loaded files has been cleared.")
+
     def toggle_menu_visibility(self):
         """Toggle the visibility of the menu."""
         if self.menu.isVisible():
@@ -158,37 +194,153 @@ class Interface(QMainWindow):
         self.data_preprocessor_view.hide()
         self.create_model_button.hide()
         if file_name: 
+            self.cancel_file_loading()
             self.label.setText(f"<b>Selected file:</b> <br><i>{file_name}</i>")
             self.label.setStyleSheet("color: #FFFFFF;")
-            # Create a new worker thread for file loading
+            if self.table_controller.can_open_lazily(file_name):
+                # SQLite: se muestra por páginas y se carga entero solo cuando hace falta
+                try:
+                    if self.table_controller.open_lazily(file_name):
+                        self.on_file_loaded(None)
+                except ValueError as ve:
+                    self.show_problem_file_message("Error", str(ve), "warning")
+                except Exception as e:
+                    self.show_problem_file_message("Critical Error", str(e), "critical")
+                return
+            # En un Excel con varias hojas se pregunta cuál cargar
+            sheet_name = None
             try:
-                if self.table_controller.load_file(file_name):
-                    self.on_file_loaded(self.table_model.df)    
-                else:
-                    self.table_view.hide()
-                    self.column_selector_view.hide()
-                    self.data_preprocessor_view.hide()
-                    self.create_model_button.hide()
-                    return
-            except ValueError as ve:
-                self.show_problem_file_message("Error", str(ve), "warning")
+                sheets = self.table_controller.list_sheets(file_name)
             except Exception as e:
-                self.show_problem_file_message("Critical Error", str(e), "critical")
+                self.show_problem_file_message("Critical Error", f"Unexpected error: {str(e)}", "critical")
+                return
+            if len(sheets) > 1:
+                sheet_name, ok = QInputDialog.getItem(self, "Select Sheet", "Sheet to load:", sheets, 0, False)
+                if not ok:
+                    return
+            # Create a new worker thread for file loading
+            self.load_thread = QThread(self)
+            self.load_worker = self.table_controller.create_loader(file_name, sheet_name)
+            self.load_worker.moveToThread(self.load_thread)
+            self.load_thread.started.connect(self.load_worker.run)
+            self.load_worker.progress.connect(self.progress_bar.setValue)
+            self.load_worker.finished.connect(self.on_worker_finished)
+            self.load_worker.failed.connect(self.on_worker_failed)
+            for signal in (self.load_worker.finished, self.load_worker.failed, self.load_worker.cancelled):
+                # Directa: el hilo debe poder terminar aunque el principal esté esperando en wait_file_loading
+                signal.connect(self.load_thread.quit, Qt.DirectConnection)
+            loader = (self.load_thread, self.load_worker)
+            self.running_loaders.append(loader)
+            self.load_thread.finished.connect(lambda: self.running_loaders.remove(loader))
+            self.load_thread.finished.connect(self.load_thread.deleteLater)
+
+            self.progress_bar.setValue(0)
+            self.progress_bar.setVisible(True)
+            self.cancel_load_button.setVisible(True)
+            self.load_thread.start()
+
+    def cancel_file_loading(self):
+        """Cancela la carga de archivo en curso, si la hay."""
+        if self.load_worker is not None:
+            worker = self.load_worker
+            worker.cancel()
+            # Se desconecta para que un resultado tardío no sobrescriba una carga nueva
+            worker.progress.disconnect(self.progress_bar.setValue)
+            worker.finished.disconnect(self.on_worker_finished)
+            worker.failed.disconnect(self.on_worker_failed)
+            if worker.streaming:
+                worker.chunk_loaded.disconnect(self.table_controller.append_chunk)
+                self.table_controller.clear()
+            self.label.setText("Select a CSV, Excel or SQLite file")
+        self.release_loader()
+
+    def wait_file_loading(self):
+        """Cancela la carga en curso y espera a que terminen los hilos de carga (al cerrar la aplicación)."""
+        self.cancel_file_loading()
+        for thread, _ in list(self.running_loaders):
+            thread.wait()
+
+    def release_loader(self):
+        """Oculta el progreso de carga y olvida el hilo actual."""
+        self.load_worker = None
+        self.load_thread = None
+        self.progress_bar.setVisible(False)
+        self.cancel_load_button.setVisible(False)
+
+    def on_worker_finished(self, df):
+        """Recibe el DataFrame leído por el hilo de carga."""
+        self.release_loader()
+        if self.table_controller.set_dataframe(df):
+            self.on_file_loaded(self.table_model.df)
+        else:
+            self.table_view.hide()
+            self.column_selector_view.hide()
+            self.data_preprocessor_view.hide()
+            self.create_model_button.hide()
+
+    def on_worker_failed(self, title, message, msg_type):
+        self.release_loader()
+        self.table_controller.clear()
+        self.show_problem_file_message(title, message, msg_type)
 
     def on_file_loaded(self, df):
         """Called when the file is successfully loaded."""
         self.label.show()
+        if df is not None and "memory_usage" in df.attrs:
+            memory = df.attrs["memory_usage"]
+            self.label.setText(self.label.text() + f"<br>Memory: {memory['before'] / 1024 ** 2:.1f} MB → "
+                               f"{memory['after'] / 1024 ** 2:.1f} MB")
         self.linear_model_view.hide()
         self.table_view.show()
         # Enable related views and components
-        headers = [self.table_model.headerData(i, Qt.Horizontal, Qt.DisplayRole) for i in range(self.table_model.columnCount())]
+        current_model = self.table_controller.current_model()
+        headers = [current_model.headerData(i, Qt.Horizontal, Qt.DisplayRole) for i in range(current_model.columnCount())]
         self.column_selector_controller.update_selectors(headers)
         self.column_selector_view.show()
         self.data_preprocessor_view.show()
         self.create_model_button.show()
         # Update models with the loaded DataFrame
         self.linear_model_model.df = self.table_model.df
-        self.data_preprocessor_model.df = self.table_model.df
+        self.linear_model_model.store = self.table_model.store
+        # Los vacíos se indexan una vez y el índice lo comparten el preprocesado, el modelo y la tabla
+        self.data_preprocessor_controller.stop_imputation()
+        self.data_preprocessor_model.set_dataframe(self.table_model.df, self.table_model.store)
+        self.share_missing_index()
+        self.data_preprocessor_controller.update_history_buttons()
+        # Estadísticas de las columnas en segundo plano (las tablas SQLite por páginas no se leen enteras)
+        if self.table_controller.is_lazy():
+            self.column_selector_controller.set_data()
+        else:
+            self.column_selector_controller.set_data(self.table_model.df, self.table_model.store)
+
+    def ensure_dataframe(self):
+        """Carga la tabla completa si el archivo se está mostrando por páginas (SQLite)."""
+        if self.table_controller.is_lazy():
+            self.table_controller.materialize()
+            self.linear_model_model.df = self.table_model.df
+            self.linear_model_model.store = None
+            self.data_preprocessor_model.set_dataframe(self.table_model.df)
+            self.share_missing_index()
+            self.data_preprocessor_controller.update_history_buttons()
+            self.column_selector_controller.set_data(self.table_model.df)
+
+    def search_subsets(self):
+        """Busca en segundo plano las mejores columnas de entrada para la columna objetivo."""
+        self.ensure_dataframe()
+        self.column_selector_controller.start_search()
+
+    def share_missing_index(self):
+        self.linear_model_model.missing_index = self.data_preprocessor_model.missing_index
+        self.table_controller.missing_index = self.data_preprocessor_model.missing_index
+
+    def closeEvent(self, event):
+        """Cancela la carga en curso y borra el almacén en disco al cerrar la ventana."""
+        self.wait_file_loading()
+        self.column_selector_controller.wait_statistics()
+        self.column_selector_controller.wait_search()
+        self.data_preprocessor_controller.wait_imputation()
+        self.table_controller.delete_store()
+        super().closeEvent(event)
 
     def apply_styles(self):
         """Aplica estilos (QSS) a los widgets"""
@@ -213,6 +365,21 @@ class Interface(QMainWindow):
 
     def create_model(self):
         entry_columns, target_column = self.column_selector_view.get_selected_columns()
+        # Una tabla SQLite mostrada por páginas se entrena leyéndola por bloques, sin cargarla,
+        # si las columnas son numéricas; si no, se carga entera para codificarlas
+        lazy_model = self.table_controller.lazy_model
+        if lazy_model is not None and entry_columns and target_column \
+                and lazy_model.numeric_columns(entry_columns + [target_column]):
+            self.linear_model_model.source_file = lazy_model.file_name
+        else:
+            self.linear_model_model.source_file = None
+            self.ensure_dataframe()
+        # El modelo guarda el preprocesado aplicado para repetirlo al predecir
+        self.linear_model_model.preprocessing_steps = list(self.data_preprocessor_model.steps)
+        self.linear_model_model.encoding = self.column_selector_controller.get_encoding()
+        self.linear_model_model.regressor = self.column_selector_controller.get_regressor()
+        self.linear_model_model.cv_folds, self.linear_model_model.cv_repeats = \
+            self.column_selector_controller.get_evaluation()
         if self.linear_model_controller.create_model(entry_columns, target_column):
             self.table_view.setVisible(False)
             self.column_selector_view.setVisible(False)
@@ -231,9 +398,35 @@ class Interface(QMainWindow):
 
     def apply_preprocess(self):
         entry_columns, target_column = self.column_selector_controller.get_selected_columns()
+        self.ensure_dataframe()
         if self.data_preprocessor_controller.apply_preprocessing(entry_columns, target_column):
-            self.table_model.df = self.data_preprocessor_model.df
-            self.table_controller.update_table()
+            self.refresh_preprocessed_data()
+        else:
+            self.column_selector_controller.resume_statistics()
+
+    def undo_preprocess(self):
+        if self.data_preprocessor_controller.undo():
+            self.refresh_preprocessed_data()
+        else:
+            self.column_selector_controller.resume_statistics()
+
+    def redo_preprocess(self):
+        if self.data_preprocessor_controller.redo():
+            self.refresh_preprocessed_data()
+        else:
+            self.column_selector_controller.resume_statistics()
+
+    def refresh_preprocessed_data(self):
+        """Lleva el DataFrame preprocesado a la tabla y al modelo lineal tras aplicar, deshacer o rehacer."""
+        df = self.data_preprocessor_model.df
+        if self.table_model.store is None:
+            self.table_model.df = df
+            self.linear_model_model.df = df
+        # Solo se vuelven a formatear y a resumir las columnas procesadas
+        touched_columns = self.data_preprocessor_model.touched_columns
+        self.table_model.invalidate(touched_columns)
+        self.linear_model_model.data_changed(touched_columns)
+        self.column_selector_controller.columns_changed(touched_columns, df if self.table_model.store is None else None)
 
     def highlight_empty_cells(self):
         # Obtener las columnas seleccionadas y la columna de destino
@@ -244,21 +437,12 @@ class Interface(QMainWindow):
             self.data_preprocessor_view.show_message("Warning", "Please select columns first.", "warning")
             return False
 
+        self.ensure_dataframe()
         # Obtener los índices de las columnas y las celdas vacías desde el controlador
         column_indices, missing_cells = self.data_preprocessor_controller.highlight_empty_cells(entry_columns, target_column)
         
-        # Empezar la actualización de la vista de la tabla
-        for i in range(self.table_view.model().rowCount()):  # Iterar sobre las filas
-            for j in column_indices:  # Iterar sobre las columnas seleccionadas
-                # Obtener el índice del modelo para la celda específica
-                index = self.table_view.model().index(i, j)
-
-                # Verificar si la celda está vacía o tiene el valor 'nan'
-                if index.isValid():
-                    data = self.table_view.model().data(index, Qt.DisplayRole)
-                    if data == "" or str(data).lower() == "nan":
-                        # Cambiar el color de fondo de la celda a rojo transparente usando Qt.BackgroundRole
-                        self.table_view.model().set_background(i, j, QColor(255, 0, 0, 150))  # Rojo transparente
+        # Una sola máscara para todas las celdas, sin recorrerlas una a una
+        self.table_model.set_highlight(column_indices, missing_cells, QColor(255, 0, 0, 150))  # Rojo transparente
         return True
 
 
@@ -1,117 +1,17 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QTextEdit, QLabel, QMessageBox, QGroupBox, QPushButton, QFileDialog, QLineEdit, QFormLayout
-from PyQt5.QtGui import QFont
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_absolute_error, root_mean_squared_error, r2_score
-from sklearn.model_selection import train_test_split
-import joblib
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import pandas as pd
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QTextEdit, QLabel, QMessageBox, QGroupBox, QPushButton, QFileDialog, QLineEdit, QFormLayout
+from PyQt5.QtGui import QFont
 
-class LinearModelModel():
-    def __init__(self, df):
-        self.df = df
-        self.entry_columns = None
-        self.target_column = None
-        self.model = None
-        self.description = ""
-        self.formula = ""
-        self.errors = ""
+from RegressionModel import LinearModelModel
 
-    def create_model(self, entry_columns, target_column):
-        """Crea el modelo de regresión lineal con las columnas seleccionadas y muestra los resultados."""
-        self.entry_columns = entry_columns
-        self.target_column = target_column
-        if not self.entry_columns or not self.target_column:
-            return False
-        
-        if self.df[self.entry_columns].isnull().any().any() or self.df[self.target_column].isnull().any():
-            return False
 
-        # Verificar que todas las columnas de entrada sean numéricas
-        for column in self.entry_columns:
-            if not pd.api.types.is_numeric_dtype(self.df[column]):
-                return False
-        
-        # Verificar que la columna objetivo sea numérica
-        if not pd.api.types.is_numeric_dtype(self.df[self.target_column]):
-            return False
-        X = self.df[self.entry_columns].values
-        y = self.df[self.target_column].values
-
-        # Dividir los datos en conjuntos de entrenamiento y prueba
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42)
-
-        # Crear y entrenar el modelo de regresión lineal
-        self.model = LinearRegression()
-        self.model.fit(X_train, y_train)
-
-        # Generar la fórmula de regresión
-        self.formula = f"{self.target_column} = " + " + ".join(
-            [f"{coef:.3f}*{col}" for coef, col in zip(self.model.coef_, self.entry_columns)]
-        ) + f" + {self.model.intercept_:.3f}"
-
-        # Calcular y mostrar métricas de error en los datos de prueba
-        y_pred_train = self.model.predict(X_train)
-        y_pred_test = self.model.predict(X_test)
-        
-        # Métricas en entrenamiento
-        mae_train = mean_absolute_error(y_train, y_pred_train)
-        rmse_train = np.sqrt(root_mean_squared_error(y_train, y_pred_train))
-        r2_train = r2_score(y_train, y_pred_train)
-        
-        # Métricas en prueba
-        mae_test = mean_absolute_error(y_test, y_pred_test)
-        rmse_test = np.sqrt(root_mean_squared_error(y_test, y_pred_test))
-        r2_test = r2_score(y_test, y_pred_test)
-
-        # Mostrar métricas en los datos de prueba
-        self.description = ""
-        self.errors = str(f"Training MAE: {mae_train:.3f}, RMSE: {rmse_train:.3f}, R²: {r2_train:.3f}\n" + f"Test MAE: {mae_test:.3f}, RMSE: {rmse_test:.3f}, R²: {r2_test:.3f}")
-        return True
-    
-    def plot_regression(self):
-            # Usa las columnas seleccionadas si no se especifican
-            if not self.entry_columns or len(self.entry_columns) != 1:
-                return False
+def create_canvas(fig):
+    """Crea el widget de Qt para la figura. matplotlib se importa al dibujar el primer gráfico."""
+    from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+    return FigureCanvas(fig)
+
 
-            X = self.df[self.entry_columns].values
-            y = self.df[self.target_column].values
-            y_pred = self.model.predict(X)
-            # Configura la gráfica
-            fig, ax = plt.subplots()
-            ax.scatter(X, y, color='blue', label="Actual Data")
-            ax.plot(X, y_pred, color='red', label="Regression Line")
-            ax.set_xlabel(self.entry_columns[0])
-            ax.set_ylabel(self.target_column)
-            ax.legend()
-            return fig
-    
-    def save_model(self, file_path):
-        """Abre un diálogo para guardar el modelo y los datos asociados en el archivo seleccionado por el usuario."""
-        # Empaqueta los datos del modelo para guardar
-        model_data = {"model": self.model,"input_columns": self.entry_columns,"output_column": self.target_column,
-                      "errors":  self.errors, "description": self.description, "formula": self.formula, "df":self.df}
-
-        # Intenta guardar el archivo y maneja errores
-        joblib.dump(model_data, file_path)
-    
-    def load_model(self, file_name):
-        """Carga el modelo .joblib y muestra los datos correspondientes"""
-        if file_name:
-            model_data = joblib.load(file_name)
-            self.model = model_data["model"]
-            self.df = model_data["df"]
-            self.entry_columns = model_data["input_columns"]
-            self.target_column = model_data["output_column"]
-            self.formula = model_data["formula"]
-            self.errors = model_data["errors"]
-            self.description = model_data["description"]
-            return True
-        else:
-            return False
-        
 class LinearModelView(QWidget):
     def __init__(self, model, parent=None):
         """
@@ -140,6 +40,7 @@ class LinearModelView(QWidget):
         self.formula_label = QLabel("Linear Regression Formula will appear here.")
         self.formula_label.setFont(QFont("Arial", 12, QFont.Bold))
         self.formula_label.setStyleSheet("color: white;")  # Texto en blanco
+        self.formula_label.setWordWrap(True)  # Con columnas categóricas hay un término por nivel
         info_layout.addWidget(self.formula_label)
 
         # Etiqueta para mostrar las métricas de error
@@ -233,9 +134,14 @@ class LinearModelController():
                     widget_to_remove = self.view.plot_widget.layout().itemAt(i).widget()
                     widget_to_remove.setParent(None)
 
-            if len(entry_columns) == 1:
-                fig = self.model.plot_regression()
-                self.view.plot_widget.layout().addWidget(FigureCanvas(fig))
+            # Solo se dibuja la recta con una única entrada numérica
+            fig = self.model.plot_regression()
+            if fig:
+                self.view.plot_widget.layout().addWidget(create_canvas(fig))
+            # Con Ridge, Lasso o ElasticNet, el camino de regularización
+            fig = self.model.plot_path()
+            if fig:
+                self.view.plot_widget.layout().addWidget(create_canvas(fig))
 
             self.view.set_formula(self.model.formula)
             self.view.set_errors(self.model.errors)
@@ -280,9 +186,12 @@ class LinearModelController():
                 for i in reversed(range(self.view.plot_widget.layout().count())):
                     widget_to_remove = self.view.plot_widget.layout().itemAt(i).widget()
                     widget_to_remove.setParent(None)
-                if len(self.model.entry_columns) == 1:
-                    fig = self.model.plot_regression()
-                    self.view.plot_widget.layout().addWidget(FigureCanvas(fig))
+                fig = self.model.plot_regression()
+                if fig:
+                    self.view.plot_widget.layout().addWidget(create_canvas(fig))
+                fig = self.model.plot_path()
+                if fig:
+                    self.view.plot_widget.layout().addWidget(create_canvas(fig))
 
                 self.allow_inputs_prediction()
 
@@ -301,13 +210,20 @@ class LinearModelController():
     def make_prediction(self):
         """Realizar la predicción utilizando los valores ingresados"""
         # Obtener los valores de las columnas de entrada
-        input_values = []
+        # Los campos vacíos se rellenan con el preprocesado con que se entrenó el modelo
+        input_values = {}
+        categorical = self.model.encoder.categorical if self.model.encoder is not None else []
         try:
             for col in self.model.entry_columns:
-                value = float(self.view.input_fields[col].text())  # Convertir a float
-                input_values.append(value)
+                text = self.view.input_fields[col].text().strip()
+                if col in categorical:
+                    input_values[col] = [text if text else np.nan]  # Nivel de la columna categórica
+                else:
+                    input_values[col] = [float(text) if text else np.nan]  # Convertir a float
             # Realizar la predicción
-            prediction = self.model.model.predict([input_values])[0]  # La predicción es un valor único
+            prediction = self.model.predict(pd.DataFrame(input_values))[0]  # La predicción es un valor único
+            if np.isnan(prediction):
+                raise ValueError("Missing input values")
 
             # Mostrar la predicción
             self.view.set_prediction(prediction)
@@ -328,6 +244,8 @@ class LinearModelController():
             for col in self.model.entry_columns:
                 input_field = QLineEdit()
                 input_field.setPlaceholderText(f"Enter value for {col}")
+                if self.model.encoder is not None and col in self.model.encoder.categorical:
+                    input_field.setPlaceholderText(f"Enter a category for {col}")
                 label = QLabel(f"{col}:")
                 label.setStyleSheet("color: white;")  # Establecer el color blanco para el texto
                 self.view.prediction_layout.addRow(label, input_field)
@@ -34,7 +34,7 @@ class Menu(QDockWidget):
             }
         """)
         # Adding items with centered alignment
-        items = ["New Model", "Load Model", "User Guide"]
+        items = ["New Model", "Load Model", "User Guide", "Clear Cache"]
         for item_text in items:
             item = QListWidgetItem(item_text)
             item.setTextAlignment(Qt.AlignCenter)  # Center the text within the item
@@ -76,4 +76,6 @@ class Menu(QDockWidget):
             self.parent.load_model()
         elif selected_option == "User Guide":
             self.parent.open_user_guide()
+        elif selected_option == "Clear Cache":
+            self.parent.clear_cache()
 
@@ -0,0 +1,154 @@
+import numpy as np
+
+
+def next_position(positions, row, backwards=False):
+    """
+    Devuelve la siguiente posición de positions (ordenadas) después de row, o la
+    anterior si backwards. Al llegar al final se vuelve a empezar por el otro
+    extremo. Devuelve None si no hay ninguna.
+    """
+    if not len(positions):
+        return None
+    if backwards:
+        index = np.searchsorted(positions, row, side="left") - 1
+        return int(positions[index])  # -1 da la última
+    index = np.searchsorted(positions, row, side="right")
+    return int(positions[index if index < len(positions) else 0])
+
+
+class MissingValueIndex:
+    """
+    Índice de los valores vacíos de cada columna: cuántos hay y en qué filas,
+    guardadas como un bitmap comprimido con np.packbits (un bit por fila; las
+    columnas sin vacíos no guardan nada). Se construye una vez al cargar los
+    datos y el preprocesado lo actualiza con lo que cambia (celdas rellenadas,
+    filas quitadas o repuestas), sin volver a recorrer la tabla.
+    Con un ColumnStore cada columna se indexa la primera vez que se usa, para
+    no leer el archivo entero del disco al abrirlo.
+    """
+    def __init__(self):
+        self.n_rows = 0
+        self.store = None
+        self.counts = {}  # Columna -> número de vacíos
+        self.bitmaps = {}  # Columna -> bitmap empaquetado (None si no hay vacíos)
+        self._positions = {}  # Columna -> posiciones ya descomprimidas, para navegar
+
+    def build(self, df=None, store=None):
+        """Indexa un DataFrame entero (con una sola pasada de isna) o prepara el de un ColumnStore."""
+        self.store = store
+        self.counts = {}
+        self.bitmaps = {}
+        self._positions = {}
+        if store is not None:
+            self.n_rows = store.n_rows
+            return
+        if df is None:
+            self.n_rows = 0
+            return
+        self.n_rows = len(df)
+        missing = df.isna().to_numpy()
+        for position, column in enumerate(df.columns):
+            self.set_mask(column, missing[:, position])
+
+    def _ensure(self, column):
+        if column not in self.counts and self.store is not None:
+            self.set_positions(column, self.store.missing_positions(column))
+
+    def set_mask(self, column, mask):
+        """Guarda los vacíos de la columna a partir de un array booleano por fila."""
+        mask = np.asarray(mask, dtype=bool)
+        count = int(np.count_nonzero(mask))
+        self.counts[column] = count
+        self.bitmaps[column] = np.packbits(mask) if count else None
+        self._positions.pop(column, None)
+
+    def set_positions(self, column, positions):
+        """Guarda los vacíos de la columna a partir de sus posiciones."""
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[positions] = True
+        self.set_mask(column, mask)
+
+    def clear(self, column):
+        """Marca la columna como sin vacíos (por ejemplo, tras rellenarla)."""
+        self.counts[column] = 0
+        self.bitmaps[column] = None
+        self._positions.pop(column, None)
+
+    def count(self, column):
+        self._ensure(column)
+        return self.counts.get(column, 0)
+
+    def missing_counts(self, columns):
+        """Número de vacíos de cada columna."""
+        return {column: self.count(column) for column in columns}
+
+    def mask(self, column):
+        """Array booleano con los vacíos de la columna."""
+        self._ensure(column)
+        bitmap = self.bitmaps.get(column)
+        if bitmap is None:
+            return np.zeros(self.n_rows, dtype=bool)
+        return np.unpackbits(bitmap, count=self.n_rows).view(bool)
+
+    def masks(self, columns):
+        """Array booleano (filas, columnas) con los vacíos de las columnas."""
+        if not columns:
+            return np.zeros((self.n_rows, 0), dtype=bool)
+        return np.column_stack([self.mask(column) for column in columns])
+
+    def positions(self, column):
+        """Posiciones ordenadas de los vacíos de la columna."""
+        self._ensure(column)
+        if column not in self._positions:
+            self._positions[column] = np.flatnonzero(self.mask(column))
+        return self._positions[column]
+
+    def rows_with_missing(self, columns):
+        """Posiciones ordenadas de las filas con algún vacío en las columnas."""
+        positions = [self.positions(column) for column in columns if self.count(column)]
+        if not positions:
+            return np.empty(0, dtype=np.int64)
+        return positions[0] if len(positions) == 1 else np.unique(np.concatenate(positions))
+
+    def snapshot(self, columns):
+        """Copia (barata) de los vacíos de las columnas, para restaurarla con restore."""
+        return {column: (self.count(column), self.bitmaps.get(column)) for column in columns}
+
+    def restore(self, snapshot):
+        for column, (count, bitmap) in snapshot.items():
+            self.counts[column] = count
+            self.bitmaps[column] = bitmap
+            self._positions.pop(column, None)
+
+    def remove_rows(self, positions):
+        """Quita del índice las filas de las posiciones indicadas."""
+        for column in list(self.counts):
+            if self.bitmaps[column] is not None:
+                self.set_mask_rows(column, np.delete(self.mask(column), positions))
+        self.n_rows -= len(positions)
+        self._positions = {}
+
+    def insert_rows(self, positions, missing):
+        """
+        Vuelve a poner filas en las posiciones indicadas (las de después de
+        insertarlas). missing es un DataFrame booleano con los vacíos de esas filas.
+        """
+        n_rows = self.n_rows + len(positions)
+        kept = np.ones(n_rows, dtype=bool)
+        kept[positions] = False
+        for column in list(self.counts):
+            inserted = missing[column].to_numpy(dtype=bool) if column in missing else np.zeros(len(positions), bool)
+            if self.bitmaps[column] is None and not inserted.any():
+                continue
+            mask = np.zeros(n_rows, dtype=bool)
+            mask[kept] = self.mask(column)
+            mask[positions] = inserted
+            self.set_mask_rows(column, mask)
+        self.n_rows = n_rows
+        self._positions = {}
+
+    def set_mask_rows(self, column, mask):
+        """Como set_mask, para un número de filas distinto del actual (se actualiza después)."""
+        count = int(np.count_nonzero(mask))
+        self.counts[column] = count
+        self.bitmaps[column] = np.packbits(mask) if count else None
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.pipeline import Pipeline
+
+# Con más columnas one-hot que estas, la matriz de diseño se crea dispersa (scipy.sparse)
+SPARSE_MIN_LEVELS = 50
+# Peso, en filas, de la media global al suavizar la media del objetivo de cada nivel
+TARGET_SMOOTHING = 10
+
+
+class MissingValueStep(BaseEstimator, TransformerMixin):
+    """
+    Repite un relleno de valores vacíos con datos nuevos, usando los valores
+    calculados con los datos de entrenamiento (values: columna -> valor), de modo
+    que no hace falta ajustarlo.
+    """
+    def __init__(self, strategy, columns, values=None):
+        self.strategy = strategy
+        self.columns = columns
+        self.values = values
+
+    def fit(self, X, y=None):
+        return self
+
+    def __sklearn_is_fitted__(self):
+        return True
+
+    def transform(self, X):
+        values = {column: value for column, value in (self.values or {}).items() if column in X.columns}
+        if not values:
+            return X
+        return X.fillna(values)
+
+
+class SelectColumns(BaseEstimator, TransformerMixin):
+    """
+    Se queda con las columnas de entrada. Las que no son categóricas se convierten
+    en números (los textos no numéricos pasan a NaN).
+    """
+    def __init__(self, columns, categorical=()):
+        self.columns = columns
+        self.categorical = categorical
+
+    def fit(self, X, y=None):
+        return self
+
+    def __sklearn_is_fitted__(self):
+        return True
+
+    def transform(self, X):
+        X = X[self.columns].copy()
+        for column in self.columns:
+            if column not in self.categorical:
+                X[column] = pd.to_numeric(X[column], errors="coerce")
+        return X
+
+
+class ToArray(BaseEstimator, TransformerMixin):
+    """Convierte el DataFrame en el array float64 que recibe el regresor."""
+    def fit(self, X, y=None):
+        return self
+
+    def __sklearn_is_fitted__(self):
+        return True
+
+    def transform(self, X):
+        return np.asarray(X, dtype=np.float64)
+
+
+class CategoricalEncoder(BaseEstimator, TransformerMixin):
+    """
+    Convierte las columnas de entrada en la matriz de diseño del regresor. Las
+    numéricas pasan tal cual y las categóricas se codifican con lo visto al ajustar:
+    - "One-Hot": una columna 0/1 por nivel salvo el primero, que queda en el
+      término independiente. Los niveles desconocidos o vacíos dan todo ceros.
+    - "Target": una columna con la media del objetivo en cada nivel, suavizada
+      hacia la media global (que es también la de los niveles desconocidos).
+    Si salen más de SPARSE_MIN_LEVELS columnas one-hot la matriz es una
+    scipy.sparse CSR, para no crear una tabla densa casi toda de ceros.
+    """
+    def __init__(self, columns, categorical, encoding="One-Hot"):
+        self.columns = columns
+        self.categorical = categorical
+        self.encoding = encoding
+
+    def fit(self, X, y=None):
+        self.levels_ = {}
+        self.target_means_ = {}
+        self.global_mean_ = float(np.mean(y)) if y is not None else 0.0
+        for column in self.categorical:
+            values = X[column].astype(object)
+            if self.encoding == "Target":
+                groups = pd.Series(np.asarray(y, dtype=np.float64)).groupby(values.to_numpy()).agg(["sum", "count"])
+                means = (groups["sum"] + TARGET_SMOOTHING * self.global_mean_) / (groups["count"] + TARGET_SMOOTHING)
+                self.target_means_[column] = means.to_dict()
+            else:
+                self.levels_[column] = sorted(values.dropna().unique(), key=str)
+        self.sparse_ = sum(len(levels) - 1 for levels in self.levels_.values()) > SPARSE_MIN_LEVELS
+        return self
+
+    def get_feature_names_out(self, input_features=None):
+        """Nombre de cada columna de la matriz: la columna de entrada y, si es categórica, su nivel."""
+        names = []
+        for column in self.columns:
+            if column not in self.categorical:
+                names.append(column)
+            elif self.encoding == "Target":
+                names.append(f"{column}[target mean]")
+            else:
+                names += [f"{column}[{level}]" for level in self.levels_[column][1:]]
+        return np.array(names, dtype=object)
+
+    def transform(self, X):
+        blocks = []
+        for column in self.columns:
+            if column not in self.categorical:
+                values = pd.to_numeric(X[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+                blocks.append(values.reshape(-1, 1))
+            elif self.encoding == "Target":
+                values = X[column].astype(object).map(self.target_means_[column]).astype(np.float64)
+                blocks.append(values.fillna(self.global_mean_).to_numpy().reshape(-1, 1))
+            else:
+                levels = self.levels_[column]
+                codes = pd.Categorical(X[column].astype(object), categories=levels).codes
+                rows = np.flatnonzero(codes > 0)
+                blocks.append(sparse.csr_matrix((np.ones(len(rows)), (rows, codes[rows] - 1)),
+                                                shape=(len(X), max(len(levels) - 1, 0))))
+        if self.sparse_:
+            return sparse.hstack([sparse.csr_matrix(block) for block in blocks], format="csr")
+        return np.hstack([block.toarray() if sparse.issparse(block) else block for block in blocks])
+
+
+def build_pipeline(steps, entry_columns, regressor, encoder=None):
+    """
+    Compila los pasos de preprocesado registrados (ver DataPreprocessorModel.steps)
+    y el regresor ya entrenado en un Pipeline de sklearn que recibe un DataFrame.
+    Con columnas categóricas, el CategoricalEncoder ya ajustado crea la matriz de diseño.
+    Solo se conservan los rellenos de las columnas de entrada. Los pasos
+    "Remove Rows" no se incluyen: al predecir no se quitan filas, y las que
+    sigan con huecos dan NaN (ver predict_with_pipeline).
+    """
+    categorical = list(encoder.categorical) if encoder is not None else []
+    chain = [("columns", SelectColumns(list(entry_columns), categorical))]
+    for position, step in enumerate(steps):
+        values = {column: value for column, value in step.get("values", {}).items() if column in entry_columns}
+        if values:
+            chain.append((f"step_{position}", MissingValueStep(step["strategy"], step["columns"], values)))
+    chain.append(("encoder", encoder) if encoder is not None else ("to_array", ToArray()))
+    chain.append(("regressor", regressor))
+    return Pipeline(chain)
+
+
+def predict_with_pipeline(pipeline, df):
+    """
+    Predice las filas de df con el Pipeline. Las filas que siguen teniendo huecos
+    tras el preprocesado dan NaN en lugar de un error.
+    """
+    X = pipeline[:-1].transform(df)
+    if sparse.issparse(X):
+        valid = np.ones(X.shape[0], dtype=bool)
+        X = X.tocsr()
+        valid[np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))[np.isnan(X.data)]] = False
+    else:
+        valid = ~np.isnan(X).any(axis=1)
+    predictions = np.full(X.shape[0], np.nan)
+    if valid.any():
+        predictions[valid] = pipeline[-1].predict(X[np.flatnonzero(valid)])
+    return predictions
@@ -0,0 +1,651 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from DataLoader import iter_file_chunks
+from GramCache import GramCache, frame_blocks
+
+# Filas de la muestra que se guarda de los datos leídos de disco
+SAMPLE_ROWS = 10000
+# Hilos con que se evalúan los folds de la validación cruzada: comparten los arrays de datos
+# sin copiarlos y los productos de NumPy liberan el GIL
+CV_WORKERS = min(8, os.cpu_count() or 1)
+
+# sklearn, joblib y matplotlib tardan en importarse y no hacen falta hasta crear,
+# guardar o dibujar un modelo, así que se importan dentro de los métodos que los usan.
+
+
+def hash_unit(rows, seed=42):
+    """Número en [0, 1) que depende solo de la posición de cada fila y de seed (hash splitmix64)."""
+    x = rows.astype(np.uint64) + np.uint64(seed * 0x9E3779B97F4A7C15 % 2 ** 64)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(np.float64) / float(2 ** 53)
+
+
+def hash_split(rows, test_size=0.3, seed=42):
+    """
+    Marca como filas de prueba, de forma determinista, una fracción test_size de
+    las filas a partir de un hash de su posición. No necesita ver todas las filas
+    a la vez, así que sirve para dividir datos que se recorren por bloques.
+    """
+    return hash_unit(rows, seed) < test_size
+
+
+def hash_folds(rows, folds, seed=42):
+    """Como hash_split, pero reparte las filas en folds grupos (para la validación cruzada por bloques)."""
+    return np.minimum((hash_unit(rows, seed) * folds).astype(np.int64), folds - 1)
+
+
+def kfold_groups(n_rows, folds, seed=42):
+    """Fold de cada fila: reparto aleatorio en folds grupos de tamaño casi igual, como KFold(shuffle=True)."""
+    groups = np.empty(n_rows, dtype=np.int64)
+    groups[np.random.default_rng(seed).permutation(n_rows)] = np.arange(n_rows) % folds
+    return groups
+
+
+def regression_metrics(count, absolute_sum, residual_squares, total_squares):
+    """MAE, RMSE y R² a partir de las sumas de los residuos (R² como r2_score con y constante)."""
+    count = max(count, 1)
+    if total_squares > 0:
+        r2 = 1 - residual_squares / total_squares
+    else:
+        r2 = 1.0 if residual_squares == 0 else 0.0
+    return absolute_sum / count, np.sqrt(residual_squares / count), r2
+
+
+def linear_regression(coefficients, intercept):
+    """
+    LinearRegression de sklearn con los coeficientes ya calculados (para el
+    Pipeline). También para Ridge, Lasso y ElasticNet: sus coeficientes salen de
+    las columnas estandarizadas y el alpha elegido se guarda en regularization.
+    """
+    from sklearn.linear_model import LinearRegression
+    model = LinearRegression()
+    model.coef_ = np.asarray(coefficients, dtype=np.float64)
+    model.intercept_ = float(intercept)
+    model.n_features_in_ = len(model.coef_)
+    return model
+
+
+def fold_result(repeat, fold, metrics, seconds):
+    mae, rmse, r2 = metrics
+    return {"repeat": repeat, "fold": fold, "mae": float(mae), "rmse": float(rmse), "r2": float(r2),
+            "seconds": seconds}
+
+
+def summarize_folds(results):
+    """Media y desviación típica de MAE, RMSE y R² de los folds: {métrica: (media, desviación)}."""
+    return {metric: (float(np.mean([result[metric] for result in results])),
+                     float(np.std([result[metric] for result in results])))
+            for metric in ("mae", "rmse", "r2")}
+
+
+class LinearModelModel():
+    def __init__(self, df):
+        self.df = df
+        self.store = None  # ColumnStore cuando los datos se leen desde disco
+        self.missing_index = None  # MissingValueIndex de los datos, si lo hay (ver DataPreprocessorModel)
+        # Archivo que se lee por bloques al entrenar, sin cargarlo (una tabla SQLite mostrada por páginas)
+        self.source_file = None
+        self.sample = None  # Muestra de filas de los datos leídos de disco, para el gráfico y el archivo
+        self.entry_columns = None
+        self.target_column = None
+        self.model = None
+        self.description = ""
+        self.formula = ""
+        self.errors = ""
+        # Pasos de preprocesado aplicados a los datos (DataPreprocessorModel.steps) y
+        # Pipeline que los repite con datos nuevos antes del regresor
+        self.preprocessing_steps = []
+        self.pipeline = None
+        # Codificación de las columnas categóricas ("One-Hot" o "Target"), el CategoricalEncoder
+        # ajustado (None si todas las entradas son numéricas) y el nombre de cada coeficiente
+        self.encoding = "One-Hot"
+        self.encoder = None
+        self.feature_names = []
+        # Validación cruzada tras entrenar: número de folds (0 para no hacerla), repeticiones
+        # con repartos distintos, resultado de cada fold y tiempo de las pasadas por las filas
+        # que comparten los folds de cada repetición (ver cross_validate)
+        self.cv_folds = 0
+        self.cv_repeats = 1
+        self.cv_results = []
+        self.cv_pass_seconds = []
+        # XᵀX y Xᵀy de las columnas numéricas, para resolver cualquier combinación de columnas sin reentrenar
+        self.gram = GramCache()
+        # Regresor ("Linear Regression", "Ridge", "Lasso" o "ElasticNet") y, si es regularizado,
+        # su camino de regularización con el alpha elegido (ver Regularization.regularization_path)
+        self.regressor = "Linear Regression"
+        self.regularization = None
+
+    def create_model(self, entry_columns, target_column):
+        """
+        Crea el modelo de regresión lineal con las columnas seleccionadas y, si
+        cv_folds lo pide, añade a los resultados la validación cruzada.
+        """
+        self.cv_results = []
+        self.cv_pass_seconds = []
+        if not self.fit_model(entry_columns, target_column):
+            return False
+        if self.cv_folds:
+            self.cross_validate(self.cv_folds, self.cv_repeats)
+        return True
+
+    def fit_model(self, entry_columns, target_column):
+        """Entrena el modelo de regresión lineal con las columnas seleccionadas y genera los resultados."""
+        self.entry_columns = entry_columns
+        self.target_column = target_column
+        self.encoder = None
+        self.regularization = None
+        self.feature_names = list(entry_columns or [])
+        if not self.entry_columns or not self.target_column:
+            return False
+
+        if self.store is not None:
+            return self.create_model_out_of_core()
+        if self.source_file is not None:
+            return self.create_model_from_file()
+        
+        if self.missing_index is not None:
+            if any(self.missing_index.missing_counts(self.entry_columns + [self.target_column]).values()):
+                return False
+        elif self.df[self.entry_columns].isnull().any().any() or self.df[self.target_column].isnull().any():
+            return False
+
+        # Las columnas de entrada no numéricas se codifican (ver CategoricalEncoder)
+        categorical = [column for column in self.entry_columns
+                       if not pd.api.types.is_numeric_dtype(self.df[column])]
+        
+        # Verificar que la columna objetivo sea numérica
+        if not pd.api.types.is_numeric_dtype(self.df[self.target_column]):
+            return False
+        # Se entrena en float64 aunque las columnas se hayan cargado con tipos reducidos
+        y = self.df[self.target_column].to_numpy(dtype=np.float64)
+
+        from sklearn.metrics import mean_absolute_error, root_mean_squared_error, r2_score
+        from sklearn.model_selection import train_test_split
+
+        # Sin columnas categóricas el modelo se resuelve con los productos cruzados en caché
+        if not categorical and self.create_model_from_gram():
+            return True
+
+        # Dividir los datos en conjuntos de entrenamiento y prueba
+        train_rows, test_rows = train_test_split(np.arange(len(self.df)), test_size=0.3, random_state=42)
+        if categorical:
+            # La codificación se ajusta solo con las filas de entrenamiento
+            from PreprocessingPipeline import CategoricalEncoder
+            self.encoder = CategoricalEncoder(self.entry_columns, categorical, self.encoding)
+            self.encoder.fit(self.df[self.entry_columns].iloc[train_rows], y[train_rows])
+            X = self.encoder.transform(self.df)
+            self.feature_names = list(self.encoder.get_feature_names_out())
+        else:
+            X = self.df[self.entry_columns].to_numpy(dtype=np.float64)
+        X_train, X_test, y_train, y_test = X[train_rows], X[test_rows], y[train_rows], y[test_rows]
+
+        # Crear y entrenar el modelo de regresión lineal
+        if self.regressor == "Linear Regression":
+            from sklearn.linear_model import LinearRegression
+            self.model = LinearRegression()
+            self.model.fit(X_train, y_train)
+        else:
+            from Regularization import moments_from_rows
+            self.set_model(*self.solve_moments(moments_from_rows(X_train, y_train), X_train, y_train))
+        self.compile_pipeline()
+
+        # Calcular y mostrar métricas de error en los datos de prueba
+        y_pred_train = self.model.predict(X_train)
+        y_pred_test = self.model.predict(X_test)
+        
+        # Métricas en entrenamiento
+        mae_train = mean_absolute_error(y_train, y_pred_train)
+        rmse_train = root_mean_squared_error(y_train, y_pred_train)
+        r2_train = r2_score(y_train, y_pred_train)
+        
+        # Métricas en prueba
+        mae_test = mean_absolute_error(y_test, y_pred_test)
+        rmse_test = root_mean_squared_error(y_test, y_pred_test)
+        r2_test = r2_score(y_test, y_pred_test)
+
+        self.set_results((mae_train, rmse_train, r2_train), (mae_test, rmse_test, r2_test))
+        return True
+
+    def data_changed(self, columns):
+        """Avisa de que las columnas del DataFrame han cambiado (por ejemplo, al rellenar sus vacíos)."""
+        self.gram.touch(columns)
+
+    def create_model_from_gram(self):
+        """
+        Entrena el modelo con las ecuaciones normales a partir de GramCache, que
+        guarda XᵀX y Xᵀy de todas las columnas numéricas para la versión actual de
+        los datos y la división entrenamiento/prueba (la misma de train_test_split).
+        Así, probar otra combinación de columnas no vuelve a recorrer las filas
+        salvo para el MAE, que no se puede obtener de los productos cruzados.
+        Devuelve False si las columnas no se pueden resolver así.
+        """
+        if self.gram.df is not self.df:
+            self.gram.set_data(self.df, self.missing_index)
+        key = ("holdout", len(self.df))
+        if self.gram.split_key != key:
+            from sklearn.model_selection import train_test_split
+            groups = np.zeros(len(self.df), dtype=np.int64)
+            groups[train_test_split(np.arange(len(self.df)), test_size=0.3, random_state=42)[1]] = 1
+            self.gram.set_split(key, groups)
+        if not self.gram.ensure(self.entry_columns + [self.target_column]):
+            return False
+
+        # Solo Ridge usa las filas (leave-one-out), y solo si son pocas: las demás salen de los productos cruzados
+        X = y = None
+        if self.regressor == "Ridge":
+            from Regularization import LOO_MAX_ROWS
+            train = np.flatnonzero(self.gram.groups == 0)
+            if len(train) <= LOO_MAX_ROWS:
+                X = self.df[self.entry_columns].iloc[train].to_numpy(dtype=np.float64)
+                y = self.df[self.target_column].iloc[train].to_numpy(dtype=np.float64)
+        coefficients, intercept = self.solve(self.gram, [0], X, y)
+        self.set_model(coefficients, intercept)
+        self.compile_pipeline()
+
+        # Σ|e| de cada grupo recorriendo las filas por bloques; RMSE y R² salen de los productos cruzados
+        n_features = len(self.entry_columns)
+        absolute_sums = np.zeros(2)
+        for start, block in frame_blocks(self.df, self.entry_columns + [self.target_column], self.gram.block_size):
+            residuals = np.abs(block[:, n_features] - block[:, :n_features] @ coefficients - intercept)
+            absolute_sums += np.bincount(self.gram.labels(start, len(block)), weights=residuals, minlength=2)
+        metrics = []
+        for group in (0, 1):
+            count, residual_squares, total_squares = self.gram.sums_of_squares(
+                self.entry_columns, self.target_column, coefficients, intercept, [group])
+            metrics.append(regression_metrics(count, absolute_sums[group], residual_squares, total_squares))
+
+        self.set_results(metrics[0], metrics[1])
+        return True
+
+    def solve(self, gram, groups, X=None, y=None):
+        """
+        Coeficientes y término independiente del regresor elegido con los productos
+        cruzados de los grupos de filas de gram. Con Ridge, Lasso o ElasticNet se
+        calcula el camino de regularización y se guarda en regularization; X e y
+        (las filas de entrenamiento, si están en memoria) permiten a Ridge elegir
+        alpha con leave-one-out.
+        """
+        if self.regressor == "Linear Regression":
+            return gram.solve(self.entry_columns, self.target_column, groups)
+        return self.solve_moments(gram.moments(self.entry_columns + [self.target_column], groups), X, y)
+
+    def solve_moments(self, moments, X=None, y=None):
+        """Como solve, con las filas, medias y productos centrados ya calculados (ver GramCache.moments)."""
+        from Regularization import regularization_path
+        self.regularization = regularization_path(self.regressor, *moments, X, y)
+        return self.regularization["coefficients"], self.regularization["intercept"]
+
+    def solve_fold(self, moments):
+        """Coeficientes y término independiente de un fold de la validación cruzada, con el alpha ya elegido."""
+        from Regularization import fit_alpha
+        return fit_alpha(self.regressor, self.regularization["alpha"], *moments)
+
+    def set_model(self, coefficients, intercept):
+        """Crea el estimador de sklearn con los coeficientes calculados."""
+        self.model = linear_regression(coefficients, intercept)
+
+    def set_results(self, train_metrics, test_metrics):
+        """Genera la fórmula y el texto de métricas (MAE, RMSE, R²) del modelo entrenado."""
+        # Generar la fórmula de regresión
+        self.formula = f"{self.target_column} = " + " + ".join(
+            [f"{coef:.3f}*{name}" for coef, name in zip(self.model.coef_, self.feature_names)]
+        ) + f" + {self.model.intercept_:.3f}"
+
+        # Mostrar métricas en los datos de prueba
+        mae_train, rmse_train, r2_train = train_metrics
+        mae_test, rmse_test, r2_test = test_metrics
+        self.description = ""
+        self.errors = str(f"Training MAE: {mae_train:.3f}, RMSE: {rmse_train:.3f}, R²: {r2_train:.3f}\n" + f"Test MAE: {mae_test:.3f}, RMSE: {rmse_test:.3f}, R²: {r2_test:.3f}")
+        if self.regularization is not None:
+            path = self.regularization
+            self.errors = f"{path['regressor']} alpha: {path['alpha']:.4g} (chosen by {path['criterion']} " \
+                          f"over {len(path['alphas'])} values)\n" + self.errors
+
+    def create_model_out_of_core(self):
+        """Entrena el modelo recorriendo el ColumnStore por bloques (ver fit_streaming)."""
+        columns = self.entry_columns + [self.target_column]
+        if any(column not in self.store.columns for column in columns):
+            return False
+        index = self.missing_index if self.missing_index is not None else self.store
+        if any(index.missing_counts(columns).values()):
+            return False
+        return self.fit_streaming(lambda: self.blocks(columns))
+
+    def create_model_from_file(self):
+        """
+        Entrena el modelo leyendo source_file (CSV, Excel o SQLite) por bloques, solo
+        con las columnas del modelo, sin cargarlo en memoria (ver fit_streaming).
+        """
+        columns = self.entry_columns + [self.target_column]
+        try:
+            return self.fit_streaming(lambda: self.blocks(columns))
+        except (KeyError, ValueError):
+            return False  # Columnas que no están en el archivo
+
+    def blocks(self, columns):
+        """
+        Recorre por bloques las columnas de los datos en disco (el ColumnStore o
+        source_file). Devuelve tuplas (fila inicial, array float64 filas x columnas).
+        """
+        if self.store is not None:
+            yield from self.store.iter_blocks(columns)
+            return
+        start = 0
+        for chunk, _, _ in iter_file_chunks(self.source_file, columns=columns):
+            # Los textos no numéricos pasan a NaN y hacen que el entrenamiento se rechace
+            values = np.column_stack([pd.to_numeric(chunk[column], errors="coerce")
+                                      .to_numpy(dtype=np.float64, na_value=np.nan) for column in columns])
+            yield start, values
+            start += len(values)
+
+    def fit_streaming(self, read_blocks):
+        """
+        Entrena el modelo con los bloques (fila inicial, array filas x columnas del
+        modelo) que devuelve read_blocks(), sin tener nunca más de un bloque en
+        memoria: GramCache acumula XᵀX, Xᵀy y las sumas de las filas de
+        entrenamiento y de prueba (divididas con hash_split) en una pasada, y con
+        ellas se resuelven las ecuaciones normales y se obtienen RMSE y R². El MAE
+        necesita los residuos, así que se calcula con una segunda pasada, que
+        además guarda una muestra de filas para el gráfico y el archivo del modelo.
+        La memoria es O(columnas²) sea cual sea el número de filas.
+        Devuelve False si hay valores vacíos o no numéricos.
+        """
+        columns = self.entry_columns + [self.target_column]
+        gram = GramCache()
+        gram.set_split("hash", lambda rows: hash_split(rows).astype(np.int64), n_groups=2)
+        gram.select(columns)
+        gram.accumulate(columns, read_blocks())
+        if not gram.counts.sum() or np.isnan(gram.products).any():
+            return False
+
+        coefficients, intercept = self.solve(gram, [0])
+        self.set_model(coefficients, intercept)
+        self.compile_pipeline()
+
+        # Segunda pasada: Σ|e| de entrenamiento y de prueba y una muestra repartida por todas las filas
+        n_features = len(self.entry_columns)
+        step = max(1, int(gram.counts.sum()) // SAMPLE_ROWS)
+        absolute_sums = np.zeros(2)
+        sample = []
+        for start, block in read_blocks():
+            residuals = np.abs(block[:, n_features] - block[:, :n_features] @ coefficients - intercept)
+            absolute_sums += np.bincount(gram.labels(start, len(block)), weights=residuals, minlength=2)
+            sample.append(block[(-start) % step::step])
+        self.sample = pd.DataFrame(np.concatenate(sample), columns=columns)
+
+        metrics = []
+        for group in (0, 1):
+            count, residual_squares, total_squares = gram.sums_of_squares(
+                self.entry_columns, self.target_column, coefficients, intercept, [group])
+            metrics.append(regression_metrics(count, absolute_sums[group], residual_squares, total_squares))
+
+        self.set_results(metrics[0], metrics[1])
+        return True
+
+    def cross_validate(self, folds=5, repeats=1, workers=CV_WORKERS):
+        """
+        Validación cruzada de k folds del modelo actual (mismas columnas y
+        codificación), repetida repeats veces con repartos distintos de las filas.
+        Los folds se evalúan a la vez en un grupo de hilos que comparten los arrays
+        de datos, sin copiarlos en cada uno:
+        - Con columnas numéricas, GramCache acumula XᵀX de cada fold en una pasada
+          y el modelo de cada fold se resuelve con los productos de los demás.
+        - Con columnas categóricas, cada fold ajusta su codificación y su LinearRegression.
+        - Con datos en disco, los folds salen de hash_folds y el MAE de una segunda pasada.
+        Con Ridge, Lasso o ElasticNet cada fold usa el alpha elegido al entrenar.
+        Guarda en cv_results un diccionario por fold (repeat, fold, mae, rmse, r2 y
+        seconds, el tiempo propio del fold), en cv_pass_seconds el tiempo de las
+        pasadas por las filas que comparten los folds de cada repetición (0 si cada
+        fold recorre las suyas) y añade a errors la media ± desviación típica.
+        """
+        results = []
+        pass_seconds = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for repeat in range(repeats):
+                if self.store is not None or self.source_file is not None:
+                    repeat_results, seconds = self.cross_validate_streaming(folds, repeat, pool)
+                elif self.encoder is not None:
+                    repeat_results, seconds = self.cross_validate_encoded(folds, repeat, pool)
+                else:
+                    repeat_results, seconds = self.cross_validate_gram(folds, repeat, pool)
+                results += repeat_results
+                pass_seconds.append(seconds)
+        self.cv_results = results
+        self.cv_pass_seconds = pass_seconds
+        self.errors += "\n" + self.describe_cross_validation(folds, repeats)
+        return results
+
+    def cross_validate_gram(self, folds, repeat, pool):
+        columns = self.entry_columns + [self.target_column]
+        started = time.perf_counter()
+        groups = kfold_groups(len(self.df), folds, seed=42 + repeat)
+        gram = GramCache(max_columns=len(columns))
+        gram.set_data(self.df, self.missing_index)
+        gram.set_split(("kfold", folds, repeat), groups)
+        gram.ensure(columns)
+        X = self.df[self.entry_columns].to_numpy(dtype=np.float64)
+        y = self.df[self.target_column].to_numpy(dtype=np.float64)
+        pass_seconds = time.perf_counter() - started
+
+        def run(fold):
+            started = time.perf_counter()
+            training = [group for group in range(folds) if group != fold]
+            coefficients, intercept = self.solve_training(gram, training)
+            rows = np.flatnonzero(groups == fold)
+            absolute_sum = np.abs(y[rows] - X[rows] @ coefficients - intercept).sum()
+            count, residual_squares, total_squares = gram.sums_of_squares(
+                self.entry_columns, self.target_column, coefficients, intercept, [fold])
+            metrics = regression_metrics(count, absolute_sum, residual_squares, total_squares)
+            return fold_result(repeat, fold, metrics, time.perf_counter() - started)
+        return list(pool.map(run, range(folds))), pass_seconds
+
+    def solve_training(self, gram, training):
+        """Modelo de un fold con los productos cruzados de los grupos de entrenamiento."""
+        if self.regularization is None:
+            return gram.solve(self.entry_columns, self.target_column, training)
+        return self.solve_fold(gram.moments(self.entry_columns + [self.target_column], training))
+
+    def cross_validate_encoded(self, folds, repeat, pool):
+        from sklearn.linear_model import LinearRegression
+        from PreprocessingPipeline import CategoricalEncoder
+        from Regularization import moments_from_rows
+        groups = kfold_groups(len(self.df), folds, seed=42 + repeat)
+        frame = self.df[self.entry_columns]
+        y = self.df[self.target_column].to_numpy(dtype=np.float64)
+
+        def run(fold):
+            started = time.perf_counter()
+            test = groups == fold
+            encoder = CategoricalEncoder(self.entry_columns, self.encoder.categorical, self.encoding)
+            encoder.fit(frame[~test], y[~test])
+            X_train = encoder.transform(frame[~test])
+            if self.regularization is None:
+                model = LinearRegression().fit(X_train, y[~test])
+            else:
+                model = linear_regression(*self.solve_fold(moments_from_rows(X_train, y[~test])))
+            y_test = y[test]
+            residuals = y_test - model.predict(encoder.transform(frame[test]))
+            metrics = regression_metrics(len(y_test), np.abs(residuals).sum(), residuals @ residuals,
+                                         ((y_test - y_test.mean()) ** 2).sum())
+            return fold_result(repeat, fold, metrics, time.perf_counter() - started)
+        # Cada fold codifica y recorre sus propias filas: no hay pasada compartida
+        return list(pool.map(run, range(folds))), 0.0
+
+    def cross_validate_streaming(self, folds, repeat, pool):
+        columns = self.entry_columns + [self.target_column]
+        n_features = len(self.entry_columns)
+        started = time.perf_counter()
+        gram = GramCache()
+        gram.set_split(("kfold", folds, repeat), lambda rows: hash_folds(rows, folds, seed=42 + repeat),
+                       n_groups=folds)
+        gram.select(columns)
+        gram.accumulate(columns, self.blocks(columns))
+        pass_seconds = time.perf_counter() - started
+
+        def solve(fold):
+            started = time.perf_counter()
+            training = [group for group in range(folds) if group != fold]
+            coefficients, intercept = self.solve_training(gram, training)
+            return coefficients, intercept, time.perf_counter() - started
+        solutions = list(pool.map(solve, range(folds)))
+
+        # Segunda pasada: Σ|e| de cada fold con su propio modelo
+        started = time.perf_counter()
+        coefficients = np.column_stack([solution[0] for solution in solutions])
+        intercepts = np.array([solution[1] for solution in solutions])
+        absolute_sums = np.zeros(folds)
+        for start, block in self.blocks(columns):
+            labels = gram.labels(start, len(block))
+            predictions = (block[:, :n_features] @ coefficients + intercepts)[np.arange(len(block)), labels]
+            absolute_sums += np.bincount(labels, weights=np.abs(block[:, n_features] - predictions), minlength=folds)
+        pass_seconds += time.perf_counter() - started
+
+        results = []
+        for fold, (fold_coefficients, intercept, seconds) in enumerate(solutions):
+            count, residual_squares, total_squares = gram.sums_of_squares(
+                self.entry_columns, self.target_column, fold_coefficients, intercept, [fold])
+            metrics = regression_metrics(count, absolute_sums[fold], residual_squares, total_squares)
+            results.append(fold_result(repeat, fold, metrics, seconds))
+        return results, pass_seconds
+
+    def describe_cross_validation(self, folds, repeats):
+        """
+        Texto con la media ± desviación de las métricas de los folds y los tiempos:
+        el de las pasadas compartidas de cada repetición, si las hay, aparte del de
+        cada fold, que entonces solo resuelve su modelo y lo evalúa.
+        """
+        summary = summarize_folds(self.cv_results)
+        name = f"{folds}-fold CV" + (f" x{repeats}" if repeats > 1 else "")
+        text = f"{name} MAE: {summary['mae'][0]:.3f} ± {summary['mae'][1]:.3f}, " \
+               f"RMSE: {summary['rmse'][0]:.3f} ± {summary['rmse'][1]:.3f}, " \
+               f"R²: {summary['r2'][0]:.3f} ± {summary['r2'][1]:.3f}"
+        times = ", ".join(f"{result['seconds'] * 1000:.1f}" for result in self.cv_results)
+        if not any(self.cv_pass_seconds):
+            return text + f"\nFold times (ms): {times}"
+        passes = ", ".join(f"{seconds * 1000:.1f}" for seconds in self.cv_pass_seconds)
+        return text + f"\nShared pass over the rows (ms): {passes}\nFold solve times (ms): {times}"
+
+    def model_data(self):
+        """Filas con las que se dibuja y se guarda el modelo: todas o, si se leen de disco, una muestra."""
+        if self.store is not None or self.source_file is not None:
+            return self.sample
+        return self.df
+    
+    def compile_pipeline(self):
+        """Une los pasos de preprocesado registrados y el modelo entrenado en un Pipeline."""
+        from PreprocessingPipeline import build_pipeline
+        self.pipeline = build_pipeline(self.preprocessing_steps, self.entry_columns, self.model, self.encoder)
+
+    def predict(self, df):
+        """
+        Predice la columna objetivo para las filas de df, rellenando antes los huecos
+        igual que en los datos de entrenamiento. Las filas que siguen con huecos dan NaN.
+        """
+        from PreprocessingPipeline import predict_with_pipeline
+        if self.pipeline is None:
+            self.compile_pipeline()
+        return predict_with_pipeline(self.pipeline, df)
+
+    def evaluate(self, df):
+        """Calcula MAE, RMSE y R² del modelo sobre las filas de df que tienen todos los valores."""
+        from sklearn.metrics import mean_absolute_error, root_mean_squared_error, r2_score
+        predictions = self.predict(df)
+        y = pd.to_numeric(df[self.target_column], errors="coerce").to_numpy(dtype=np.float64)
+        valid = ~np.isnan(predictions) & ~np.isnan(y)
+        if not valid.any():
+            raise ValueError("No rows with values for every model column.")
+        return (mean_absolute_error(y[valid], predictions[valid]),
+                root_mean_squared_error(y[valid], predictions[valid]),
+                r2_score(y[valid], predictions[valid]))
+
+    def plot_regression(self):
+            # Usa las columnas seleccionadas si no se especifican
+            if not self.entry_columns or len(self.entry_columns) != 1 or self.encoder is not None:
+                return False
+
+            # Con datos en disco se dibuja una muestra de filas
+            df = self.model_data()
+            X = df[self.entry_columns].to_numpy(dtype=np.float64)
+            y = df[self.target_column].to_numpy(dtype=np.float64)
+            y_pred = self.model.predict(X)
+            # Configura la gráfica
+            import matplotlib.pyplot as plt
+            fig, ax = plt.subplots()
+            ax.scatter(X, y, color='blue', label="Actual Data")
+            ax.plot(X, y_pred, color='red', label="Regression Line")
+            ax.set_xlabel(self.entry_columns[0])
+            ax.set_ylabel(self.target_column)
+            ax.legend()
+            return fig
+    
+    def plot_path(self):
+        """
+        Dibuja el camino de regularización: el coeficiente (estandarizado) de cada
+        columna frente a alpha, con el alpha elegido marcado. False si el regresor
+        no está regularizado.
+        """
+        if self.regularization is None:
+            return False
+        path = self.regularization
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots()
+        lines = ax.plot(path["alphas"], path["path"])
+        ax.set_xscale("log")
+        ax.axvline(path["alpha"], color="black", linestyle="--", label=f"alpha = {path['alpha']:.4g}")
+        ax.set_xlabel("alpha")
+        ax.set_ylabel("Standardized coefficient")
+        ax.set_title(f"{path['regressor']} coefficient path")
+        # Con muchas columnas la leyenda taparía el gráfico: solo se nombran las primeras
+        for line, name in list(zip(lines, self.feature_names))[:10]:
+            line.set_label(name)
+        ax.legend(fontsize="small")
+        return fig
+
+    def save_model(self, file_path):
+        """Abre un diálogo para guardar el modelo y los datos asociados en el archivo seleccionado por el usuario."""
+        # Empaqueta los datos del modelo para guardar (de los datos en disco solo se guarda una muestra)
+        df = self.model_data()
+        model_data = {"model": self.model,"input_columns": self.entry_columns,"output_column": self.target_column,
+                      "errors":  self.errors, "description": self.description, "formula": self.formula, "df":df,
+                      "preprocessing": self.preprocessing_steps, "pipeline": self.pipeline,
+                      "regularization": self.regularization}
+
+        # Intenta guardar el archivo y maneja errores
+        import joblib
+        joblib.dump(model_data, file_path)
+    
+    def load_model(self, file_name):
+        """Carga el modelo .joblib y muestra los datos correspondientes"""
+        if file_name:
+            import joblib
+            model_data = joblib.load(file_name)
+            self.model = model_data["model"]
+            self.df = model_data["df"]
+            self.store = None
+            self.source_file = None
+            self.missing_index = None
+            self.entry_columns = model_data["input_columns"]
+            self.target_column = model_data["output_column"]
+            self.formula = model_data["formula"]
+            self.errors = model_data["errors"]
+            self.description = model_data["description"]
+            # Los modelos guardados antes de registrar el preprocesado no tienen Pipeline
+            self.preprocessing_steps = model_data.get("preprocessing", [])
+            self.pipeline = model_data.get("pipeline")
+            self.encoder = None
+            if self.pipeline is None:
+                self.compile_pipeline()
+            self.encoder = self.pipeline.named_steps.get("encoder")
+            self.regularization = model_data.get("regularization")
+            self.regressor = self.regularization["regressor"] if self.regularization else "Linear Regression"
+            self.feature_names = list(self.encoder.get_feature_names_out()) if self.encoder is not None \
+                else list(self.entry_columns)
+            return True
+        else:
+            return False
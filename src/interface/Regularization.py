@@ -0,0 +1,252 @@
+import numpy as np
+from scipy import sparse
+
+# Proporción L1 de la penalización de cada regresor regularizado (ver ColumnSelector.REGRESSORS)
+L1_RATIOS = {"Ridge": 0.0, "Lasso": 1.0, "ElasticNet": 0.5}
+# Valores de alpha del camino de regularización, de mayor a menor
+N_ALPHAS = 100
+# El alpha más pequeño de Lasso y ElasticNet es esta fracción del más grande (el que anula todos los coeficientes)
+ALPHA_RATIO = 1e-3
+# Potencias de 10 entre las que se prueba alpha en Ridge (con las columnas estandarizadas)
+RIDGE_ALPHA_RANGE = (3, -5)
+# Si el mejor alpha queda en un extremo de la rejilla, se amplía una década por ese lado hasta estas veces
+GRID_EXTENSIONS = 3
+# y solo mientras la ampliación anterior haya bajado el error estimado al menos esta fracción
+GRID_MIN_GAIN = 1e-3
+# Descenso por coordenadas: brecha dual (en fracción de la varianza de y) para parar y vueltas máximas por alpha
+CD_TOLERANCE = 1e-6
+CD_MAX_ITER = 1000
+# Con más filas de entrenamiento, Ridge elige alpha con GCV en lugar de leave-one-out (que necesita la SVD de X)
+LOO_MAX_ROWS = 50000
+
+
+def moments_from_rows(X, y):
+    """Filas, medias y productos cruzados centrados de las columnas de X (densa o dispersa) y de y."""
+    count = X.shape[0]
+    if sparse.issparse(X):
+        Z = sparse.hstack([X, sparse.csr_matrix(np.asarray(y, dtype=np.float64).reshape(-1, 1))], format="csr")
+        products = (Z.T @ Z).toarray()
+        mean = np.asarray(Z.mean(axis=0)).ravel()
+    else:
+        Z = np.column_stack([X, y])
+        mean = Z.mean(axis=0)
+        products = Z.T @ Z
+    return count, mean, products - count * np.outer(mean, mean)
+
+
+def standardize_moments(count, centered):
+    """
+    Correlaciones (XᵀX / n), covarianzas con y (Xᵀy / n) y varianza de y (1, o 0
+    si y es constante) con las columnas y el objetivo estandarizados, a partir de
+    los productos centrados de (X, y). Devuelve también la desviación típica de
+    cada columna y la de y (1 en las constantes).
+    """
+    deviations = np.sqrt(np.maximum(np.diag(centered), 0.0) / count)
+    deviations[~(deviations > 0)] = 1.0
+    standardized = centered / (count * np.outer(deviations, deviations))
+    n_features = centered.shape[0] - 1
+    return (standardized[:n_features, :n_features], standardized[:n_features, n_features],
+            standardized[n_features, n_features], deviations[:n_features], deviations[n_features])
+
+
+def alpha_grid(regressor, gram, covariance):
+    """N_ALPHAS valores de alpha de mayor a menor para el regresor."""
+    if regressor == "Ridge":
+        # Los autovalores de la matriz de correlaciones suman el número de columnas
+        return np.logspace(*RIDGE_ALPHA_RANGE, N_ALPHAS)
+    alpha_max = np.abs(covariance).max() / L1_RATIOS[regressor] if len(covariance) else 1.0
+    alpha_max = alpha_max if alpha_max > 0 else 1.0
+    return alpha_max * np.logspace(0, np.log10(ALPHA_RATIO), N_ALPHAS)
+
+
+def ridge_path(gram, covariance, alphas):
+    """
+    Coeficientes de Ridge (columnas estandarizadas) para todos los alphas con una
+    sola descomposición de la matriz de correlaciones (equivalente a la SVD de X):
+    β(α) = V diag(1 / (λ + α)) Vᵀ Xᵀy, de modo que cada alpha cuesta O(p²).
+    Devuelve la matriz (alphas, columnas) y los grados de libertad Σ λ / (λ + α).
+    """
+    eigenvalues, vectors = np.linalg.eigh(gram)
+    eigenvalues = np.maximum(eigenvalues, 0.0)
+    projected = vectors.T @ covariance
+    shrink = 1.0 / (eigenvalues[None, :] + alphas[:, None])
+    return (shrink * projected) @ vectors.T, (eigenvalues[None, :] * shrink).sum(axis=1)
+
+
+def duality_gap(gram, covariance, variance, gradient, coefficients, alpha, l1_ratio):
+    """Cota del error del objetivo de coordinate_descent (la misma brecha dual que usa sklearn para parar)."""
+    l1, l2 = alpha * l1_ratio, alpha * (1 - l1_ratio)
+    residual_norm = max(variance - covariance @ coefficients - gradient @ coefficients, 0.0)  # ||y - Xβ||² / n
+    dual_norm = np.abs(gradient - l2 * coefficients).max() if len(coefficients) else 0.0
+    const = l1 / dual_norm if dual_norm > l1 else 1.0
+    gap = 0.5 * residual_norm * (1 + const ** 2)
+    y_residual = variance - covariance @ coefficients  # yᵀ(y - Xβ) / n
+    return gap + l1 * np.abs(coefficients).sum() - const * y_residual \
+        + 0.5 * l2 * (1 + const ** 2) * coefficients @ coefficients
+
+
+def coordinate_descent(gram, covariance, variance, alpha, l1_ratio, coefficients, tolerance=CD_TOLERANCE,
+                       max_iter=CD_MAX_ITER):
+    """
+    Minimiza ||y - Xβ||² / (2n) + alpha · (l1_ratio · ||β||₁ + (1 - l1_ratio) / 2 · ||β||²)
+    por descenso por coordenadas con la matriz de correlaciones (el mismo objetivo
+    que ElasticNet de sklearn), hasta que la brecha dual baja de tolerance veces
+    la varianza de y. Empieza en coefficients (se modifica in situ), de modo que
+    en un camino cada alpha arranca de la solución del anterior y solo necesita
+    unas pocas vueltas. Devuelve el número de vueltas.
+    """
+    l1 = alpha * l1_ratio
+    denominators = np.diag(gram) + alpha * (1 - l1_ratio)
+    gradient = covariance - gram @ coefficients  # Xᵀ(y - Xβ) / n
+    limit = tolerance * max(variance, np.finfo(float).tiny)
+    for iteration in range(1, max_iter + 1):
+        for j in range(len(coefficients)):
+            if denominators[j] <= 0:
+                continue
+            old = coefficients[j]
+            rho = gradient[j] + gram[j, j] * old
+            new = np.sign(rho) * max(abs(rho) - l1, 0.0) / denominators[j]
+            if new != old:
+                gradient -= gram[:, j] * (new - old)
+                coefficients[j] = new
+        if duality_gap(gram, covariance, variance, gradient, coefficients, alpha, l1_ratio) < limit:
+            break
+    return iteration
+
+
+def elastic_net_path(gram, covariance, variance, alphas, l1_ratio, start=None):
+    """
+    Coeficientes (alphas, columnas) de ElasticNet/Lasso para los alphas, de mayor a
+    menor, con arranque en caliente desde start (por defecto, todos cero).
+    """
+    coefficients = np.zeros(len(covariance)) if start is None else np.array(start, dtype=np.float64)
+    path = np.empty((len(alphas), len(covariance)))
+    for position, alpha in enumerate(alphas):
+        coordinate_descent(gram, covariance, variance, alpha, l1_ratio, coefficients)
+        path[position] = coefficients
+    return path
+
+
+def elastic_net_df(gram, coefficients, alpha, l1_ratio):
+    """Grados de libertad de ElasticNet: traza de (G_A + α(1 - l1)I)⁻¹ G_A en las columnas activas (Zou et al.)."""
+    active = np.flatnonzero(coefficients)
+    if not len(active):
+        return 0.0
+    block = gram[np.ix_(active, active)]
+    return float(np.trace(np.linalg.lstsq(block + alpha * (1 - l1_ratio) * np.eye(len(active)), block,
+                                          rcond=None)[0]))
+
+
+def mean_squared_residuals(gram, covariance, variance, path):
+    """Suma de residuos al cuadrado / n de cada fila del camino, sin recorrer las filas."""
+    return np.maximum(variance - 2 * path @ covariance + np.einsum("ai,ij,aj->a", path, gram, path), 0.0)
+
+
+def fit_path(regressor, gram, covariance, variance, alphas, start=None):
+    """Camino (alphas, columnas) del regresor y sus grados de libertad; start arranca ElasticNet/Lasso."""
+    if regressor == "Ridge":
+        return ridge_path(gram, covariance, alphas)
+    l1_ratio = L1_RATIOS[regressor]
+    path = elastic_net_path(gram, covariance, variance, alphas, l1_ratio, start)
+    return path, np.array([elastic_net_df(gram, coefficients, alpha, l1_ratio)
+                           for coefficients, alpha in zip(path, alphas)])
+
+
+def gcv_scores(count, mse, df):
+    """Validación cruzada generalizada: MSE / (1 - df / n)²."""
+    return mse / np.maximum(1 - (df + 1) / count, 1e-12) ** 2
+
+
+def ridge_loo_scores(X, y, mean, scale, alphas):
+    """
+    Error cuadrático medio leave-one-out exacto de Ridge para todos los alphas con
+    una sola SVD de las filas estandarizadas: el residuo sin la fila i es
+    eᵢ / (1 - hᵢᵢ), con hᵢᵢ = 1/n + Σⱼ Uᵢⱼ² sⱼ² / (sⱼ² + nα) (el término
+    independiente no se penaliza).
+    """
+    count = len(y)
+    U, singular, _ = np.linalg.svd((X - mean[:-1]) / scale, full_matrices=False)
+    centered_y = y - mean[-1]
+    projected = U.T @ centered_y
+    squares = U ** 2
+    scores = np.empty(len(alphas))
+    for position, alpha in enumerate(alphas):
+        shrink = singular ** 2 / (singular ** 2 + count * alpha)
+        residuals = centered_y - U @ (shrink * projected)
+        leverage = 1.0 / count + squares @ shrink
+        scores[position] = np.mean((residuals / np.maximum(1 - leverage, 1e-12)) ** 2)
+    return scores
+
+
+def original_units(coefficients, mean, scale, y_scale):
+    """Coeficientes y término independiente en las unidades de las columnas y del objetivo."""
+    coefficients = coefficients * y_scale / scale
+    return coefficients, mean[-1] - coefficients @ mean[:-1]
+
+
+def regularization_path(regressor, count, mean, centered, X=None, y=None):
+    """
+    Camino de regularización de Ridge, Lasso o ElasticNet con los momentos de las
+    filas de entrenamiento (ver GramCache.moments y moments_from_rows): ajusta los
+    N_ALPHAS valores y elige el de menor error estimado; si queda en un extremo de
+    la rejilla, la amplía una década por ese lado (hasta GRID_EXTENSIONS veces y
+    mientras el error siga bajando).
+    Ridge usa leave-one-out exacto si se dan las filas X, y (densas y hasta
+    LOO_MAX_ROWS) y, si no, GCV; Lasso y ElasticNet usan GCV con sus grados de
+    libertad. Las columnas y el objetivo se estandarizan, así que alpha no depende
+    de sus unidades. Devuelve un diccionario con el camino (coeficientes
+    estandarizados), el alpha elegido y los coeficientes y el término
+    independiente del modelo en unidades originales.
+    """
+    gram, covariance, variance, scale, y_scale = standardize_moments(count, centered)
+    if regressor == "Ridge" and X is not None and not sparse.issparse(X) and len(y) <= LOO_MAX_ROWS:
+        criterion = "leave-one-out CV"
+
+        def score(alphas, path, df):
+            return ridge_loo_scores(X, y, mean, scale, alphas)
+    else:
+        criterion = "GCV"
+
+        def score(alphas, path, df):
+            return gcv_scores(count, mean_squared_residuals(gram, covariance, variance, path), df)
+
+    alphas = alpha_grid(regressor, gram, covariance)
+    path, df = fit_path(regressor, gram, covariance, variance, alphas)
+    scores = score(alphas, path, df)
+    # Mismo paso entre alphas en la ampliación; más allá del primer alpha de Lasso y ElasticNet todo es cero
+    step = alphas[1] / alphas[0]
+    decade = step ** np.arange(1, int(round(-1 / np.log10(step))) + 1)
+    previous = np.inf
+    for _ in range(GRID_EXTENSIONS):
+        best = int(np.argmin(scores))
+        if scores[best] > previous * (1 - GRID_MIN_GAIN):
+            break  # El error ya apenas cambia hacia ese extremo
+        previous = scores[best]
+        if best == len(alphas) - 1:
+            extra = alphas[-1] * decade
+            extra_path, extra_df = fit_path(regressor, gram, covariance, variance, extra, path[-1])
+            alphas, path = np.concatenate([alphas, extra]), np.vstack([path, extra_path])
+            scores = np.concatenate([scores, score(extra, extra_path, extra_df)])
+        elif best == 0 and regressor == "Ridge":
+            extra = (alphas[0] / decade)[::-1]
+            extra_path, extra_df = fit_path(regressor, gram, covariance, variance, extra)
+            alphas, path = np.concatenate([extra, alphas]), np.vstack([extra_path, path])
+            scores = np.concatenate([score(extra, extra_path, extra_df), scores])
+        else:
+            break
+    best = int(np.argmin(scores))
+    coefficients, intercept = original_units(path[best], mean, scale, y_scale)
+    return {"regressor": regressor, "alphas": alphas, "path": path, "scores": scores, "criterion": criterion,
+            "alpha": float(alphas[best]), "l1_ratio": L1_RATIOS[regressor], "coefficients": coefficients,
+            "intercept": float(intercept)}
+
+
+def fit_alpha(regressor, alpha, count, mean, centered):
+    """Coeficientes y término independiente del regresor con un alpha fijo (para los folds de la validación cruzada)."""
+    gram, covariance, variance, scale, y_scale = standardize_moments(count, centered)
+    if regressor == "Ridge":
+        coefficients = ridge_path(gram, covariance, np.array([alpha]))[0][0]
+    else:
+        coefficients = np.zeros(len(covariance))
+        coordinate_descent(gram, covariance, variance, alpha, L1_RATIOS[regressor], coefficients)
+    return original_units(coefficients, mean, scale, y_scale)
@@ -0,0 +1,305 @@
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from GramCache import GramCache
+from Imputation import WORKERS
+from RegressionModel import kfold_groups, hash_folds
+
+SEARCH_METHODS = ["Forward", "Backward", "Exhaustive"]
+SEARCH_CRITERIA = ["CV RMSE", "BIC", "AIC"]
+# Folds con que se calcula "CV RMSE" (los mismos repartos que LinearModelModel.cross_validate)
+SEARCH_FOLDS = 5
+# Subconjuntos que se muestran, ordenados del mejor al peor
+TOP_SUBSETS = 10
+# "Exhaustive" prueba 2^columnas subconjuntos: por encima de este número de candidatas no se permite
+EXHAUSTIVE_MAX_COLUMNS = 18
+# "Exhaustive" recorre a la vez las 2^bits combinaciones de las primeras columnas (un sweep por lote)
+EXHAUSTIVE_BATCH_BITS = 6
+# Pivote mínimo (en columnas estandarizadas) para añadir una columna sin que sea colineal con las demás
+PIVOT_TOLERANCE = 1e-9
+
+
+class SearchCancelled(Exception):
+    """Se lanza cuando se cancela una búsqueda en curso."""
+
+
+def sweep(matrices, k):
+    """
+    Operador sweep sobre la columna k de matrices simétricas (array (..., m, m),
+    in situ). Tras barrer las columnas de un subconjunto S, el elemento (y, y) es
+    la suma de residuos al cuadrado de la regresión de y sobre S y las filas de S
+    tienen sus coeficientes, de modo que añadir una columna cuesta O(p²).
+    """
+    pivot = matrices[..., k, k].copy()
+    row = matrices[..., k, :].copy()
+    column = matrices[..., :, k].copy()
+    matrices -= column[..., :, None] * row[..., None, :] / pivot[..., None, None]
+    matrices[..., k, :] = row / pivot[..., None]
+    matrices[..., :, k] = column / pivot[..., None]
+    matrices[..., k, k] = -1 / pivot
+
+
+def reverse_sweep(matrices, k):
+    """Deshace sweep(matrices, k): quita la columna k del subconjunto, también en O(p²)."""
+    pivot = matrices[..., k, k].copy()
+    row = matrices[..., k, :].copy()
+    column = matrices[..., :, k].copy()
+    matrices -= column[..., :, None] * row[..., None, :] / pivot[..., None, None]
+    matrices[..., k, :] = -row / pivot[..., None]
+    matrices[..., :, k] = -column / pivot[..., None]
+    matrices[..., k, k] = -1 / pivot
+
+
+def gray_code(step):
+    """Subconjunto (bits) número step en orden de código Gray: cada uno difiere del anterior en un bit."""
+    return step ^ (step >> 1)
+
+
+def usable_columns(columns, df=None, store=None):
+    """Columnas numéricas y sin vacíos de la lista (las que pueden entrar en la búsqueda)."""
+    if store is not None:
+        counts = store.missing_counts([column for column in columns if column in store.columns])
+        return [column for column in columns if counts.get(column, 1) == 0]
+    return [column for column in columns if pd.api.types.is_numeric_dtype(df[column]) and not df[column].isna().any()]
+
+
+def cancellable(blocks, is_cancelled=None):
+    """Recorre los bloques lanzando SearchCancelled en cuanto is_cancelled() es cierto."""
+    for block in blocks:
+        if is_cancelled is not None and is_cancelled():
+            raise SearchCancelled()
+        yield block
+
+
+def subset_statistics(columns, target_column, df=None, store=None, folds=SEARCH_FOLDS, is_cancelled=None):
+    """
+    GramCache con XᵀX y Xᵀy de las columnas y el objetivo en cada fold (con el
+    mismo reparto que la validación cruzada del modelo). Con un ColumnStore las
+    filas se recorren por bloques y los folds salen de hash_folds; is_cancelled()
+    se consulta entre bloques y permite abortar lanzando SearchCancelled.
+    """
+    names = list(columns) + [target_column]
+    gram = GramCache(max_columns=len(names))
+    if store is not None:
+        gram.set_split(("kfold", folds), lambda rows: hash_folds(rows, folds, seed=42), n_groups=folds)
+        gram.select(names)
+        gram.accumulate(names, cancellable(store.iter_blocks(names), is_cancelled))
+    else:
+        gram.set_data(df)
+        gram.set_split(("kfold", folds), kfold_groups(len(df), folds, seed=42))
+        gram.ensure(names)
+    return gram
+
+
+class SubsetScorer:
+    """
+    Puntúa subconjuntos de columnas con los estadísticos de un GramCache
+    repartido en folds. Guarda las matrices de productos cruzados centrados (en
+    columnas estandarizadas) con que se ajusta cada modelo: la de todas las filas
+    para BIC y AIC, y la de cada fold de entrenamiento para "CV RMSE".
+    Un "estado" es un lote de esas pilas de matrices, de forma (subconjuntos,
+    matrices, p + 1, p + 1), barridas con las columnas de cada subconjunto, que
+    se indican con una máscara booleana (subconjuntos, p). Así un mismo sweep
+    actualiza a la vez muchos subconjuntos.
+    """
+    def __init__(self, gram, columns, target_column, criterion, folds=SEARCH_FOLDS):
+        self.criterion = criterion
+        names = list(columns) + [target_column]
+        self.target = len(columns)
+        count, _, centered = gram.moments(names, range(folds))
+        self.count = count
+        self.scale = np.sqrt(np.diag(centered))
+        self.scale[~(self.scale > 0)] = 1.0
+        scale = np.outer(self.scale, self.scale)
+        if criterion == "CV RMSE":
+            matrices, fit_means, test_moments = [], [], []
+            for fold in range(folds):
+                training = [group for group in range(folds) if group != fold]
+                _, mean, fold_centered = gram.moments(names, training)
+                matrices.append(fold_centered / scale)
+                fit_means.append(mean)
+                test_moments.append(gram.moments(names, [fold]))
+            self.base = np.array(matrices)
+            self.fit_means = np.array(fit_means)
+            self.test_counts = np.array([moments[0] for moments in test_moments])
+            self.test_means = np.array([moments[1] for moments in test_moments])
+            self.test_centered = np.array([moments[2] for moments in test_moments])
+        else:
+            self.base = (centered / scale)[None]
+        # Las columnas constantes o colineales con las anteriores no se pueden barrer: se descartan
+        state = self.base.copy()
+        self.skipped = []
+        self.columns = []
+        for position, column in enumerate(columns):
+            if np.all(state[:, position, position] > PIVOT_TOLERANCE):
+                sweep(state, position)
+                self.columns.append(position)
+            else:
+                self.skipped.append(column)
+
+    def start(self, members):
+        """Estado de los subconjuntos de la máscara members (subconjuntos, p)."""
+        state = np.repeat(self.base[None], len(members), axis=0)
+        for position in np.flatnonzero(members.any(axis=0)):
+            selected = members[:, position]
+            if selected.all():
+                sweep(state, position)
+            else:
+                batch = state[selected]
+                sweep(batch, position)
+                state[selected] = batch
+        return state
+
+    def score(self, state, members):
+        """Puntuación de cada subconjunto del lote (menor es mejor)."""
+        target = self.target
+        if self.criterion != "CV RMSE":
+            residual_squares = np.maximum(state[:, 0, target, target], 1e-300) * self.scale[target] ** 2
+            penalty = np.log(self.count) if self.criterion == "BIC" else 2.0
+            return self.count * np.log(residual_squares / self.count) + penalty * (members.sum(axis=1) + 1)
+        # Coeficientes de cada fold (cero fuera del subconjunto) y término independiente
+        coefficients = np.where(members[:, None, :], state[:, :, :target, target], 0.0) \
+            * self.scale[target] / self.scale[:target]
+        intercepts = self.fit_means[:, target] - (coefficients * self.fit_means[:, :target]).sum(axis=2)
+        # Residuo en las filas de prueba = wᵀ(z - media) + desplazamiento, con z = (x, y) y w = (-coeficientes, 1)
+        weights = np.concatenate([-coefficients, np.ones(coefficients.shape[:2] + (1,))], axis=2)
+        offsets = (weights * self.test_means).sum(axis=2) - intercepts
+        quadratic = ((weights[:, :, None, :] @ self.test_centered)[:, :, 0, :] * weights).sum(axis=2)
+        squares = quadratic + self.test_counts * offsets ** 2
+        return np.sqrt(np.maximum(squares.sum(axis=1), 0.0) / self.count)
+
+
+class TopSubsets:
+    """Los mejores subconjuntos encontrados hasta ahora, compartidos por los hilos de la búsqueda."""
+    def __init__(self, size=TOP_SUBSETS):
+        self.size = size
+        self.heap = []  # (-puntuación, subconjunto): el peor de los guardados queda arriba
+        self.seen = set()
+        self.lock = threading.Lock()
+
+    def offer(self, score, subset):
+        """Añade el subconjunto si está entre los mejores. Devuelve True si la lista ha cambiado."""
+        key = tuple(sorted(subset))
+        with self.lock:
+            if key in self.seen or (len(self.heap) >= self.size and -self.heap[0][0] <= score):
+                return False
+            self.seen.add(key)
+            heapq.heappush(self.heap, (-score, key))
+            if len(self.heap) > self.size:
+                heapq.heappop(self.heap)
+            return True
+
+    def threshold(self):
+        """Puntuación que hay que mejorar para entrar en la lista."""
+        with self.lock:
+            return -self.heap[0][0] if len(self.heap) >= self.size else np.inf
+
+    def ranking(self):
+        """Lista [(puntuación, subconjunto)] de mejor a peor."""
+        with self.lock:
+            return sorted((-score, subset) for score, subset in self.heap)
+
+
+def search_subsets(gram, columns, target_column, method="Forward", criterion="CV RMSE", folds=SEARCH_FOLDS,
+                   top=TOP_SUBSETS, workers=WORKERS, report=None, progress=None, is_cancelled=None):
+    """
+    Busca los subconjuntos de columnas con mejor criterion para predecir
+    target_column, con los estadísticos de gram (ver subset_statistics):
+    - "Forward": empieza sin columnas y añade en cada paso la que más mejora.
+    - "Backward": empieza con todas y quita en cada paso la que menos empeora.
+    - "Exhaustive": prueba todos los subconjuntos en orden de código Gray, de
+      modo que cada uno se obtiene del anterior añadiendo o quitando una columna.
+    Cada subconjunto se obtiene de otro con un sweep O(p²) y se puntúa sin
+    recorrer las filas. Las candidatas de cada paso (o los tramos del código Gray)
+    se reparten en un grupo de hilos. report(ranking) se llama cada vez que cambian
+    los top mejores, progress(hechos, total) tras cada paso o tramo, e is_cancelled()
+    permite abortar lanzando SearchCancelled. Devuelve (ranking, columnas descartadas),
+    con ranking como [(puntuación, tupla de columnas)] de mejor a peor.
+    """
+    columns = list(columns)
+    scorer = SubsetScorer(gram, columns, target_column, criterion, folds)
+    best = TopSubsets(top)
+    candidates = scorer.columns
+    size = len(columns)
+
+    def evaluate(state, members):
+        if is_cancelled is not None and is_cancelled():
+            raise SearchCancelled()
+        scores = scorer.score(state, members)
+        changed = False
+        for row in np.flatnonzero(scores <= best.threshold()):
+            if members[row].any():
+                changed |= best.offer(float(scores[row]), [columns[position] for position in np.flatnonzero(members[row])])
+        if changed and report is not None:
+            report(best.ranking())
+        return scores
+
+    def mask(subsets):
+        members = np.zeros((len(subsets), size), dtype=bool)
+        for row, subset in enumerate(subsets):
+            members[row, list(subset)] = True
+        return members
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if method == "Exhaustive":
+            if len(candidates) > EXHAUSTIVE_MAX_COLUMNS:
+                raise ValueError(f"Exhaustive search is limited to {EXHAUSTIVE_MAX_COLUMNS} columns.")
+            # Un lote con todas las combinaciones de las primeras columnas recorre las demás con
+            # código Gray; los pasos del código se reparten en tramos entre los hilos
+            fixed = min(len(candidates), EXHAUSTIVE_BATCH_BITS)
+            prefixes, rest = candidates[:fixed], candidates[fixed:]
+            prefix_members = mask([[position for bit, position in enumerate(prefixes) if combination >> bit & 1]
+                                   for combination in range(2 ** fixed)])
+            steps = 2 ** len(rest)
+            bounds = np.linspace(0, steps, min(workers, steps) + 1).astype(int)
+
+            def run_segment(first, last):
+                code = gray_code(first)
+                members = prefix_members.copy()
+                members[:, [position for bit, position in enumerate(rest) if code >> bit & 1]] = True
+                state = scorer.start(members)
+                evaluate(state, members)
+                for step in range(first + 1, last):
+                    position = rest[(step & -step).bit_length() - 1]
+                    if members[0, position]:
+                        reverse_sweep(state, position)
+                    else:
+                        sweep(state, position)
+                    members[:, position] = ~members[:, position]
+                    evaluate(state, members)
+            futures = [pool.submit(run_segment, first, last) for first, last in zip(bounds[:-1], bounds[1:])]
+            for done, future in enumerate(futures, start=1):
+                future.result()
+                if progress is not None:
+                    progress(done, len(futures))
+        else:
+            forward = method == "Forward"
+            subset = [] if forward else list(candidates)
+            members = mask([subset])
+            state = scorer.start(members)
+            evaluate(state, members)
+            total = len(candidates)
+            for done in range(1, total + 1):
+                options = [position for position in candidates if (position in subset) != forward]
+                if not options or (not forward and len(subset) == 1):
+                    break
+
+                def try_option(position):
+                    trial = state.copy()
+                    (sweep if forward else reverse_sweep)(trial, position)
+                    trial_members = members.copy()
+                    trial_members[0, position] = forward
+                    return evaluate(trial, trial_members)[0]
+                scores = list(pool.map(try_option, options))
+                chosen = options[int(np.argmin(scores))]
+                (sweep if forward else reverse_sweep)(state, chosen)
+                members[0, chosen] = forward
+                subset = [position for position in candidates if members[0, position]]
+                if progress is not None:
+                    progress(done, total)
+    if progress is not None:
+        progress(1, 1)
+    return best.ranking(), scorer.skipped
@@ -0,0 +1,101 @@
+"""
+Entrada por línea de comandos de Projecta, para entrenar y usar modelos sin
+interfaz gráfica (por ejemplo, en reentrenamientos programados en servidores).
+No importa PyQt5 ni matplotlib.
+
+    python projecta.py train --data housing.csv --x median_income total_rooms --y median_house_value --out model.joblib
+    python projecta.py predict --model model.joblib --input new.csv --output predictions.csv
+    python projecta.py evaluate --model model.joblib --data housing.csv
+"""
+import sys
+import argparse
+
+from DataLoader import read_file
+from RegressionModel import LinearModelModel
+
+
+def load_data(file_name, sheet_name=None):
+    """Carga el archivo con la misma lógica que la interfaz gráfica."""
+    df = read_file(file_name, sheet_name=sheet_name)
+    if df is None:
+        raise ValueError(f"{file_name} contains no data.")
+    return df
+
+
+def split_columns(values):
+    """Admite columnas separadas por espacios o por comas."""
+    return [column.strip() for value in values for column in value.split(",") if column.strip()]
+
+
+def train(args):
+    model = LinearModelModel(load_data(args.data, args.sheet))
+    entry_columns = split_columns(args.x)
+    missing = [column for column in entry_columns + [args.y] if column not in model.df.columns]
+    if missing:
+        raise ValueError(f"Columns not found: {', '.join(missing)}")
+    if not model.create_model(entry_columns, args.y):
+        raise ValueError("Columns with no numeric or empty values.")
+    model.description = args.description
+    model.save_model(args.out)
+    print(model.formula)
+    print(model.errors)
+    print(f"Model saved to {args.out}")
+
+
+def predict(args):
+    model = LinearModelModel(None)
+    model.load_model(args.model)
+    df = load_data(args.input, args.sheet)
+    df[f"{model.target_column}_prediction"] = model.predict(df)
+    df.to_csv(args.output, index=False)
+    print(f"{len(df)} predictions saved to {args.output}")
+
+
+def evaluate(args):
+    model = LinearModelModel(None)
+    model.load_model(args.model)
+    mae, rmse, r2 = model.evaluate(load_data(args.data, args.sheet))
+    print(model.formula)
+    print(f"MAE: {mae:.3f}, RMSE: {rmse:.3f}, R²: {r2:.3f}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="projecta", description="Train and use Projecta linear models.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="Train a linear model and save it")
+    train_parser.add_argument("--data", required=True, help="CSV, Excel or SQLite file")
+    train_parser.add_argument("--x", required=True, nargs="+", help="Entry columns")
+    train_parser.add_argument("--y", required=True, help="Target column")
+    train_parser.add_argument("--out", required=True, help="Output .joblib file")
+    train_parser.add_argument("--description", default="", help="Model description")
+    train_parser.set_defaults(handler=train)
+
+    predict_parser = commands.add_parser("predict", help="Predict the target column of a file")
+    predict_parser.add_argument("--model", required=True, help="Saved .joblib model")
+    predict_parser.add_argument("--input", required=True, help="CSV, Excel or SQLite file")
+    predict_parser.add_argument("--output", required=True, help="Output CSV file")
+    predict_parser.set_defaults(handler=predict)
+
+    evaluate_parser = commands.add_parser("evaluate", help="Compute the error metrics of a model on a file")
+    evaluate_parser.add_argument("--model", required=True, help="Saved .joblib model")
+    evaluate_parser.add_argument("--data", required=True, help="CSV, Excel or SQLite file")
+    evaluate_parser.set_defaults(handler=evaluate)
+
+    for command_parser in (train_parser, predict_parser, evaluate_parser):
+        command_parser.add_argument("--sheet", default=None, help="Excel sheet (default: first one)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        args.handler(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -57,7 +57,8 @@ def load_file(file_path):
 def preprocess_data(data):
     """
     Preprocess the data for model training.
-    It assumes that the target column is 'median_house_value' and excludes the categorical 'ocean_proximity'.
+    It assumes that the target column is 'median_house_value' and one-hot encodes the categorical
+    'ocean_proximity' column (the first level is dropped, it is absorbed by the intercept).
     """
     # Fill missing values in the 'total_bedrooms' column
     if 'total_bedrooms' in data.columns:
@@ -65,7 +66,9 @@ def preprocess_data(data):
 
     # Select features (X) and target variable (y)
     if 'median_house_value' in data.columns:
-        X = data.drop(columns=['median_house_value', 'ocean_proximity'])  # Exclude target and categorical column
+        X = data.drop(columns=['median_house_value'])  # Exclude target column
+        if 'ocean_proximity' in X.columns:
+            X = pd.get_dummies(X, columns=['ocean_proximity'], drop_first=True, dtype=float)
         y = data['median_house_value']
         return X, y
     else:
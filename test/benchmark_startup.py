@@ -0,0 +1,92 @@
+"""
+Mide el tiempo de arranque de la interfaz: desde que empieza el proceso hasta
+que se pinta por primera vez la ventana principal. Cada medida se hace en un
+proceso nuevo para incluir el coste de los imports.
+
+    python test/benchmark_startup.py --runs 10 --record startup_history.jsonl --budget 1.5
+
+--record añade el resultado a un archivo JSON Lines para seguir su evolución y
+--budget hace que el script termine con error si la mediana supera el límite.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+
+INTERFACE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/interface"))
+
+# Código que ejecuta cada proceso hijo
+CHILD_CODE = """
+import time
+start = time.perf_counter()
+import sys
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QObject, QEvent
+from Interface import Interface
+imported = time.perf_counter()
+
+class FirstPaint(QObject):
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint:
+            print(f"{imported - start} {time.perf_counter() - start}", flush=True)
+            app.quit()
+        return False
+
+app = QApplication(sys.argv)
+window = Interface()
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+app.exec_()
+"""
+
+
+def measure_once():
+    """Devuelve (segundos de imports, segundos hasta el primer pintado) de un arranque."""
+    result = subprocess.run([sys.executable, "-c", CHILD_CODE], cwd=INTERFACE_DIR,
+                            capture_output=True, text=True, timeout=120)
+    lines = result.stdout.split()
+    if result.returncode != 0 or len(lines) < 2:
+        raise RuntimeError(f"The interface did not start:\n{result.stderr}")
+    return float(lines[-2]), float(lines[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the time to first paint of the main window.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh processes to measure")
+    parser.add_argument("--record", help="JSON Lines file where the result is appended")
+    parser.add_argument("--budget", type=float, help="Maximum median time to first paint (seconds)")
+    args = parser.parse_args(argv)
+
+    measures = [measure_once() for _ in range(args.runs)]
+    imports = [measure[0] for measure in measures]
+    first_paint = [measure[1] for measure in measures]
+    result = {
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "runs": args.runs,
+        "imports_median": statistics.median(imports),
+        "first_paint_median": statistics.median(first_paint),
+        "first_paint_min": min(first_paint),
+        "first_paint_max": max(first_paint),
+    }
+    print(f"Imports: {result['imports_median']:.3f} s (median)")
+    print(f"First paint: {result['first_paint_median']:.3f} s (median), "
+          f"{result['first_paint_min']:.3f}-{result['first_paint_max']:.3f} s")
+
+    if args.record:
+        with open(args.record, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(result) + "\n")
+
+    if args.budget is not None and result["first_paint_median"] > args.budget:
+        print(f"Startup budget exceeded: {result['first_paint_median']:.3f} s > {args.budget:.3f} s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import pandas as pd
+import sys
+import os
+import subprocess
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/interface")))
+import projecta
+
+INTERFACE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/interface"))
+
+
+def create_csv(tmp_path):
+    data = {
+        'feature1': [1, 2, 3, 4, 5, 6, 7, 8],
+        'feature2': [2, 1, 4, 3, 6, 5, 8, 7],
+        'target': [3.1, 3.9, 7.2, 6.8, 11.1, 10.9, 15.2, 14.8]
+    }
+    file_path = str(tmp_path / "data.csv")
+    pd.DataFrame(data).to_csv(file_path, index=False)
+    return file_path
+
+def test_train_predict_evaluate(tmp_path, capsys):
+    data_path = create_csv(tmp_path)
+    model_path = str(tmp_path / "model.joblib")
+    output_path = str(tmp_path / "predictions.csv")
+
+    assert projecta.main(["train", "--data", data_path, "--x", "feature1,feature2", "--y", "target",
+                          "--out", model_path]) == 0
+    assert os.path.exists(model_path), "No se guardó el modelo."
+
+    assert projecta.main(["predict", "--model", model_path, "--input", data_path, "--output", output_path]) == 0
+    predictions = pd.read_csv(output_path)
+    assert "target_prediction" in predictions.columns
+    assert predictions["target_prediction"].notna().all()
+
+    assert projecta.main(["evaluate", "--model", model_path, "--data", data_path]) == 0
+    assert "R²" in capsys.readouterr().out
+
+def test_train_unknown_column(tmp_path):
+    data_path = create_csv(tmp_path)
+    result = projecta.main(["train", "--data", data_path, "--x", "unknown", "--y", "target",
+                            "--out", str(tmp_path / "model.joblib")])
+    assert result == 1, "Una columna inexistente debe terminar con error."
+
+def test_no_gui_imports():
+    # La línea de comandos no debe cargar PyQt5 ni matplotlib
+    code = "import projecta, sys; print(any(m.split('.')[0] in ('PyQt5', 'matplotlib') for m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=INTERFACE_DIR, capture_output=True, text=True)
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/interface")))
+from ColumnStats import column_statistics, numeric_statistics, StatisticsCache
+
+
+def test_column_statistics():
+    values = pd.Series([1.0, 2.0, None, 4.0, 2.0])
+    stats = column_statistics(values)
+
+    assert stats["dtype"] == "float64"
+    assert stats["count"] == 4 and stats["missing"] == 1
+    assert np.isclose(stats["mean"], values.mean())
+    assert np.isclose(stats["std"], values.std())
+    assert stats["min"] == 1.0 and stats["max"] == 4.0
+    assert stats["distinct"] == 3
+
+    text = column_statistics(pd.Series(["a", None, "b", "a"]))
+    assert (text["count"], text["missing"], text["distinct"]) == (3, 1, 2)
+    assert text["mean"] is None
+
+def test_numeric_statistics_in_blocks():
+    # Por bloques y con valores grandes el resultado debe coincidir con pandas
+    values = np.random.default_rng(0).normal(1e6, 3, size=1000)
+    values[::10] = np.nan
+    stats = numeric_statistics(values, block_size=64, distinct_limit=100)
+
+    assert stats["count"] == 900 and stats["missing"] == 100
+    assert np.isclose(stats["mean"], np.nanmean(values))
+    assert np.isclose(stats["std"], np.nanstd(values, ddof=1))
+    assert stats["distinct"] == 100 and stats["distinct_capped"], "Se deben dejar de contar los valores distintos."
+
+    # Sin límite, los valores repetidos en bloques distintos se cuentan una vez
+    repeated = np.tile([1.0, 2.0, np.nan, 3.0], 100)
+    stats = numeric_statistics(repeated, block_size=7)
+    assert stats["distinct"] == 3 and not stats["distinct_capped"]
+
+def test_statistics_cache_recomputes_touched_columns():
+    df = pd.DataFrame({"x": [1.0, None, 3.0], "y": [1, 2, 3]})
+    cache = StatisticsCache()
+    cache.set_data(df)
+    for column in cache.stale_columns():
+        cache.store_result(column, *cache.compute(column))
+    assert cache.stale_columns() == []
+
+    # Solo la columna preprocesada se vuelve a calcular
+    version, _ = cache.compute("x")
+    df["x"] = df["x"].fillna(2.0)
+    cache.touch(["x"])
+    assert cache.stale_columns() == ["x"]
+    assert not cache.store_result("x", version, {}), "Un resultado de una versión anterior no se guarda."
+    cache.store_result("x", *cache.compute("x"))
+    assert cache.get("x")["missing"] == 0
+    assert cache.get("y")["mean"] == 2.0
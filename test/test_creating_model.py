@@ -5,6 +5,10 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/interface")))
 from LinearModel import LinearModelModel
+from RegressionModel import hash_split, kfold_groups
+from ColumnStore import ColumnStore
+from DataPreprocessor import DataPreprocessorModel
+import numpy as np
 import joblib
 from tempfile import NamedTemporaryFile
 
@@ -120,3 +124,268 @@ def test_load_model():
 
     # Limpiar el archivo temporal
     os.remove(file_path)
+
+def test_create_model_out_of_core(tmp_path):
+    # Crear un CSV con datos de ejemplo
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'feature1': rng.normal(size=500), 'feature2': rng.normal(size=500)})
+    df['target'] = 3 * df['feature1'] - 2 * df['feature2'] + 1 + rng.normal(scale=0.1, size=500)
+    file_path = str(tmp_path / "data.csv")
+    df.to_csv(file_path, index=False)
+
+    # Entrenar desde el almacén en disco, recorriéndolo por bloques
+    store = ColumnStore.build(file_path, store_dir=str(tmp_path / "store"), chunk_size=64)
+    model = LinearModelModel(None)
+    model.store = store
+    assert model.create_model(['feature1', 'feature2'], 'target') is True
+
+    # Los coeficientes deben coincidir con los de LinearRegression sobre las mismas filas de entrenamiento
+    train = ~hash_split(np.arange(len(df)))
+    reference = LinearRegression().fit(df.loc[train, ['feature1', 'feature2']], df.loc[train, 'target'])
+    assert np.allclose(model.model.coef_, reference.coef_), "Los coeficientes no coinciden."
+    assert np.isclose(model.model.intercept_, reference.intercept_), "El término independiente no coincide."
+    assert "Test MAE" in model.errors
+    store.delete()
+
+def test_pipeline_repeats_preprocessing(tmp_path):
+    # Datos con huecos en una de las columnas de entrada
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({'feature1': rng.normal(size=200), 'feature2': rng.normal(size=200)})
+    df['target'] = 2 * df['feature1'] + df['feature2'] + 1
+    df.loc[::10, 'feature2'] = np.nan
+
+    # Rellenar con la media y entrenar con los pasos registrados
+    mean = df['feature2'].mean()
+    preprocessor = DataPreprocessorModel()
+    preprocessor.set_dataframe(df)
+    assert preprocessor.preprocess_missing_data(['feature2'], "Fill with Mean")
+    assert preprocessor.steps == [{"strategy": "Fill with Mean", "columns": ['feature2'], "values": {'feature2': mean}}]
+
+    model = LinearModelModel(preprocessor.get_dataframe())
+    model.preprocessing_steps = list(preprocessor.steps)
+    assert model.create_model(['feature1', 'feature2'], 'target') is True
+
+    # Guardar y cargar: el Pipeline rellena los huecos de las filas nuevas con la media de entrenamiento
+    file_path = str(tmp_path / "model.joblib")
+    model.save_model(file_path)
+    loaded = LinearModelModel(None)
+    assert loaded.load_model(file_path) is True
+    new_rows = pd.DataFrame({'feature1': [0.5, 1.0], 'feature2': [np.nan, 2.0]})
+    expected = model.model.predict(np.array([[0.5, mean], [1.0, 2.0]]))
+    assert np.allclose(loaded.predict(new_rows), expected), "El Pipeline no repite el relleno con la media."
+
+    # Deshacer el paso lo quita de la receta
+    preprocessor.undo()
+    assert preprocessor.steps == [], "Deshacer no quitó el paso registrado."
+
+def test_create_model_with_categorical_columns(tmp_path):
+    # Una columna de texto con tres niveles que desplazan el objetivo
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({'feature1': rng.normal(size=300), 'zone': rng.choice(['a', 'b', 'c'], size=300)})
+    df['target'] = 2 * df['feature1'] + df['zone'].map({'a': 0.0, 'b': 5.0, 'c': -3.0})
+
+    # One-hot: un coeficiente por nivel (salvo el primero), con su nombre en la fórmula
+    model = LinearModelModel(df)
+    assert model.create_model(['feature1', 'zone'], 'target') is True
+    assert model.feature_names == ['feature1', 'zone[b]', 'zone[c]']
+    assert np.allclose(model.model.coef_, [2.0, 5.0, -3.0])
+    assert "*zone[b]" in model.formula
+
+    # El Pipeline guardado codifica las filas nuevas; un nivel desconocido cuenta como el primero
+    file_path = str(tmp_path / "model.joblib")
+    model.save_model(file_path)
+    loaded = LinearModelModel(None)
+    loaded.load_model(file_path)
+    predictions = loaded.predict(pd.DataFrame({'feature1': [1.0, 1.0], 'zone': ['b', 'z']}))
+    assert np.allclose(predictions, [7.0, 2.0])
+
+    # Codificación por la media del objetivo: una sola columna
+    model.encoding = "Target"
+    assert model.create_model(['feature1', 'zone'], 'target') is True
+    assert model.feature_names == ['feature1', 'zone[target mean]']
+
+def test_high_cardinality_uses_sparse_matrix():
+    rng = np.random.default_rng(3)
+    levels = [f"z{i}" for i in range(200)]
+    df = pd.DataFrame({'feature1': rng.normal(size=2000), 'zip': rng.choice(levels, size=2000)})
+    df['target'] = df['feature1'] + df['zip'].str[1:].astype(float) / 100
+
+    model = LinearModelModel(df)
+    assert model.create_model(['feature1', 'zip'], 'target') is True
+    assert model.encoder.sparse_, "Con muchos niveles la matriz de diseño debe ser dispersa."
+    assert model.pipeline[:-1].transform(df).format == "csr"
+    assert np.allclose(model.predict(df), df['target'], atol=1e-3)
+
+def test_gram_cache_matches_linear_regression():
+    from sklearn.model_selection import train_test_split
+    rng = np.random.default_rng(4)
+    df = pd.DataFrame(rng.normal(1000, 5, size=(400, 4)), columns=['a', 'b', 'c', 'd'])
+    df['target'] = 2 * df['a'] - df['c'] + rng.normal(size=400)
+    train, _ = train_test_split(np.arange(400), test_size=0.3, random_state=42)
+
+    # Cada combinación de columnas se resuelve con los productos cruzados calculados una vez
+    model = LinearModelModel(df)
+    for columns in (['a'], ['a', 'b', 'c'], ['d', 'c']):
+        assert model.create_model(columns, 'target') is True
+        reference = LinearRegression().fit(df.loc[train, columns], df.loc[train, 'target'])
+        assert np.allclose(model.model.coef_, reference.coef_), "Los coeficientes no coinciden."
+        assert np.isclose(model.model.intercept_, reference.intercept_), "El término independiente no coincide."
+    assert model.gram.data_version == 1, "Los productos cruzados no se deben volver a calcular."
+
+    # Al cambiar una columna solo se recalculan sus productos
+    df['b'] = df['b'] * 3
+    model.data_changed(['b'])
+    assert model.create_model(['a', 'b'], 'target') is True
+    reference = LinearRegression().fit(df.loc[train, ['a', 'b']], df.loc[train, 'target'])
+    assert np.allclose(model.model.coef_, reference.coef_), "No se usaron los valores nuevos de la columna."
+
+    # El MAE se calcula por bloques de filas
+    model.gram.block_size = 64
+    assert model.create_model(['a', 'c'], 'target') is True
+    test = np.setdiff1d(np.arange(400), train)
+    reference = LinearRegression().fit(df.loc[train, ['a', 'c']], df.loc[train, 'target'])
+    mae = np.abs(df.loc[test, 'target'] - reference.predict(df.loc[test, ['a', 'c']])).mean()
+    assert f"Test MAE: {mae:.3f}," in model.errors, "El MAE de prueba no coincide."
+
+def test_create_model_from_file(tmp_path):
+    import sqlite3
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame({'feature1': rng.normal(size=700), 'feature2': rng.normal(size=700),
+                       'text': rng.choice(['a', 'b'], size=700)})
+    df['target'] = 4 * df['feature1'] + df['feature2'] - 3 + rng.normal(scale=0.1, size=700)
+    csv_path = str(tmp_path / "data.csv")
+    df.to_csv(csv_path, index=False)
+    sqlite_path = str(tmp_path / "data.sqlite")
+    with sqlite3.connect(sqlite_path) as conn:
+        df.to_sql("data", conn, index=False)
+
+    # Se lee el archivo por bloques y la división es la misma que con un ColumnStore
+    train = ~hash_split(np.arange(len(df)))
+    reference = LinearRegression().fit(df.loc[train, ['feature1', 'feature2']], df.loc[train, 'target'])
+    for file_path in (csv_path, sqlite_path):
+        model = LinearModelModel(None)
+        model.source_file = file_path
+        assert model.create_model(['feature1', 'feature2'], 'target') is True
+        assert np.allclose(model.model.coef_, reference.coef_), "Los coeficientes no coinciden."
+        assert np.isclose(model.model.intercept_, reference.intercept_), "El término independiente no coincide."
+        assert len(model.sample) == len(df), "Con pocas filas la muestra debe tenerlas todas."
+
+    # Una columna de texto no se puede usar sin cargar los datos
+    assert model.create_model(['text'], 'target') is False
+
+def test_cross_validation(tmp_path):
+    rng = np.random.default_rng(6)
+    df = pd.DataFrame({'feature1': rng.normal(size=600), 'feature2': rng.normal(size=600),
+                       'zone': rng.choice(['a', 'b', 'c'], size=600)})
+    df['target'] = df['feature1'] - 2 * df['feature2'] + rng.normal(size=600)
+
+    # Cada fold coincide con LinearRegression entrenado con los demás
+    model = LinearModelModel(df)
+    model.cv_folds, model.cv_repeats = 5, 2
+    assert model.create_model(['feature1', 'feature2'], 'target') is True
+    assert len(model.cv_results) == 10 and "5-fold CV x2 MAE" in model.errors
+    groups = kfold_groups(len(df), 5, seed=43)
+    X, y = df[['feature1', 'feature2']].to_numpy(), df['target'].to_numpy()
+    for result in model.cv_results[5:]:
+        test = groups == result["fold"]
+        predictions = LinearRegression().fit(X[~test], y[~test]).predict(X[test])
+        assert np.isclose(result["mae"], np.abs(y[test] - predictions).mean()), "El MAE del fold no coincide."
+        assert np.isclose(result["rmse"], np.sqrt(((y[test] - predictions) ** 2).mean()))
+        assert result["seconds"] >= 0
+    assert len(model.cv_pass_seconds) == 2 and "Shared pass over the rows (ms)" in model.errors, \
+        "El tiempo de la pasada compartida debería mostrarse aparte del de cada fold."
+    numeric_r2 = np.mean([result["r2"] for result in model.cv_results])
+
+    # Con columnas categóricas y con datos en disco también se evalúa cada fold
+    assert model.create_model(['feature1', 'zone'], 'target') is True
+    assert len(model.cv_results) == 10
+    file_path = str(tmp_path / "data.csv")
+    df.to_csv(file_path, index=False)
+    store = ColumnStore.build(file_path, store_dir=str(tmp_path / "store"), chunk_size=64)
+    streamed = LinearModelModel(None)
+    streamed.store = store
+    streamed.cv_folds = 5
+    assert streamed.create_model(['feature1', 'feature2'], 'target') is True
+    assert len(streamed.cv_results) == 5
+    assert abs(np.mean([result["r2"] for result in streamed.cv_results]) - numeric_r2) < 0.1
+    store.delete()
+
+
+def test_regularized_models(tmp_path):
+    from sklearn.linear_model import Ridge, ElasticNet
+    from Regularization import regularization_path, moments_from_rows, ridge_loo_scores, standardize_moments, \
+        N_ALPHAS
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame({'feature1': rng.normal(size=500) * 100, 'feature2': rng.normal(size=500)})
+    df['feature3'] = 2 * df['feature2'] + rng.normal(scale=0.01, size=500)  # Casi colineal con feature2
+    df['target'] = 0.05 * df['feature1'] + df['feature2'] + rng.normal(size=500)
+    columns = ['feature1', 'feature2', 'feature3']
+    X, y = df[columns].to_numpy(), df['target'].to_numpy()
+    Xs = (X - X.mean(axis=0)) / X.std(axis=0)
+    ys = y / y.std()
+
+    # El camino coincide con sklearn en cada alpha (con las columnas y el objetivo estandarizados)
+    moments = moments_from_rows(X, y)
+    for regressor in ("Ridge", "Lasso", "ElasticNet"):
+        path = regularization_path(regressor, *moments)
+        for position in (0, 50, 99):
+            alpha = path["alphas"][position]
+            if regressor == "Ridge":
+                expected = Ridge(alpha=len(y) * alpha).fit(Xs, ys).coef_
+            else:
+                expected = ElasticNet(alpha=alpha, l1_ratio=path["l1_ratio"], tol=1e-10,
+                                      max_iter=100000).fit(Xs, ys).coef_
+            assert np.allclose(path["path"][position], expected, atol=2e-3), \
+                f"El camino de {regressor} no coincide con sklearn."
+
+    # Alpha no depende de las unidades del objetivo: con y · 1e5 se elige el mismo y los coeficientes escalan
+    for regressor in ("Ridge", "Lasso", "ElasticNet"):
+        path = regularization_path(regressor, *moments)
+        scaled = regularization_path(regressor, *moments_from_rows(X, y * 1e5))
+        assert np.isclose(scaled["alpha"], path["alpha"]), f"El alpha de {regressor} depende de las unidades de y."
+        assert np.allclose(scaled["coefficients"], path["coefficients"] * 1e5), \
+            f"Los coeficientes de {regressor} no escalan con y."
+        if np.argmin(scaled["scores"]) == len(scaled["alphas"]) - 1:
+            assert len(scaled["alphas"]) > N_ALPHAS, f"La rejilla de {regressor} debería ampliarse por el extremo."
+
+    # Leave-one-out de Ridge igual que quitando cada fila y reentrenando
+    count, mean, centered = moments_from_rows(X[:60], y[:60])
+    scale = standardize_moments(count, centered)[3]
+    score = ridge_loo_scores(X[:60], y[:60], mean, scale, np.array([0.1]))[0]
+    Z = (X[:60] - mean[:-1]) / scale
+    errors = [y[i] - Ridge(alpha=60 * 0.1).fit(np.delete(Z, i, axis=0), np.delete(y[:60], i)).predict(Z[i:i + 1])[0]
+              for i in range(60)]
+    assert np.isclose(score, np.mean(np.square(errors))), "El leave-one-out de Ridge no coincide."
+
+    # El modelo elige alpha, lo muestra y lo usa al predecir, validar y guardar
+    for regressor in ("Ridge", "Lasso", "ElasticNet"):
+        model = LinearModelModel(df)
+        model.regressor = regressor
+        model.cv_folds = 5
+        assert model.create_model(columns, 'target') is True
+        assert f"{regressor} alpha:" in model.errors and "5-fold CV MAE" in model.errors
+        assert type(model.model).__name__ == "LinearRegression", \
+            "El estimador solo guarda los coeficientes; alpha queda en regularization."
+        assert np.allclose(model.predict(df.head()), X[:5] @ model.model.coef_ + model.model.intercept_)
+        assert model.plot_path() is not False
+        assert model.cv_results[0]["r2"] > 0.8
+    assert model.regularization["criterion"] == "GCV"
+    file_path = str(tmp_path / "model.joblib")
+    model.save_model(file_path)
+    loaded = LinearModelModel(None)
+    assert loaded.load_model(file_path) is True
+    assert loaded.regressor == "ElasticNet" and loaded.regularization["alpha"] == model.regularization["alpha"]
+
+    # Con Ridge y las filas en memoria, alpha se elige con leave-one-out; con datos en disco, con GCV
+    model.regressor = "Ridge"
+    assert model.create_model(columns, 'target') is True
+    assert model.regularization["criterion"] == "leave-one-out CV"
+    csv_path = str(tmp_path / "data.csv")
+    df.to_csv(csv_path, index=False)
+    store = ColumnStore.build(csv_path, store_dir=str(tmp_path / "store"), chunk_size=64)
+    streamed = LinearModelModel(None)
+    streamed.store = store
+    streamed.regressor = "Lasso"
+    assert streamed.create_model(columns, 'target') is True
+    assert streamed.regularization["criterion"] == "GCV"
+    store.delete()
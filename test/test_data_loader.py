@@ -0,0 +1,100 @@
+import pytest
+import pandas as pd
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/interface")))
+from DataLoader import read_file, compact_dataframe, list_sheets, LoadCancelled
+from DataPreprocessor import DataPreprocessorModel
+
+
+def create_csv(tmp_path, rows):
+    df = pd.DataFrame({"x": range(rows), "y": [value * 2.0 for value in range(rows)]})
+    file_path = tmp_path / "data.csv"
+    df.to_csv(file_path, index=False)
+    return df, str(file_path)
+
+def test_read_file_in_chunks(tmp_path):
+    df, file_path = create_csv(tmp_path, 25)
+    progress = []
+
+    # Leer el CSV en bloques de 10 filas
+    loaded = read_file(file_path, progress=lambda done, total: progress.append((done, total)), chunk_size=10)
+
+    assert loaded.equals(df), "El DataFrame leído por bloques no coincide."
+    assert len(progress) == 3, "No se informó del progreso de cada bloque."
+    assert progress[-1][0] == progress[-1][1], "El progreso final no llega al total."
+
+def test_read_file_streams_columns(tmp_path):
+    # Bloques con tipos distintos (enteros y después decimales, textos y números) se unen como pd.concat
+    df = pd.DataFrame({"x": list(range(15)) + [0.5] * 10, "name": ["a"] * 12 + [1] * 13})
+    file_path = str(tmp_path / "mixed.csv")
+    df.to_csv(file_path, index=False)
+    expected = pd.concat(list(pd.read_csv(file_path, chunksize=10)), ignore_index=True)
+    seen = []
+    loaded = read_file(file_path, chunk_size=10, on_chunk=lambda frame: seen.append(
+        (frame.n_rows, list(frame.values(0, 0, frame.n_rows)))))
+    assert loaded.equals(expected), "La unión por columnas no coincide con pd.concat."
+    assert [rows for rows, _ in seen] == [10, 20, 25], "Debería avisar con las filas leídas tras cada bloque."
+    assert seen[-1][1] == list(expected["x"]), "Las filas leídas deberían poder mostrarse mientras se carga."
+
+def test_read_file_cancelled(tmp_path):
+    _, file_path = create_csv(tmp_path, 25)
+
+    with pytest.raises(LoadCancelled):
+        read_file(file_path, is_cancelled=lambda: True, chunk_size=10)
+
+def test_read_file_empty(tmp_path):
+    file_path = tmp_path / "empty.csv"
+    file_path.write_text("")
+
+    assert read_file(str(file_path)) is None, "Un archivo vacío debería devolver None."
+
+def test_column_store_empty(tmp_path):
+    from ColumnStore import ColumnStore
+    file_path = tmp_path / "empty.csv"
+    file_path.write_text("")
+
+    with pytest.raises(ValueError, match="No data found."):
+        ColumnStore.build(str(file_path), store_dir=str(tmp_path / "store"))
+    assert not (tmp_path / "store").exists(), "No debería quedar el directorio del almacén."
+
+def test_compact_dataframe():
+    df = pd.DataFrame({
+        "small_int": [1, 2, 3, 4],
+        "int_as_float": [10.0, 20.0, 30.0, 40.0],
+        "float32_safe": [0.5, None, 1.5, 2.0],
+        "precise": [0.1, 0.2, 0.3, 0.4],
+        "category": ["a", "b", "a", "a"],
+    })
+
+    compact = compact_dataframe(df)
+
+    assert compact["small_int"].dtype == "int8"
+    assert compact["int_as_float"].dtype == "int8"
+    assert compact["float32_safe"].dtype == "float32"
+    assert compact["precise"].dtype == "float64", "No se debe perder precisión al reducir tipos."
+    assert compact["category"].dtype == "category"
+    assert compact.attrs["memory_usage"]["after"] < compact.attrs["memory_usage"]["before"]
+
+    # El preprocesado debe rellenar también las columnas con tipos reducidos
+    preprocessor = DataPreprocessorModel()
+    preprocessor.set_dataframe(compact)
+    preprocessor.preprocess_missing_data(["float32_safe"], "Fill with Mean")
+    assert preprocessor.get_dataframe()["float32_safe"].isna().sum() == 0
+
+def test_read_excel_sheet_in_chunks(tmp_path):
+    file_path = str(tmp_path / "book.xlsx")
+    other = pd.DataFrame({"a": [1, 2]})
+    df = pd.DataFrame({"x": range(25), "y": [value / 4 for value in range(25)], "z": ["a", None] * 12 + ["b"]})
+    with pd.ExcelWriter(file_path) as writer:
+        other.to_excel(writer, sheet_name="first", index=False)
+        df.to_excel(writer, sheet_name="data", index=False)
+
+    assert list_sheets(file_path) == ["first", "data"]
+
+    # La hoja elegida se lee por bloques y da lo mismo que pd.read_excel
+    progress = []
+    loaded = read_file(file_path, progress=lambda done, total: progress.append(done), chunk_size=10, sheet_name="data")
+    assert loaded.equals(pd.read_excel(file_path, sheet_name="data"))
+    assert len(progress) == 3, "La hoja no se leyó por bloques."
+    assert read_file(file_path).equals(other), "Por defecto se debe leer la primera hoja."
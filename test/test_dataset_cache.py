@@ -0,0 +1,44 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/interface")))
+from DatasetCache import DatasetCache
+
+
+def create_csv(tmp_path, name, rows):
+    df = pd.DataFrame({"x": np.arange(rows), "y": np.arange(rows) * 0.5,
+                       "z": (["a", "b", None] * rows)[:rows]})
+    file_path = tmp_path / name
+    df.to_csv(file_path, index=False)
+    return pd.read_csv(file_path), str(file_path)
+
+def test_cache_roundtrip(tmp_path):
+    df, file_path = create_csv(tmp_path, "data.csv", 30)
+    cache = DatasetCache(str(tmp_path / "cache"))
+
+    assert cache.get(file_path) is None, "La caché debería empezar vacía."
+    assert cache.put(file_path, df)
+    cached = cache.get(file_path)
+    assert cached.equals(df), "El DataFrame guardado no coincide."
+    assert (cached.dtypes == df.dtypes).all(), "Los tipos de las columnas no coinciden."
+
+    # Si el archivo cambia, la entrada anterior deja de ser válida
+    pd.DataFrame({"x": [1]}).to_csv(file_path, index=False)
+    os.utime(file_path, ns=(0, 0))
+    assert cache.get(file_path) is None
+
+def test_cache_eviction_and_clear(tmp_path):
+    df1, file1 = create_csv(tmp_path, "a.csv", 1000)
+    df2, file2 = create_csv(tmp_path, "b.csv", 1000)
+    cache = DatasetCache(str(tmp_path / "cache"))
+    cache.put(file1, df1)
+    cache.max_bytes = cache.size()
+
+    # Al guardar un segundo archivo se elimina el menos usado
+    cache.put(file2, df2)
+    assert cache.get(file1) is None
+    assert cache.get(file2) is not None
+
+    cache.clear()
+    assert cache.size() == 0
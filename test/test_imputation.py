@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/interface")))
+from Imputation import knn_impute, iterative_impute, ImputationCancelled
+from DataPreprocessor import DataPreprocessorModel
+
+
+def create_values(rows=400):
+    rng = np.random.default_rng(0)
+    a = rng.normal(size=rows)
+    b = 3 * a + rng.normal(scale=0.01, size=rows) + 100
+    values = np.column_stack([a, b])
+    holes = np.zeros(rows, dtype=bool)
+    holes[::7] = True
+    with_holes = values.copy()
+    with_holes[holes, 1] = np.nan
+    return values, with_holes, holes
+
+def test_knn_impute_matches_brute_force():
+    _, values, holes = create_values()
+    progress = []
+    imputed = knn_impute(values, n_neighbors=3, chunk_size=10, workers=2,
+                         progress=lambda done, total: progress.append((done, total)))
+
+    # Con una sola columna para comparar, los vecinos son las filas con el valor de a más cercano
+    a = values[:, 0]
+    donors = np.flatnonzero(~holes)
+    for row in np.flatnonzero(holes):
+        nearest = donors[np.argsort(np.abs(a[donors] - a[row]), kind="stable")[:3]]
+        assert np.isclose(imputed[row, 1], values[nearest, 1].mean()), f"La fila {row} no coincide."
+    assert np.array_equal(imputed[~holes], values[~holes]), "No se deben cambiar los valores que había."
+    assert len(progress) == 6 and progress[-1] == (6, 6), "No se informó del progreso de cada bloque."
+
+def test_iterative_impute_recovers_linear_relation():
+    original, values, holes = create_values()
+    imputed = iterative_impute(values, chunk_size=32, workers=2)
+
+    assert np.allclose(imputed[holes, 1], original[holes, 1], atol=0.05)
+    with pytest.raises(ImputationCancelled):
+        iterative_impute(values, is_cancelled=lambda: True)
+
+def test_knn_preprocessing_can_be_undone():
+    _, values, holes = create_values()
+    df = pd.DataFrame({"a": values[:, 0], "b": values[:, 1].astype("float32")})
+    original = df.copy()
+    model = DataPreprocessorModel()
+    model.set_dataframe(df)
+
+    assert model.preprocess_missing_data(["a", "b"], "Fill with KNN")
+    assert model.fill_counts == {"a": 0, "b": int(holes.sum())}
+    assert model.get_dataframe()["b"].dtype == "float32", "La columna debe conservar su tipo."
+    assert model.missing_index.count("b") == 0
+    assert model.steps[-1]["strategy"] == "Fill with KNN"
+
+    model.undo()
+    assert model.get_dataframe().equals(original)
+    assert model.missing_index.count("b") == holes.sum(), "Deshacer debe devolver los vacíos al índice."
+
+
+def test_imputation_refused_on_column_store(tmp_path):
+    from ColumnStore import ColumnStore
+    _, values, holes = create_values()
+    file_path = str(tmp_path / "data.csv")
+    pd.DataFrame({"a": values[:, 0], "b": values[:, 1]}).to_csv(file_path, index=False)
+    store = ColumnStore.build(file_path, store_dir=str(tmp_path / "store"), chunk_size=64)
+    model = DataPreprocessorModel()
+    model.set_dataframe(None, store)
+
+    for strategy in ("Fill with KNN", "Fill with Iterative Regression"):
+        assert not model.preprocess_missing_data(["a", "b"], strategy), \
+            f"'{strategy}' no debería aplicarse sobre un almacén en disco."
+    assert int(np.isnan(store.column("b")).sum()) == holes.sum(), "El almacén no debería cambiar."
+    store.delete()
@@ -4,10 +4,13 @@ from sklearn.linear_model import LinearRegression
 import sys
 import os
 import joblib
+import sqlite3
 from tempfile import NamedTemporaryFile
 # Agregar la carpeta 'modulo' al path
 sys.path.append(os.path.abspath("../src/interface"))
-from DataTable import DataTableModel
+from PyQt5.QtCore import Qt
+from DataTable import DataTableModel, SQLiteTableModel
+from MissingIndex import next_position
 
 def test_load_data():
     # Crear el DataFrame
@@ -23,3 +26,174 @@ def test_load_data():
     model = DataTableModel()
     model.load_file("test/TestData.xlsx")
     assert model.df.equals(df)
+
+def test_streaming_chunks():
+    # Crear el DataFrame y dividirlo en bloques
+    df = pd.DataFrame({"x": range(10), "y": [value * 1.5 for value in range(10)]})
+    chunks = [df.iloc[0:4], df.iloc[4:8], df.iloc[8:10]]
+
+    model = DataTableModel()
+    for chunk in chunks:
+        model.append_chunk(chunk)
+
+    # Las filas se sirven desde los bloques mientras dura la carga
+    assert model.is_streaming()
+    assert model.rowCount() == 10
+    assert model.data(model.index(5, 1)) == str(df.iloc[5, 1])
+    assert model.data(model.index(9, 0)) == str(df.iloc[9, 0])
+
+    model.finish_streaming(pd.concat(chunks))
+    assert not model.is_streaming()
+    assert model.rowCount() == 10
+    assert model.data(model.index(5, 1)) == str(df.iloc[5, 1])
+
+def test_sqlite_paged_model(tmp_path):
+    # Crear una base de datos con una tabla
+    df = pd.DataFrame({"x": range(50), "y": [value * 0.5 for value in range(50)]})
+    file_path = str(tmp_path / "data.db")
+    conn = sqlite3.connect(file_path)
+    df.to_sql("datos", conn, index=False)
+    conn.close()
+
+    model = SQLiteTableModel(file_path, page_size=8, max_pages=2)
+    assert model.rowCount() == 50
+    assert model.columnCount() == 2
+    assert model.headerData(1, Qt.Horizontal) == "y"
+
+    # Leer filas de varias páginas; la caché no supera el máximo de páginas
+    for row in [0, 7, 8, 30, 49, 9]:
+        assert model.data(model.index(row, 1)) == str(df.iloc[row, 1])
+    assert len(model.pages) <= 2
+
+    assert model.to_dataframe().equals(df)
+    model.close()
+
+def test_cached_cell_text():
+    df = pd.DataFrame({
+        "x": range(30),
+        "y": [value / 3 if value % 7 else None for value in range(30)],
+        "name": ["a", None, "c"] * 10,
+    })
+    model = DataTableModel(window_rows=8, max_windows=4)
+    model.setDataFrame(df)
+
+    # El texto coincide con el de cada valor y los bloques se guardan en una caché limitada
+    for row in range(30):
+        for column in range(3):
+            assert model.data(model.index(row, column)) == str(df.iloc[row, column])
+    assert len(model.windows) <= 4
+
+    # Formato por columna: los vacíos siguen mostrándose como "nan"
+    model.set_number_format("y", "%.2f")
+    assert model.data(model.index(1, 1)) == "0.33"
+    assert model.data(model.index(0, 1)) == "nan"
+
+    # Tras cambiar los datos, invalidate descarta el texto anterior
+    df["y"] = df["y"].fillna(0.0)
+    model.invalidate(["y"])
+    assert model.data(model.index(0, 1)) == "0.00"
+
+    df.dropna(subset=["name"], inplace=True)
+    model.invalidate()
+    assert model.rowCount() == 20
+    assert model.data(model.index(1, 2)) == "c"
+
+def test_highlight_mask():
+    df = pd.DataFrame({"x": [1.0, None, 3.0], "y": [None, 2.0, 3.0], "z": [1, 2, 3]})
+    model = DataTableModel()
+    model.setDataFrame(df)
+    changes = []
+    model.dataChanged.connect(lambda first, last, roles: changes.append((first.row(), first.column(),
+                                                                         last.row(), last.column())))
+
+    model.set_highlight([0, 1], df[["x", "y"]].isna(), "red")
+
+    # Un único aviso para todo el rango resaltado
+    assert changes == [(0, 0, 2, 1)]
+    assert model.data(model.index(1, 0), Qt.BackgroundRole) == "red"
+    assert model.data(model.index(0, 1), Qt.BackgroundRole) == "red"
+    assert model.data(model.index(0, 0), Qt.BackgroundRole) is None
+    assert model.data(model.index(0, 2), Qt.BackgroundRole) is None
+
+    model.clear_highlight()
+    assert model.data(model.index(1, 0), Qt.BackgroundRole) is None
+
+def test_fetch_more_rows():
+    df = pd.DataFrame({"x": range(25)})
+    model = DataTableModel(fetch_rows=10)
+    model.setDataFrame(df)
+
+    # Solo se muestran las primeras filas; el resto se pide por tandas
+    assert model.rowCount() == 10
+    assert model.canFetchMore()
+    model.fetchMore()
+    assert model.rowCount() == 20
+    model.ensure_rows(24)
+    assert model.rowCount() == 25
+    assert not model.canFetchMore()
+    assert model.data(model.index(24, 0)) == "24"
+
+def test_sort_and_filter():
+    df = pd.DataFrame({"x": [3.0, None, 1.0, 2.0], "name": ["b", "a", "c", "ab"]})
+    model = DataTableModel()
+    model.setDataFrame(df)
+
+    # Orden ascendente y descendente, con los vacíos siempre al final
+    model.sort(0, Qt.AscendingOrder)
+    assert [model.data(model.index(row, 0)) for row in range(4)] == ["1.0", "2.0", "3.0", "nan"]
+    model.sort(0, Qt.DescendingOrder)
+    assert [model.data(model.index(row, 0)) for row in range(4)] == ["3.0", "2.0", "1.0", "nan"]
+    assert list(model.sort_cache) == [0], "El orden de la columna se debe calcular una sola vez."
+    assert model.headerData(0, Qt.Vertical) == 1, "La cabecera de fila indica la fila del archivo."
+
+    # Los filtros se combinan con el orden
+    model.set_filter(1, "a")
+    assert [model.data(model.index(row, 1)) for row in range(model.rowCount())] == ["ab", "a"]
+    model.set_filter(0, "> 1.5")
+    assert [model.data(model.index(row, 1)) for row in range(model.rowCount())] == ["ab"]
+    with pytest.raises(ValueError):
+        model.set_filter(1, "> 1")
+
+    model.clear_filters()
+    model.sort(-1)
+    assert model.rowCount() == 4
+    assert model.data(model.index(0, 1)) == "b"
+
+def test_view_rows_follow_sort_and_filter():
+    df = pd.DataFrame({"x": [3.0, None, 1.0, None, 2.0]})
+    model = DataTableModel()
+    model.setDataFrame(df)
+    missing = df["x"].isna().to_numpy().nonzero()[0]
+
+    # Sin orden las filas de la vista son las del DataFrame
+    assert model.view_rows(missing).tolist() == [1, 3]
+    assert next_position(model.view_rows(missing), -1) == 1
+    assert next_position(model.view_rows(missing), 3) == 1, "Al llegar al final se vuelve al principio."
+    assert next_position(model.view_rows(missing), 1, backwards=True) == 3
+
+    # Ordenada, los vacíos quedan al final; filtrada, desaparecen
+    model.sort(0, Qt.AscendingOrder)
+    assert model.view_rows(missing).tolist() == [3, 4]
+    model.set_filter(0, "> 1")
+    assert model.view_rows(missing).tolist() == []
+
+
+def test_close_window_while_loading(tmp_path):
+    import subprocess
+    import numpy as np
+    file_path = str(tmp_path / "big.csv")
+    pd.DataFrame(np.random.default_rng(0).normal(size=(500000, 4)), columns=list("abcd")).to_csv(file_path, index=False)
+    # En otro proceso: si el hilo de carga se destruye sin terminar, Qt aborta el proceso
+    code = ("import time; from PyQt5.QtWidgets import QApplication, QFileDialog; app = QApplication([]); "
+            "import Interface; "
+            f"QFileDialog.getOpenFileName = staticmethod(lambda *args, **kwargs: ({file_path!r}, '')); "
+            "window = Interface.Interface(); window.open_file_dialog(); "
+            "started = time.monotonic()\n"
+            "while time.monotonic() - started < 0.3: app.processEvents()\n"
+            "assert window.load_worker is not None, 'La carga debería seguir en curso.'\n"
+            "window.close(); print('closed')")
+    interface_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/interface"))
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    result = subprocess.run([sys.executable, "-c", code], cwd=interface_dir, capture_output=True, text=True, env=env)
+    assert result.returncode == 0 and "closed" in result.stdout, \
+        f"Cerrar la ventana durante la carga no debería abortar: {result.stderr}"
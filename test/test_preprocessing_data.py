@@ -0,0 +1,131 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/interface")))
+from DataPreprocessor import DataPreprocessorModel
+
+
+def create_model():
+    df = pd.DataFrame({
+        "float": [1.0, None, 3.0, None],
+        "float32": pd.Series([1.0, 2.0, None, 4.0], dtype="float32"),
+        "nullable_int": pd.Series([1, None, 4, 5], dtype="Int64"),
+        "text": ["a", None, "b", "c"],
+    })
+    model = DataPreprocessorModel()
+    model.set_dataframe(df)
+    return model
+
+def test_fill_with_mean_all_numeric_types():
+    model = create_model()
+    columns = ["float", "float32", "nullable_int", "text"]
+
+    assert model.preprocess_missing_data(columns, "Fill with Mean")
+    df = model.get_dataframe()
+
+    # Todas las columnas numéricas se rellenan, sea cual sea su tipo; el texto no
+    assert df["float"].tolist() == [1.0, 2.0, 3.0, 2.0]
+    assert np.isclose(df["float32"][2], 7 / 3)
+    assert df["nullable_int"][1] == 10 / 3, "Un Int64 con media no entera debe pasar a float."
+    assert df["text"].isna().sum() == 1
+    assert model.fill_counts == {"float": 2, "float32": 1, "nullable_int": 1, "text": 0}
+    assert model.touched_columns == ["float", "float32", "nullable_int"]
+
+def test_fill_with_median_and_constant():
+    model = create_model()
+    model.preprocess_missing_data(["nullable_int"], "Fill with Median")
+    assert model.get_dataframe()["nullable_int"].tolist() == [1, 4, 4, 5]
+
+    model.preprocess_missing_data(["float", "text"], "Fill with Constant Value", "0")
+    assert model.get_dataframe()["float"].isna().sum() == 0
+    assert model.fill_counts == {"float": 2, "text": 1}
+    assert not model.preprocess_missing_data(["float"], "Fill with Constant Value", "abc")
+
+def test_remove_rows():
+    model = create_model()
+    model.preprocess_missing_data(["float"], "Remove Rows")
+    assert len(model.get_dataframe()) == 2
+    assert model.removed_rows == 2
+
+def test_undo_redo_fill():
+    model = create_model()
+    original = model.get_dataframe().copy()
+    model.preprocess_missing_data(["float", "nullable_int"], "Fill with Mean")
+    filled = model.get_dataframe().copy()
+
+    # Solo se guardan las columnas que cambiaron
+    assert set(model.undo_stack[-1]["before"]) == {"float", "nullable_int"}
+
+    assert model.undo()
+    assert model.get_dataframe().equals(original), "Deshacer debe dejar los datos (y los tipos) como estaban."
+    assert model.touched_columns == ["float", "nullable_int"]
+    assert model.redo()
+    assert model.get_dataframe().equals(filled)
+    assert not model.redo()
+
+def test_undo_redo_remove_rows():
+    model = create_model()
+    original = model.get_dataframe().copy()
+    model.preprocess_missing_data(["float"], "Remove Rows")
+
+    # Solo se guardan las filas quitadas
+    assert len(model.undo_stack[-1]["rows"]) == 2
+    assert model.undo()
+    assert model.get_dataframe().equals(original)
+    assert model.redo()
+    assert model.get_dataframe()["float"].tolist() == [1.0, 3.0]
+
+    # Un paso nuevo borra lo que se podía rehacer
+    model.undo()
+    model.preprocess_missing_data(["float"], "Fill with Constant Value", "0")
+    assert not model.can_redo()
+
+def test_missing_index_follows_steps():
+    model = create_model()
+    index = model.missing_index
+
+    def assert_matches_dataframe():
+        df = model.get_dataframe()
+        for column in df.columns:
+            assert index.count(column) == df[column].isna().sum(), f"El recuento de '{column}' no coincide."
+            assert np.array_equal(index.mask(column), df[column].isna().to_numpy()), f"Los vacíos de '{column}' no coinciden."
+
+    assert index.missing_counts(["float", "text"]) == {"float": 2, "text": 1}
+    assert index.positions("float").tolist() == [1, 3]
+
+    # El índice se actualiza al rellenar, quitar filas, deshacer y rehacer
+    model.preprocess_missing_data(["float"], "Fill with Mean")
+    assert_matches_dataframe()
+    model.undo()
+    assert_matches_dataframe()
+    model.preprocess_missing_data(["float32", "text"], "Remove Rows")
+    assert_matches_dataframe()
+    model.undo()
+    assert_matches_dataframe()
+    model.redo()
+    assert_matches_dataframe()
+    assert np.array_equal(model.get_missing_cells(["float", "nullable_int"]),
+                          model.get_dataframe()[["float", "nullable_int"]].isna().to_numpy())
+
+
+def test_column_store_median_by_blocks(tmp_path, monkeypatch):
+    import ColumnStore as column_store
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({
+        "odd": rng.normal(size=1001) * 1e6,
+        "even": np.where(rng.random(1001) < 0.2, np.nan, rng.normal(size=1001)),
+        "repeated": rng.choice([1.0, 2.0, 2.0, 2.0, 3.0], size=1001),
+        "empty": [np.nan] * 1001,
+    })
+    file_path = str(tmp_path / "data.csv")
+    df.to_csv(file_path, index=False)
+    store = column_store.ColumnStore.build(file_path, store_dir=str(tmp_path / "store"), chunk_size=64)
+    # Pocos valores por paso obligan a acotar el intervalo varias veces
+    monkeypatch.setattr(column_store, "MEDIAN_BINS", 8)
+    monkeypatch.setattr(column_store, "MEDIAN_EXACT_ROWS", 5)
+    for column in ["odd", "even", "repeated"]:
+        expected = np.nanmedian(np.asarray(store.column(column)))
+        assert store.median(column) == expected, f"La mediana de {column} no coincide."
+    assert np.isnan(store.median("empty")), "Sin valores la mediana debería ser NaN."
+    store.delete()
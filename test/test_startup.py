@@ -0,0 +1,15 @@
+import os
+import sys
+import subprocess
+
+INTERFACE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/interface"))
+
+
+def test_interface_import_is_lazy():
+    # Las librerías pesadas solo se importan cuando se usan, no al abrir la ventana
+    code = ("import sys, Interface; "
+            "print([name for name in ('sklearn', 'matplotlib', 'joblib', 'openpyxl') if name in sys.modules])")
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    result = subprocess.run([sys.executable, "-c", code], cwd=INTERFACE_DIR, capture_output=True, text=True, env=env)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]", "La interfaz importa librerías pesadas al arrancar."
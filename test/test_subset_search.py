@@ -0,0 +1,91 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/interface")))
+from SubsetSearch import subset_statistics, search_subsets, SearchCancelled
+from RegressionModel import kfold_groups
+
+
+def create_data(rows=300):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame(rng.normal(size=(rows, 6)), columns=[f"x{i}" for i in range(6)])
+    df["x0"] += 1000  # Columna desplazada, para comprobar la precisión
+    df["y"] = 2 * df["x0"] - 3 * df["x2"] + 0.5 * df["x4"] + rng.normal(scale=0.5, size=rows)
+    return df
+
+
+def brute_force_scores(df, columns, criterion):
+    """Puntuación de cada subconjunto ajustando LinearRegression desde cero."""
+    from sklearn.linear_model import LinearRegression
+
+    folds = kfold_groups(len(df), 5, seed=42)
+    y = df["y"].to_numpy()
+    scores = {}
+    for size in range(1, len(columns) + 1):
+        for subset in itertools.combinations(columns, size):
+            X = df[list(subset)].to_numpy()
+            if criterion == "CV RMSE":
+                squares = 0.0
+                for fold in range(5):
+                    test = folds == fold
+                    model = LinearRegression().fit(X[~test], y[~test])
+                    squares += ((model.predict(X[test]) - y[test]) ** 2).sum()
+                scores[subset] = np.sqrt(squares / len(df))
+            else:
+                model = LinearRegression().fit(X, y)
+                sse = ((model.predict(X) - y) ** 2).sum()
+                scores[subset] = len(df) * np.log(sse / len(df)) + np.log(len(df)) * (size + 1)
+    return scores
+
+
+@pytest.mark.parametrize("criterion", ["CV RMSE", "BIC"])
+def test_exhaustive_search_matches_brute_force(criterion):
+    df = create_data()
+    columns = [f"x{i}" for i in range(6)]
+    expected = sorted((score, subset) for subset, score in brute_force_scores(df, columns, criterion).items())
+    gram = subset_statistics(columns, "y", df)
+    reports = []
+    ranking, skipped = search_subsets(gram, columns, "y", "Exhaustive", criterion, top=5, workers=2,
+                                      report=reports.append)
+    assert skipped == [], "No debería descartar ninguna columna"
+    assert reports, "Debería informar de los mejores subconjuntos mientras busca"
+    assert [subset for _, subset in ranking] == [subset for _, subset in expected[:5]], \
+        "Los mejores subconjuntos no coinciden con los de LinearRegression"
+    np.testing.assert_allclose([score for score, _ in ranking], [score for score, _ in expected[:5]], rtol=1e-8,
+                               err_msg="Las puntuaciones no coinciden con las de LinearRegression")
+    # La búsqueda paso a paso llega al mismo mejor subconjunto
+    for method in ("Forward", "Backward"):
+        best = search_subsets(gram, columns, "y", method, criterion)[0][0]
+        assert best[1] == expected[0][1], f"{method} no encuentra el mejor subconjunto"
+
+
+def test_subset_search_skips_collinear_columns():
+    df = create_data()
+    df["copy"] = 2 * df["x2"]
+    columns = ["x0", "x2", "copy", "x4"]
+    gram = subset_statistics(columns, "y", df)
+    ranking, skipped = search_subsets(gram, columns, "y", "Exhaustive", "AIC")
+    assert skipped == ["copy"], "La columna colineal debería descartarse"
+    assert all("copy" not in subset for _, subset in ranking), "La columna descartada no debería aparecer"
+    assert ranking[0][1] == ("x0", "x2", "x4"), "El mejor subconjunto debería tener las tres columnas del objetivo"
+
+
+def test_subset_search_can_be_cancelled():
+    df = create_data()
+    columns = [f"x{i}" for i in range(6)]
+    gram = subset_statistics(columns, "y", df)
+    with pytest.raises(SearchCancelled):
+        search_subsets(gram, columns, "y", "Exhaustive", "CV RMSE", is_cancelled=lambda: True)
+
+
+def test_subset_statistics_from_store_can_be_cancelled(tmp_path):
+    from ColumnStore import ColumnStore
+    file_path = str(tmp_path / "data.csv")
+    create_data().to_csv(file_path, index=False)
+    store = ColumnStore.build(file_path, store_dir=str(tmp_path / "store"), chunk_size=64)
+    with pytest.raises(SearchCancelled):
+        subset_statistics(["x0", "x2"], "y", store=store, is_cancelled=lambda: True)
+    store.delete()